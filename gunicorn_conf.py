@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for the web interface (see wsgi.py)
+
+Requests spend nearly all their time waiting on DeepSeek, so each worker runs
+a pool of threads; override any value with the usual GUNICORN_CMD_ARGS.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8080")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 32))
+
+# Reuse connections from a reverse proxy instead of reconnecting per request
+keepalive = 30
+# A DeepSeek call can take the full 120s client timeout plus retries
+timeout = 180
+# Worker heartbeat files on tmpfs avoid disk writes (and stalls) on every beat
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# web_server starts background threads at import, and threads don't survive
+# fork, so each worker imports the app itself
+preload_app = False
+
+
+def on_starting(server):
+    """Prune the shared LLM cache once in the master, rather than once per worker"""
+    from llm_cache import LLMCache
+    LLMCache.from_env().prune()
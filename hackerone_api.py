@@ -3,11 +3,31 @@
 HackerOne API Integration
 Fetches bug bounty program details from HackerOne
 """
+import argparse
 import os
+import re
+import string
+import sys
+import threading
 import requests
 import json
-from typing import Dict, List, Optional, Any
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+from urllib.parse import parse_qs, urlparse
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional faster JSON decoder
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -18,6 +38,45 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+# Section dividers used by format_program_details
+CYAN_EQ = f"{Colors.CYAN}{'═' * 80}{Colors.ENDC}"
+CYAN_DASH = f"{Colors.CYAN}{'─' * 80}{Colors.ENDC}"
+
+# Program handles: also used verbatim in API paths and export filenames
+_HANDLE_RE = re.compile(r"\A[A-Za-z0-9_\-]{1,64}\Z")
+
+# Plain-text layout for export_program_for_analysis
+_ANALYSIS_TEMPLATE = string.Template("""BUG BOUNTY PROGRAM DETAILS
+
+Program: $name
+Handle: $handle
+URL: $url
+State: $state
+Accepts Submissions: $submission_state
+Offers Bounties: $offers_bounties
+
+=== IN SCOPE TARGETS ===
+$scopes$out_of_scope$policy""")
+
+# Static banners, built once instead of on every redraw
+PROGRAM_HEADER = f"""
+{Colors.CYAN}╔{'═' * 78}╗
+║{Colors.BOLD} PROGRAM DETAILS {Colors.ENDC}{Colors.CYAN}{'═' * 61}║
+╚{'═' * 78}╝{Colors.ENDC}
+"""
+
+MENU_BANNER = "\n".join([
+    f"\n{Colors.CYAN}╔{'═' * 58}╗",
+    f"║{Colors.BOLD}{'HACKERONE API CLIENT'.center(58)}{Colors.ENDC}{Colors.CYAN}║",
+    f"╠{'═' * 58}╣",
+    f"║  {Colors.GREEN}[1]{Colors.ENDC} List All Programs".ljust(67) + "║",
+    f"║  {Colors.GREEN}[2]{Colors.ENDC} Search Programs".ljust(67) + "║",
+    f"║  {Colors.GREEN}[3]{Colors.ENDC} Get Program Details".ljust(67) + "║",
+    f"║  {Colors.GREEN}[4]{Colors.ENDC} Export Program for Analysis".ljust(67) + "║",
+    f"║  {Colors.RED}[q]{Colors.ENDC} Quit".ljust(67) + "║",
+    f"╚{'═' * 58}╝{Colors.ENDC}\n\n",
+])
+
 class HackerOneError(Exception):
     """Base exception for HackerOne API client errors."""
     pass
@@ -34,6 +93,71 @@ class HackerOneRequestError(HackerOneError):
     """Raised for network or request-related errors."""
     pass
 
+@dataclass(frozen=True, slots=True)
+class ScopeView:
+    """A structured scope entry with its attributes pulled out once"""
+    asset_type: Optional[str]
+    asset_identifier: str
+    eligible_for_bounty: bool
+    eligible_for_submission: bool
+
+    @classmethod
+    def from_api(cls, scope: Dict) -> "ScopeView":
+        scope_attrs = scope.get("attributes", {})
+        return cls(
+            asset_type=scope_attrs.get("asset_type"),
+            asset_identifier=scope_attrs.get("asset_identifier", "N/A"),
+            eligible_for_bounty=scope_attrs.get("eligible_for_bounty", False),
+            eligible_for_submission=scope_attrs.get("eligible_for_submission", True),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ProgramView:
+    """Flat view of a program dict, so formatters walk the nested API data only once"""
+    name: str
+    handle: str
+    url: Optional[str]
+    state: str
+    submission_state: str
+    offers_bounties: bool
+    offers_swag: bool
+    resolved_report_count: int
+    currency: str
+    scopes: List[ScopeView]
+    out_of_scope: str
+    policy: str
+    # Shortened policy for on-screen display, computed once at construction
+    policy_truncated: bool = False
+    policy_display: str = ""
+
+    # Longest policy shown in full by format_program_details
+    POLICY_DISPLAY_LIMIT = 1000
+
+    @classmethod
+    def from_api(cls, program: Dict) -> "ProgramView":
+        # The program data could be under an 'attributes' key, or the dict itself could be the attributes
+        attrs = program.get("attributes", {}) if 'attributes' in program else program
+        policy = attrs.get("policy", "")
+        policy_truncated = len(policy) > cls.POLICY_DISPLAY_LIMIT
+        return cls(
+            name=attrs.get("name", "N/A"),
+            handle=attrs.get("handle", "N/A"),
+            url=attrs.get("url"),
+            state=attrs.get("state", "N/A"),
+            submission_state=attrs.get("submission_state", "N/A"),
+            offers_bounties=attrs.get("offers_bounties", False),
+            offers_swag=attrs.get("offers_swag", False),
+            resolved_report_count=attrs.get("resolved_report_count", 0),
+            currency=attrs.get("currency", "USD"),
+            scopes=[ScopeView.from_api(scope) for scope in attrs.get("structured_scopes", {}).get("data", [])],
+            out_of_scope=attrs.get("targets_out_of_scope", ""),
+            policy=policy,
+            policy_truncated=policy_truncated,
+            policy_display=f"{policy[:cls.POLICY_DISPLAY_LIMIT]}..." if policy_truncated else policy,
+        )
+
+
 class HackerOneAPI:
     """
     Client for interacting with the HackerOne API
@@ -44,6 +168,14 @@ class HackerOneAPI:
     """
 
     BASE_URL = "https://api.hackerone.com/v1"
+    # Concurrent page fetches; must not exceed the adapter's pool_maxsize
+    MAX_PAGE_WORKERS = 8
+    # Seconds a cached response stays fresh; program metadata changes slowly
+    PROGRAMS_CACHE_TTL = 300
+    PROGRAM_CACHE_TTL = 600
+    SEARCH_CACHE_TTL = 300
+    # Least recently used responses are evicted beyond this many entries
+    CACHE_MAX_ENTRIES = 128
 
     def __init__(self, username: str, api_token: str, timeout: int = 30):
         if not username or not api_token:
@@ -56,22 +188,88 @@ class HackerOneAPI:
             "Content-Type": "application/json"
         }
 
+        # Reuse one keep-alive connection pool for every call to the API
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        self.session.headers.update(self.headers)
+        # Transient 429/5xx on GETs are retried in-process so a paginated
+        # listing does not have to start over from page 1
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+
+        # In-process LRU response cache: key -> (monotonic timestamp, value)
+        self._cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # Bulk lookups update the cache from worker threads
+        self._cache_lock = threading.Lock()
+        # Search index for the most recently searched program list
+        self._search_index: Tuple[List[Tuple[str, str, Dict]], Dict[str, set]] = ([], {})
+        self._search_index_source: Optional[List[Dict]] = None
+
+    def close(self):
+        """Release pooled connections held by the underlying session"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _cached(self, key: Tuple, ttl: float, fetch: Callable[[], Any]) -> Any:
+        """Return the cached value for key if younger than ttl, otherwise fetch and store it"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < ttl:
+                self._cache.move_to_end(key)
+                return entry[1]
+
+        value = fetch()
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return value
+
+    def invalidate_cache(self, handle: Optional[str] = None):
+        """
+        Drop cached responses so the next call hits the API
+
+        Args:
+            handle: Only forget this program's details; forget everything if omitted
+        """
+        # Worker threads in get_programs_bulk/iter_programs may be updating the cache
+        with self._cache_lock:
+            if handle is None:
+                self._cache.clear()
+                self._search_index = ([], {})
+                self._search_index_source = None
+            else:
+                self._cache.pop(("program", handle), None)
+                self._cache.pop(("program_view", handle), None)
+
     def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None) -> Dict:
         """Make authenticated request to HackerOne API"""
         url = f"{self.BASE_URL}/{endpoint}"
 
         try:
-            response = requests.request(
+            response = self.session.request(
                 method=method,
                 url=url,
-                auth=self.auth,
-                headers=self.headers,
                 params=params,
                 json=data,
                 timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
+            # orjson decodes the raw bytes directly, skipping the str decode step
+            return orjson.loads(response.content) if HAS_ORJSON else response.json()
 
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
@@ -84,44 +282,122 @@ class HackerOneAPI:
             raise HackerOneRequestError(f"Request timed out after {self.timeout}s")
         except requests.exceptions.RequestException as e:
             raise HackerOneRequestError(f"Request failed: {str(e)}")
+        except ValueError as e:
+            # orjson.JSONDecodeError is a ValueError
+            raise HackerOneRequestError(f"Request failed: invalid JSON response: {str(e)}")
 
     def list_programs(self, page_size: int = 100) -> List[Dict]:
         """
         List available bug bounty programs
 
+        Page 1 is fetched first; if it reports the total page count, the
+        remaining pages are fetched concurrently over the pooled session.
+        Otherwise the `links.next` chain is followed page by page.
+
         Args:
             page_size: Number of programs per page (default: 100)
 
         Returns:
             List of program dictionaries
         """
-        programs = []
-        page = 1
-
-        while True:
-            params = {
-                "page[size]": page_size,
-                "page[number]": page
-            }
-
-            print(f"{Colors.YELLOW}[*] Fetching page {page}...{Colors.ENDC}")
-            result = self._make_request("GET", "hackers/programs", params=params)
+        return self._cached(("programs", page_size), self.PROGRAMS_CACHE_TTL,
+                            lambda: self._fetch_all_programs(page_size))
+
+    def _fetch_all_programs(self, page_size: int) -> List[Dict]:
+        """Fetch every page of the programs listing"""
+        print(f"{Colors.YELLOW}[*] Fetching page 1...{Colors.ENDC}")
+        result = self._fetch_programs_page(page_size, 1)
+        programs = list(result.get("data", []))
+
+        total_pages = self._total_pages(result)
+        if programs and total_pages and total_pages > 1:
+            print(f"{Colors.YELLOW}[*] Fetching pages 2-{total_pages} concurrently...{Colors.ENDC}")
+            # No more threads than remaining pages; small listings are common
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PAGE_WORKERS, total_pages - 1)) as executor:
+                pages = executor.map(lambda page: self._fetch_programs_page(page_size, page),
+                                     range(2, total_pages + 1))
+                for page_result in pages:
+                    programs.extend(page_result.get("data", []))
+        else:
+            # Serial pages share one params dict; only the page number changes
+            params = self._programs_params(page_size, 1)
+            page = 1
+            while programs and result.get("links", {}).get("next"):
+                page += 1
+                params["page[number]"] = page
+                print(f"{Colors.YELLOW}[*] Fetching page {page}...{Colors.ENDC}")
+                result = self._make_request("GET", "hackers/programs", params=params)
+
+                data = result.get("data", [])
+                if not data:
+                    break
+                programs.extend(data)
 
-            data = result.get("data", [])
-            if not data:
-                break
+        print(f"{Colors.GREEN}[✓] Found {len(programs)} programs{Colors.ENDC}")
+        return programs
 
-            programs.extend(data)
+    def iter_programs(self, page_size: int = 100) -> Iterator[Dict]:
+        """
+        Lazily yield programs, prefetching the next page in the background
 
-            # Check if there are more pages
-            links = result.get("links", {})
-            if not links.get("next"):
-                break
+        Only the current and the next page are held in memory, and the first
+        program is available after a single round trip.
 
-            page += 1
+        Args:
+            page_size: Number of programs per page (default: 100)
 
-        print(f"{Colors.GREEN}[✓] Found {len(programs)} programs{Colors.ENDC}")
-        return programs
+        Yields:
+            Program dictionaries in listing order
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            page = 1
+            future = executor.submit(self._fetch_programs_page, page_size, page)
+            while future is not None:
+                result = future.result()
+                data = result.get("data", [])
+                if not data:
+                    break
+
+                future = None
+                if result.get("links", {}).get("next"):
+                    page += 1
+                    future = executor.submit(self._fetch_programs_page, page_size, page)
+
+                yield from data
+        finally:
+            # Don't block on a prefetch the caller no longer needs
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_programs_page(self, page_size: int, page: int, name_filter: Optional[str] = None) -> Dict:
+        """Fetch a single page of the programs listing, optionally filtered by name"""
+        return self._make_request("GET", "hackers/programs",
+                                  params=self._programs_params(page_size, page, name_filter))
+
+    @staticmethod
+    def _programs_params(page_size: int, page: int, name_filter: Optional[str] = None) -> Dict:
+        """Query parameters for one page of the programs listing"""
+        params = {
+            "page[size]": page_size,
+            "page[number]": page
+        }
+        if name_filter:
+            params["filter[name]"] = name_filter
+        return params
+
+    @staticmethod
+    def _total_pages(result: Dict) -> Optional[int]:
+        """Read the total page count from `meta` or the `links.last` URL, if present"""
+        total_pages = result.get("meta", {}).get("total_pages")
+        if total_pages:
+            return int(total_pages)
+
+        last_link = result.get("links", {}).get("last")
+        if last_link:
+            page_numbers = parse_qs(urlparse(last_link).query).get("page[number]")
+            if page_numbers and page_numbers[0].isdigit():
+                return int(page_numbers[0])
+        return None
 
     def get_program(self, program_handle: str) -> Dict:
         """
@@ -132,7 +408,32 @@ class HackerOneAPI:
 
         Returns:
             Program details dictionary
+
+        If the API keeps failing once retries are exhausted, the last cached
+        details for the program are returned (even if expired) with a warning.
+
+        Raises:
+            ValueError: If the handle contains anything but letters, digits, '_' or '-'
         """
+        if not _HANDLE_RE.match(program_handle):
+            raise ValueError(f"Invalid handle: {program_handle!r}")
+
+        key = ("program", program_handle)
+        try:
+            return self._cached(key, self.PROGRAM_CACHE_TTL,
+                                lambda: self._fetch_program(program_handle))
+        except HackerOneAuthenticationError:
+            raise
+        except HackerOneError as e:
+            with self._cache_lock:
+                stale = self._cache.get(key)
+            if stale is None:
+                raise
+            print(f"{Colors.YELLOW}[!] {e} - using cached details for {program_handle}{Colors.ENDC}")
+            return stale[1]
+
+    def _fetch_program(self, program_handle: str) -> Dict:
+        """Fetch a single program's details from the API"""
         response = self._make_request("GET", f"hackers/programs/{program_handle}")
         # The program data could be under the 'data' key or be the response itself
         if 'data' in response and response['data']:
@@ -141,177 +442,270 @@ class HackerOneAPI:
         # It might be the program object itself, or an empty dict to signal failure
         return response
 
-    def search_programs(self, query: str, programs: Optional[List[Dict]] = None) -> List[Dict]:
+    def get_programs_bulk(self, handles: List[str]) -> List[Dict]:
+        """
+        Get details for several programs concurrently over the pooled session
+
+        Args:
+            handles: Program handles to fetch
+
+        Returns:
+            Program details dictionaries, in the same order as handles
+
+        Every lookup runs to completion (and is cached) even if one fails;
+        the first failure is then raised.
+        """
+        if not handles:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.MAX_PAGE_WORKERS, len(handles))) as executor:
+            futures = [executor.submit(self.get_program, handle) for handle in handles]
+        return [future.result() for future in futures]
+
+    def get_program_view(self, program_handle: str) -> ProgramView:
+        """
+        Get a program as a ProgramView, cached alongside the raw details
+
+        Args:
+            program_handle: The program's handle (e.g., "security")
+
+        Returns:
+            ProgramView for the program
+        """
+        return self._cached(("program_view", program_handle), self.PROGRAM_CACHE_TTL,
+                            lambda: ProgramView.from_api(self.get_program(program_handle)))
+
+    def search_programs(self, query: str, programs: Optional[List[Dict]] = None,
+                        limit: Optional[int] = None, max_pages: int = 5) -> List[Dict]:
         """
         Search for programs by name or handle
 
         Args:
             query: Search query string
             programs: Optional pre-fetched list of programs
+            limit: Optional maximum number of matches
+            max_pages: Most result pages to read from the server-side search
 
         Returns:
             List of matching programs
         """
+        query_lower = query.lower()
+
         if programs is None:
-            programs = self.list_programs()
+            programs = self._cached_programs()
+            if programs is None:
+                # Nothing to index yet: let the API filter by name
+                entries = (self._search_entry(program) for program in self._search_remote(query, max_pages))
+                return self._match_entries(query_lower, entries, limit)
+
+        entries, trigrams = self._get_search_index(programs)
+        if len(query_lower) >= 3:
+            # Only programs containing every trigram of the query can match
+            candidates = None
+            for gram in {query_lower[i:i + 3] for i in range(len(query_lower) - 2)}:
+                postings = trigrams.get(gram)
+                if not postings:
+                    return []
+                candidates = postings if candidates is None else candidates & postings
+            entries = [entries[i] for i in sorted(candidates)]
+
+        return self._match_entries(query_lower, entries, limit)
+
+    def _search_remote(self, query: str, max_pages: int = 5) -> List[Dict]:
+        """
+        Programs returned by the server-side `filter[name]` search, cached by query
 
-        query_lower = query.lower()
-        matches = []
+        Results are still matched client-side by the caller, so a server that
+        ignores the filter only costs the extra pages, up to max_pages.
+        """
+        return self._cached(("search", query.lower(), max_pages), self.SEARCH_CACHE_TTL,
+                            lambda: self._fetch_search_pages(query, max_pages))
+
+    def _fetch_search_pages(self, query: str, max_pages: int) -> List[Dict]:
+        """Fetch up to max_pages of filtered results, in parallel once the page count is known"""
+        result = self._fetch_programs_page(100, 1, name_filter=query)
+        programs = list(result.get("data", []))
+
+        total_pages = min(self._total_pages(result) or 0, max_pages)
+        if programs and total_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PAGE_WORKERS, total_pages - 1)) as executor:
+                pages = executor.map(lambda page: self._fetch_programs_page(100, page, name_filter=query),
+                                     range(2, total_pages + 1))
+                for page_result in pages:
+                    programs.extend(page_result.get("data", []))
+        else:
+            params = self._programs_params(100, 1, name_filter=query)
+            page = 1
+            while programs and page < max_pages and result.get("links", {}).get("next"):
+                page += 1
+                params["page[number]"] = page
+                result = self._make_request("GET", "hackers/programs", params=params)
+
+                data = result.get("data", [])
+                if not data:
+                    break
+                programs.extend(data)
+
+        return programs
 
-        for program in programs:
-            attrs = program.get("attributes", {})
-            handle = attrs.get("handle", "").lower()
-            name = attrs.get("name", "").lower()
+    @staticmethod
+    def _search_entry(program: Dict) -> Tuple[str, str, Dict]:
+        """Lowercased (handle, name, program) tuple used for matching"""
+        attrs = program.get("attributes", {})
+        return attrs.get("handle", "").lower(), attrs.get("name", "").lower(), program
 
+    @staticmethod
+    def _match_entries(query_lower: str, entries, limit: Optional[int]) -> List[Dict]:
+        """Collect programs whose handle or name contains the query"""
+        matches = []
+        for handle, name, program in entries:
             if query_lower in handle or query_lower in name:
                 matches.append(program)
-
+                if limit is not None and len(matches) >= limit:
+                    break
         return matches
 
-    def format_program_details(self, program: Dict) -> str:
+    def _get_search_index(self, programs: List[Dict]) -> Tuple[List[Tuple[str, str, Dict]], Dict[str, set]]:
+        """Build (once per program list) the lowercase entries and trigram postings"""
+        # Identity alone would miss programs appended to the same list after indexing
+        if self._search_index_source is not programs or len(self._search_index[0]) != len(programs):
+            entries = [self._search_entry(program) for program in programs]
+            trigrams: Dict[str, set] = defaultdict(set)
+            for idx, (handle, name, _) in enumerate(entries):
+                for text in (handle, name):
+                    for i in range(len(text) - 2):
+                        trigrams[text[i:i + 3]].add(idx)
+
+            self._search_index = (entries, trigrams)
+            self._search_index_source = programs
+        return self._search_index
+
+    def _cached_programs(self) -> Optional[List[Dict]]:
+        """Return a still-fresh cached program listing, if any"""
+        now = time.monotonic()
+        with self._cache_lock:
+            entries = list(self._cache.items())
+        for key, (timestamp, value) in entries:
+            if key[0] == "programs" and now - timestamp < self.PROGRAMS_CACHE_TTL:
+                return value
+        return None
+
+    def format_program_details(self, program) -> str:
         """
         Format program details in a readable way
 
         Args:
-            program: Program dictionary from API
+            program: Program dictionary from API, or a ProgramView
 
         Returns:
             Formatted string with program details
         """
-        # The program data could be under an 'attributes' key, or the dict itself could be the attributes
-        if 'attributes' in program:
-            attrs = program.get("attributes", {})
-        else:
-            attrs = program
-
-        # Basic info
-        name = attrs.get("name", "N/A")
-        handle = attrs.get("handle", "N/A")
-        url = attrs.get("url", f"https://hackerone.com/{handle}")
-        state = attrs.get("state", "N/A")
-
-        # Scope information
-        submission_state = attrs.get("submission_state", "N/A")
-        offers_bounties = attrs.get("offers_bounties", False)
-        offers_swag = attrs.get("offers_swag", False)
-
-        # Stats
-        resolved_report_count = attrs.get("resolved_report_count", 0)
-        currency = attrs.get("currency", "USD")
+        pv = program if isinstance(program, ProgramView) else ProgramView.from_api(program)
+        url = pv.url if pv.url is not None else f"https://hackerone.com/{pv.handle}"
 
         # Build formatted output
-        output = f"""
-{Colors.CYAN}╔{'═' * 78}╗
-║{Colors.BOLD} PROGRAM DETAILS {Colors.ENDC}{Colors.CYAN}{'═' * 61}║
-╚{'═' * 78}╝{Colors.ENDC}
-
-{Colors.GREEN}Program Name:{Colors.ENDC} {name}
-{Colors.GREEN}Handle:{Colors.ENDC} {handle}
+        parts: List[str] = [PROGRAM_HEADER, f"""
+{Colors.GREEN}Program Name:{Colors.ENDC} {pv.name}
+{Colors.GREEN}Handle:{Colors.ENDC} {pv.handle}
 {Colors.GREEN}URL:{Colors.ENDC} {url}
-{Colors.GREEN}State:{Colors.ENDC} {state}
-{Colors.GREEN}Submission State:{Colors.ENDC} {submission_state}
-{Colors.GREEN}Offers Bounties:{Colors.ENDC} {'Yes' if offers_bounties else 'No'}
-{Colors.GREEN}Offers Swag:{Colors.ENDC} {'Yes' if offers_swag else 'No'}
-{Colors.GREEN}Resolved Reports:{Colors.ENDC} {resolved_report_count}
-{Colors.GREEN}Currency:{Colors.ENDC} {currency}
-"""
+{Colors.GREEN}State:{Colors.ENDC} {pv.state}
+{Colors.GREEN}Submission State:{Colors.ENDC} {pv.submission_state}
+{Colors.GREEN}Offers Bounties:{Colors.ENDC} {'Yes' if pv.offers_bounties else 'No'}
+{Colors.GREEN}Offers Swag:{Colors.ENDC} {'Yes' if pv.offers_swag else 'No'}
+{Colors.GREEN}Resolved Reports:{Colors.ENDC} {pv.resolved_report_count}
+{Colors.GREEN}Currency:{Colors.ENDC} {pv.currency}
+"""]
 
         # Scope details
-        structured_scopes = attrs.get("structured_scopes", {}).get("data", [])
-        if structured_scopes:
-            output += f"\n{Colors.CYAN}{'─' * 80}{Colors.ENDC}\n"
-            output += f"{Colors.BOLD}IN SCOPE ASSETS:{Colors.ENDC}\n\n"
-
-            for idx, scope in enumerate(structured_scopes, 1):
-                scope_attrs = scope.get("attributes", {})
-                asset_type = scope_attrs.get("asset_type", "N/A")
-                asset_identifier = scope_attrs.get("asset_identifier", "N/A")
-                eligible_for_bounty = scope_attrs.get("eligible_for_bounty", False)
-                eligible_for_submission = scope_attrs.get("eligible_for_submission", True)
+        if pv.scopes:
+            parts.append(f"\n{CYAN_DASH}\n")
+            parts.append(f"{Colors.BOLD}IN SCOPE ASSETS:{Colors.ENDC}\n\n")
 
-                bounty_icon = "💰" if eligible_for_bounty else "🏆"
-                status_icon = "✓" if eligible_for_submission else "✗"
+            for idx, scope in enumerate(pv.scopes, 1):
+                asset_type = scope.asset_type if scope.asset_type is not None else "N/A"
+                bounty_icon = "💰" if scope.eligible_for_bounty else "🏆"
+                status_icon = "✓" if scope.eligible_for_submission else "✗"
 
-                output += f"{status_icon} {Colors.GREEN}{idx}. [{asset_type}]{Colors.ENDC} {asset_identifier} {bounty_icon}\n"
+                parts.append(f"{status_icon} {Colors.GREEN}{idx}. [{asset_type}]{Colors.ENDC} {scope.asset_identifier} {bounty_icon}\n")
 
         # Out of scope
-        targets_out_of_scope = attrs.get("targets_out_of_scope", "")
-        if targets_out_of_scope:
-            output += f"\n{Colors.CYAN}{'─' * 80}{Colors.ENDC}\n"
-            output += f"{Colors.BOLD}OUT OF SCOPE:{Colors.ENDC}\n\n"
-            output += f"{targets_out_of_scope}\n"
+        if pv.out_of_scope:
+            parts.append(f"\n{CYAN_DASH}\n")
+            parts.append(f"{Colors.BOLD}OUT OF SCOPE:{Colors.ENDC}\n\n")
+            parts.append(f"{pv.out_of_scope}\n")
 
         # Rules
-        policy = attrs.get("policy", "")
-        if policy:
-            output += f"\n{Colors.CYAN}{'─' * 80}{Colors.ENDC}\n"
-            output += f"{Colors.BOLD}POLICY & RULES:{Colors.ENDC}\n\n"
-            # Truncate if too long
-            if len(policy) > 1000:
-                output += f"{policy[:1000]}...\n{Colors.YELLOW}[Policy truncated. See full policy at {url}]{Colors.ENDC}\n"
-            else:
-                output += f"{policy}\n"
+        if pv.policy:
+            parts.append(f"\n{CYAN_DASH}\n")
+            parts.append(f"{Colors.BOLD}POLICY & RULES:{Colors.ENDC}\n\n")
+            parts.append(f"{pv.policy_display}\n")
+            if pv.policy_truncated:
+                parts.append(f"{Colors.YELLOW}[Policy truncated. See full policy at {url}]{Colors.ENDC}\n")
 
-        output += f"\n{Colors.CYAN}{'═' * 80}{Colors.ENDC}\n"
-        return output
+        parts.append(f"\n{CYAN_EQ}\n")
+        return "".join(parts)
 
-    def export_program_for_analysis(self, program: Dict) -> str:
+    def export_program_for_analysis(self, program) -> str:
         """
         Export program details in a format suitable for AI analysis
 
         Args:
-            program: Program dictionary from API
+            program: Program dictionary from API, or a ProgramView
 
         Returns:
             Formatted text for AI analysis
         """
-        # The program data could be under an 'attributes' key, or the dict itself could be the attributes
-        if 'attributes' in program:
-            attrs = program.get("attributes", {})
-        else:
-            attrs = program
-
-        # Build analysis-friendly format
-        output = f"""BUG BOUNTY PROGRAM DETAILS
-
-Program: {attrs.get('name', 'N/A')}
-Handle: {attrs.get('handle', 'N/A')}
-URL: {attrs.get('url', 'N/A')}
-State: {attrs.get('state', 'N/A')}
-Accepts Submissions: {attrs.get('submission_state', 'N/A')}
-Offers Bounties: {'Yes' if attrs.get('offers_bounties', False) else 'No'}
-
-=== IN SCOPE TARGETS ===
-"""
-
-        # Add scopes
-        structured_scopes = attrs.get("structured_scopes", {}).get("data", [])
-        if structured_scopes:
-            for scope in structured_scopes:
-                scope_attrs = scope.get("attributes", {})
-                asset_type = scope_attrs.get("asset_type", "unknown")
-                asset_identifier = scope_attrs.get("asset_identifier", "N/A")
-                bounty_eligible = "Yes" if scope_attrs.get("eligible_for_bounty", False) else "No"
+        pv = program if isinstance(program, ProgramView) else ProgramView.from_api(program)
+
+        scopes = "".join(
+            f"- [{scope.asset_type if scope.asset_type is not None else 'unknown'}] {scope.asset_identifier}"
+            f" (Bounty Eligible: {'Yes' if scope.eligible_for_bounty else 'No'})\n"
+            for scope in pv.scopes
+        ) or "No structured scope information available.\n"
+
+        return _ANALYSIS_TEMPLATE.substitute(
+            name=pv.name,
+            handle=pv.handle,
+            url=pv.url if pv.url is not None else 'N/A',
+            state=pv.state,
+            submission_state=pv.submission_state,
+            offers_bounties='Yes' if pv.offers_bounties else 'No',
+            scopes=scopes,
+            out_of_scope=f"\n=== OUT OF SCOPE ===\n{pv.out_of_scope}\n" if pv.out_of_scope else "",
+            policy=f"\n=== POLICY & RULES ===\n{pv.policy}\n" if pv.policy else "",
+        )
+
+
+def export_program(client: HackerOneAPI, handle: str, out_dir: str = ".") -> str:
+    """
+    Export a program's analysis text to <out_dir>/<handle>_bounty_details.txt
 
-                output += f"- [{asset_type}] {asset_identifier} (Bounty Eligible: {bounty_eligible})\n"
-        else:
-            output += "No structured scope information available.\n"
+    Args:
+        client: HackerOne API client
+        handle: Program handle
+        out_dir: Directory to write the export into
 
-        # Out of scope
-        targets_out_of_scope = attrs.get("targets_out_of_scope", "")
-        if targets_out_of_scope:
-            output += f"\n=== OUT OF SCOPE ===\n{targets_out_of_scope}\n"
+    Returns:
+        The exported analysis text
+    """
+    analysis_text = client.export_program_for_analysis(client.get_program_view(handle))
 
-        # Policy
-        policy = attrs.get("policy", "")
-        if policy:
-            output += f"\n=== POLICY & RULES ===\n{policy}\n"
+    filename = os.path.join(out_dir, f"{handle}_bounty_details.txt")
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        f.write(analysis_text)
 
-        return output
+    print(f"\n{Colors.GREEN}[✓] Program details exported to: {filename}{Colors.ENDC}")
+    return analysis_text
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Example usage of HackerOne API"""
+    parser = argparse.ArgumentParser(description="HackerOne API client")
+    parser.add_argument("handles", nargs="*",
+                        help="Program handles to export non-interactively")
+    parser.add_argument("--out-dir", default=".",
+                        help="Directory for exported program details (default: current directory)")
+    args = parser.parse_args(argv)
+
     load_dotenv()
 
     username = os.getenv("HACKERONE_USERNAME")
@@ -326,90 +720,101 @@ def main():
         print(f"   {Colors.GREEN}HACKERONE_API_TOKEN=your_token{Colors.ENDC}")
         return
 
-    try:
-        client = HackerOneAPI(username, api_token)
-
-        # Interactive menu
-        while True:
-            print(f"\n{Colors.CYAN}╔{'═' * 58}╗")
-            print(f"║{Colors.BOLD}{'HACKERONE API CLIENT'.center(58)}{Colors.ENDC}{Colors.CYAN}║")
-            print(f"╠{'═' * 58}╣")
-            print(f"║  {Colors.GREEN}[1]{Colors.ENDC} List All Programs".ljust(67) + "║")
-            print(f"║  {Colors.GREEN}[2]{Colors.ENDC} Search Programs".ljust(67) + "║")
-            print(f"║  {Colors.GREEN}[3]{Colors.ENDC} Get Program Details".ljust(67) + "║")
-            print(f"║  {Colors.GREEN}[4]{Colors.ENDC} Export Program for Analysis".ljust(67) + "║")
-            print(f"║  {Colors.RED}[q]{Colors.ENDC} Quit".ljust(67) + "║")
-            print(f"╚{'═' * 58}╝{Colors.ENDC}\n")
-
-            choice = input(f"{Colors.CYAN}[HackerOne] ▶{Colors.ENDC} ").strip().lower()
-
-            if choice in ['q', 'quit', 'exit']:
-                print(f"\n{Colors.YELLOW}👋 Goodbye!{Colors.ENDC}\n")
-                break
-
-            elif choice == '1':
-                programs = client.list_programs()
-                print(f"\n{Colors.CYAN}{'═' * 80}{Colors.ENDC}")
-                print(f"{Colors.BOLD}AVAILABLE PROGRAMS:{Colors.ENDC}\n")
-                for idx, program in enumerate(programs[:20], 1):  # Show first 20
-                    attrs = program.get("attributes", {})
-                    name = attrs.get("name", "N/A")
-                    handle = attrs.get("handle", "N/A")
-                    bounties = "💰" if attrs.get("offers_bounties", False) else "🏆"
-                    print(f"{idx:3d}. {bounties} {Colors.GREEN}{handle:30s}{Colors.ENDC} | {name}")
-
-                if len(programs) > 20:
-                    print(f"\n{Colors.YELLOW}... and {len(programs) - 20} more programs{Colors.ENDC}")
-
-            elif choice == '2':
-                query = input(f"{Colors.CYAN}Search query: {Colors.ENDC}").strip()
-                if not query:
-                    continue
-
-                matches = client.search_programs(query)
-                print(f"\n{Colors.GREEN}[✓] Found {len(matches)} matching programs{Colors.ENDC}\n")
-
-                for idx, program in enumerate(matches, 1):
-                    attrs = program.get("attributes", {})
-                    name = attrs.get("name", "N/A")
-                    handle = attrs.get("handle", "N/A")
-                    bounties = "💰" if attrs.get("offers_bounties", False) else "🏆"
-                    print(f"{idx}. {bounties} {Colors.GREEN}{handle}{Colors.ENDC} | {name}")
-
-            elif choice == '3':
-                handle = input(f"{Colors.CYAN}Program handle: {Colors.ENDC}").strip()
-                if not handle:
-                    continue
-
-                try:
-                    program = client.get_program(handle)
-                    print(client.format_program_details(program))
-                except HackerOneError as e:
-                    print(f"{Colors.RED}[!] Error: {e}{Colors.ENDC}")
-
-            elif choice == '4':
-                handle = input(f"{Colors.CYAN}Program handle: {Colors.ENDC}").strip()
-                if not handle:
-                    continue
+    os.makedirs(args.out_dir, exist_ok=True)
+    print_export = os.getenv("HACKERONE_PRINT_EXPORT", "0") == "1"
 
+    try:
+        with HackerOneAPI(username, api_token) as client:
+            # Batch export reuses the one session for every handle
+            if args.handles:
+                # Fetch every program concurrently up front; failures are reported per handle below
                 try:
-                    program = client.get_program(handle)
-                    analysis_text = client.export_program_for_analysis(program)
-
-                    # Save to file
-                    filename = f"{handle}_bounty_details.txt"
-                    with open(filename, 'w') as f:
-                        f.write(analysis_text)
-
-                    print(f"\n{Colors.GREEN}[✓] Program details exported to: {filename}{Colors.ENDC}")
-                    print(f"{Colors.YELLOW}[i] You can now use this file with your AI analysis tools{Colors.ENDC}\n")
-                    print(analysis_text)
-
-                except HackerOneError as e:
-                    print(f"{Colors.RED}[!] Error: {e}{Colors.ENDC}")
-
-            else:
-                print(f"{Colors.YELLOW}Unknown option: {choice}{Colors.ENDC}")
+                    client.get_programs_bulk(args.handles)
+                except (HackerOneError, ValueError):
+                    pass
+
+                for handle in args.handles:
+                    try:
+                        analysis_text = export_program(client, handle, args.out_dir)
+                        if print_export:
+                            sys.stdout.write(analysis_text)
+                    except (HackerOneError, ValueError) as e:
+                        print(f"{Colors.RED}[!] Error exporting {handle}: {e}{Colors.ENDC}")
+                return
+
+            # Interactive menu
+            while True:
+                sys.stdout.write(MENU_BANNER)
+                sys.stdout.flush()
+
+                choice = input(f"{Colors.CYAN}[HackerOne] ▶{Colors.ENDC} ").strip().lower()
+
+                if choice in ['q', 'quit', 'exit']:
+                    print(f"\n{Colors.YELLOW}👋 Goodbye!{Colors.ENDC}\n")
+                    break
+
+                elif choice == '1':
+                    # Only page in what is shown (plus one to know if there is more)
+                    programs = list(islice(client.iter_programs(), 21))
+                    print(f"\n{Colors.CYAN}{'═' * 80}{Colors.ENDC}")
+                    print(f"{Colors.BOLD}AVAILABLE PROGRAMS:{Colors.ENDC}\n")
+                    for idx, program in enumerate(programs[:20], 1):  # Show first 20
+                        attrs = program.get("attributes", {})
+                        name = attrs.get("name", "N/A")
+                        handle = attrs.get("handle", "N/A")
+                        bounties = "💰" if attrs.get("offers_bounties", False) else "🏆"
+                        print(f"{idx:3d}. {bounties} {Colors.GREEN}{handle:30s}{Colors.ENDC} | {name}")
+
+                    if len(programs) > 20:
+                        print(f"\n{Colors.YELLOW}... and more programs available{Colors.ENDC}")
+
+                elif choice == '2':
+                    query = input(f"{Colors.CYAN}Search query: {Colors.ENDC}").strip()
+                    if not query:
+                        continue
+
+                    matches = client.search_programs(query)
+                    print(f"\n{Colors.GREEN}[✓] Found {len(matches)} matching programs{Colors.ENDC}\n")
+
+                    for idx, program in enumerate(matches, 1):
+                        attrs = program.get("attributes", {})
+                        name = attrs.get("name", "N/A")
+                        handle = attrs.get("handle", "N/A")
+                        bounties = "💰" if attrs.get("offers_bounties", False) else "🏆"
+                        print(f"{idx}. {bounties} {Colors.GREEN}{handle}{Colors.ENDC} | {name}")
+
+                elif choice == '3':
+                    handle = input(f"{Colors.CYAN}Program handle: {Colors.ENDC}").strip()
+                    if not handle:
+                        continue
+                    if not _HANDLE_RE.match(handle):
+                        print(f"{Colors.RED}[!] Invalid handle: {handle}{Colors.ENDC}")
+                        continue
+
+                    try:
+                        print(client.format_program_details(client.get_program_view(handle)))
+                    except HackerOneError as e:
+                        print(f"{Colors.RED}[!] Error: {e}{Colors.ENDC}")
+
+                elif choice == '4':
+                    handle = input(f"{Colors.CYAN}Program handle: {Colors.ENDC}").strip()
+                    if not handle:
+                        continue
+                    if not _HANDLE_RE.match(handle):
+                        print(f"{Colors.RED}[!] Invalid handle: {handle}{Colors.ENDC}")
+                        continue
+
+                    try:
+                        analysis_text = export_program(client, handle, args.out_dir)
+                        print(f"{Colors.YELLOW}[i] You can now use this file with your AI analysis tools{Colors.ENDC}\n")
+                        if print_export:
+                            sys.stdout.write(analysis_text)
+
+                    except HackerOneError as e:
+                        print(f"{Colors.RED}[!] Error: {e}{Colors.ENDC}")
+
+                else:
+                    print(f"{Colors.YELLOW}Unknown option: {choice}{Colors.ENDC}")
 
     except HackerOneError as e:
         print(f"{Colors.RED}[!] Error: {e}{Colors.ENDC}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for LLM results
+Stores one JSON file per (function, model, input) key with a TTL and an
+optional total size limit, fronted by a bounded in-process LRU of recent entries.
+Entries are plain files, so every process on the host shares them and they
+survive restarts.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+class LLMCache:
+    """File-backed cache of LLM responses keyed by a SHA-256 of the request inputs"""
+
+    DEFAULT_TTL = 7 * 24 * 3600  # 7 days
+    MEMORY_ENTRIES = 1024
+    PRUNE_INTERVAL = 256  # puts between size-limit checks
+
+    def __init__(self, cache_dir: str = os.path.join("sessions", ".cache"), ttl: int = DEFAULT_TTL,
+                 size_limit: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.size_limit = size_limit
+        self._puts = 0
+        # key -> (created, value); repeat lookups skip the file read and JSON parse
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        """Cache configured by LLM_CACHE_DIR, LLM_CACHE_TTL (seconds) and LLM_CACHE_SIZE_LIMIT (bytes)"""
+        return cls(cache_dir=os.getenv("LLM_CACHE_DIR", os.path.join("sessions", ".cache")),
+                   ttl=int(os.getenv("LLM_CACHE_TTL", 24 * 3600)),
+                   size_limit=int(os.getenv("LLM_CACHE_SIZE_LIMIT", 1 << 30)))
+
+    @staticmethod
+    def make_key(fn: str, model: str, text: str) -> str:
+        """Hash the function name, model and whitespace-normalized input"""
+        normalized = " ".join(text.split())
+        blob = json.dumps({"fn": fn, "model": model, "input": normalized}, sort_keys=True)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _remember(self, key: str, created: float, value: str):
+        with self._memory_lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing, unreadable or expired"""
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is not None and time.time() - entry[0] <= self.ttl:
+            return entry[1]
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        created = entry.get("created", 0)
+        if time.time() - created > self.ttl:
+            path.unlink(missing_ok=True)
+            with self._memory_lock:
+                self._memory.pop(key, None)
+            return None
+        value = entry.get("value")
+        if value is not None:
+            self._remember(key, created, value)
+        return value
+
+    def put(self, key: str, value: str):
+        """Store a value, replacing the file atomically so readers never see a partial entry"""
+        created = time.time()
+        # Each writer gets its own temp file, so concurrent puts of one key
+        # (from threads or other processes) can't rename each other's file away
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump({"created": created, "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._remember(key, created, value)
+        self._puts += 1
+        if self.size_limit is not None and self._puts % self.PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def _remove_orphans(self, older_than: float = 0):
+        # Temp files left by writers that died between mkstemp and os.replace
+        now = time.time()
+        for path in self.cache_dir.glob("*.tmp"):
+            try:
+                if now - path.stat().st_mtime >= older_than:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                continue
+
+    def prune(self):
+        """Delete expired entries, then the oldest ones until the directory fits size_limit"""
+        now = time.time()
+        # Skip temp files young enough to belong to a put still in progress
+        self._remove_orphans(older_than=60)
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # removed by another process
+            # put() never rewrites a file in place, so mtime is the entry's creation time
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.size_limit is None or total <= self.size_limit:
+            return
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            with self._memory_lock:
+                self._memory.pop(path.stem, None)
+            total -= size
+            if total <= self.size_limit:
+                break
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._memory_lock:
+            self._memory.clear()
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+        self._remove_orphans()
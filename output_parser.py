@@ -1,71 +1,229 @@
-import json
-from typing import Dict, Any, Optional
+import io
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Union
+
+# orjson is a drop-in, much faster loads() for JSON-lines tool output
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+# Resolved once so per-line decoding skips the module attribute lookup
+_loads = _json.loads
+
+# Prefer the libxml2-backed lxml when installed; the ElementTree API used here is the same
+try:
+    from lxml import etree as ET
+    HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAS_LXML = False
+
+# Per-host lookups for parse_nmap_xml: XPath compiled once and evaluated in C under lxml
+if HAS_LXML:
+    _xp_addresses = ET.XPath('./address')
+    _xp_ports = ET.XPath('.//port')
+    _xp_service = ET.XPath('./service')
+else:
+    def _xp_addresses(host):
+        return host.findall('address')
+
+    def _xp_ports(host):
+        return host.findall('.//port')
+
+    def _xp_service(port):
+        return port.findall('service')
+
+# JSON-lines inputs larger than this are decoded across worker processes, once enabled
+PARALLEL_JSON_THRESHOLD = 2 * 1024 * 1024
+
+# Off by default: every chunk and its records are pickled over IPC, which only pays
+# off for very large outputs. The pool is created on first use and kept for later calls.
+_parallel_workers = 0
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def set_parallel_json(workers: Optional[int] = None):
+    """Decode httpx outputs over PARALLEL_JSON_THRESHOLD across worker processes
+
+    workers defaults to the CPU count; 0 turns parallel decoding off again. Workers
+    are spawned rather than forked, so this is safe from processes running threads.
+    """
+    global _parallel_workers, _pool
+    with _pool_lock:
+        _parallel_workers = (os.cpu_count() or 1) if workers is None else workers
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_parallel_workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _parse_json_lines(data: Union[str, bytes]) -> list:
+    return [_loads(line) for line in data.splitlines() if line.strip()]
+
+def _line_chunks(data: Union[str, bytes], n: int):
+    # Split into about n pieces, cutting only just after a newline
+    newline = b'\n' if isinstance(data, bytes) else '\n'
+    step = len(data) // n
+    start = 0
+    for i in range(1, n):
+        end = data.rfind(newline, start, i * step) + 1
+        if end > start:
+            yield data[start:end]
+            start = end
+    yield data[start:]
+
+# Compiled once at import; "80/tcp  open  http ..." rows of nmap's normal output
+_NMAP_PORT_RE = re.compile(r'^[ \t]*(\d+/tcp)[ \t]+(\S*open\S*)[ \t]+(\S+)', re.MULTILINE)
+
+# Marker tokens for auto-detection, matched in a single scan of the output prefix
+_DETECT_RE = re.compile(r'<nmaprun|nmap|subfinder|"commandline"|"status_code"', re.IGNORECASE)
+
+# Characters that never occur in a bare hostname line
+_NOT_IN_HOSTNAME = frozenset('/: \t')
+
+# Fields kept from each ffuf result, with their defaults
+_FFUF_FIELDS = (
+    ('url', ''), ('status', 0), ('length', 0), ('words', 0),
+    ('lines', 0), ('redirectlocation', ''), ('duration', 0),
+)
 
 class OutputParser:
+    # Parsers that take raw bytes as-is, skipping a full-document decode
+    BYTES_PARSERS = {"httpx", "nmap_xml", "ffuf_json"}
+    # How much of the output auto-detection looks at
+    DETECT_HEAD_SIZE = 4096
+
     @staticmethod
-    def parse(output: str, tool: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        if tool:
-            parser = getattr(OutputParser, f"parse_{tool}", None)
-            if parser:
-                return parser(output)
-        # Auto-detect
-        if "nmap" in output.lower():
-            if "<nmaprun>" in output:
-                return OutputParser.parse_nmap_xml(output)
-            return OutputParser.parse_nmap_simple(output)
-        if "subfinder" in output.lower():
-            return OutputParser.parse_subfinder(output)
+    def parse(output: Union[str, bytes], tool: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        parser = OutputParser._PARSERS.get(tool) if tool else None
+        if parser is None:
+            tool = OutputParser._detect(output)
+            if tool is None:
+                return None
+            parser = OutputParser._PARSERS[tool]
+        # Only text parsers need the whole document decoded
+        if isinstance(output, bytes) and tool not in OutputParser.BYTES_PARSERS:
+            output = output.decode('utf-8', errors='replace')
+        return parser(output)
+
+    @staticmethod
+    def _detect(output: Union[str, bytes]) -> Optional[str]:
+        # Auto-detect from a bounded prefix: only that is decoded, and a multi-byte
+        # character cut at its end is dropped. Every marker token is found in one pass.
+        head = output[:OutputParser.DETECT_HEAD_SIZE]
+        if isinstance(head, bytes):
+            head = head.decode('utf-8', errors='ignore')
+        found = {token.lower() for token in _DETECT_RE.findall(head)}
+        if "<nmaprun" in found:
+            # The root element carries attributes, e.g. <nmaprun scanner="nmap" ...>
+            return "nmap_xml"
+        if "nmap" in found:
+            return "nmap_simple"
+        if "subfinder" in found:
+            return "subfinder"
+        if '"commandline"' in found and head.lstrip()[:1] == '{':
+            return "ffuf_json"
+        if '"status_code"' in found and head.lstrip()[:1] == '{':
+            return "httpx"
+        if OutputParser._looks_like_domain_list(head):
+            return "subfinder"
         # Add more auto-detection rules here
         return None
 
     @staticmethod
-    def parse_nmap_xml(xml_data: str) -> Dict[str, Any]:
+    def _looks_like_domain_list(output: str) -> bool:
+        # Cheap check of the first lines only: bare hostnames with at least two dots. URL
+        # lists (waybackurls, gau) and log lines are ruled out by '/', ':' or whitespace.
+        # split's maxsplit leaves the rest of the output in a final element, sliced off here.
+        lines = [line for line in map(str.strip, output.split('\n', 20)[:20]) if line][:10]
+        hits = sum(1 for line in lines
+                   if line.count('.') >= 2 and _NOT_IN_HOSTNAME.isdisjoint(line)
+                   and not line.startswith(('[', '#', '<')))
+        return hits >= 3
+
+    @staticmethod
+    def parse_nmap_xml(xml_data: Union[str, bytes]) -> Dict[str, Any]:
         # Basic XML parsing, not a full implementation
-        # In a real scenario, use a proper XML parsing library
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(xml_data)
+        # Stream the document so only one <host> subtree is held in memory at a time
         hosts = []
-        for host in root.findall('host'):
+        root = None
+        for event, elem in ET.iterparse(io.BytesIO(xml_data if isinstance(xml_data, bytes) else xml_data.encode()), events=('start', 'end')):
+            if root is None:
+                root = elem
+            if event != 'end' or elem.tag != 'host':
+                continue
+
             host_info = {'addresses': [], 'ports': []}
-            for addr in host.findall('address'):
-                host_info['addresses'].append(addr.attrib)
-            for port in host.findall('.//port'):
-                port_info = port.attrib
-                service = port.find('service')
-                if service is not None:
-                    port_info['service'] = service.attrib
+            for addr in _xp_addresses(elem):
+                host_info['addresses'].append(dict(addr.attrib))
+            for port in _xp_ports(elem):
+                port_info = dict(port.attrib)
+                services = _xp_service(port)
+                if services:
+                    port_info['service'] = dict(services[0].attrib)
                 host_info['ports'].append(port_info)
             hosts.append(host_info)
+
+            # Drop the finished host (and anything before it) from the partial tree
+            root.clear()
         return {"hosts": hosts}
 
     @staticmethod
     def parse_nmap_simple(text_data: str) -> Dict[str, Any]:
+        # Literal prefilter: skip the regex scan when no port rows can be present
         open_ports = []
-        for line in text_data.splitlines():
-            if "/tcp" in line and "open" in line:
-                parts = line.split()
-                port_info = {
-                    "port": parts[0],
-                    "state": parts[1],
-                    "service": parts[2]
-                }
-                open_ports.append(port_info)
+        if "/tcp" in text_data:
+            open_ports = [
+                {"port": port, "state": state, "service": service}
+                for port, state, service in _NMAP_PORT_RE.findall(text_data)
+            ]
         return {"open_ports": open_ports}
 
     @staticmethod
     def parse_subfinder(text_data: str) -> Dict[str, Any]:
-        subdomains = [line.strip() for line in text_data.splitlines() if line.strip()]
+        # Strip each line once (map runs in C); drop blanks and "[INF]"-style log or "#" comment lines
+        subdomains = [line for line in map(str.strip, text_data.splitlines())
+                      if line and line[0] not in '[#']
         return {"subdomains": subdomains}
 
     @staticmethod
-    def parse_httpx(json_data: str) -> Dict[str, Any]:
-        results = []
-        for line in json_data.splitlines():
-            if line.strip():
-                results.append(json.loads(line))
+    def parse_httpx(json_data: Union[str, bytes]) -> Dict[str, Any]:
+        # Both decoders accept bytes lines directly
+        workers = _parallel_workers
+        if workers > 1 and len(json_data) > PARALLEL_JSON_THRESHOLD:
+            # Lines are independent, so big outputs decode in parallel (see set_parallel_json)
+            results = [record for chunk in _get_pool().map(_parse_json_lines, _line_chunks(json_data, workers))
+                       for record in chunk]
+        else:
+            results = _parse_json_lines(json_data)
         return {"httpx_results": results}
 
+    @staticmethod
+    def parse_ffuf_json(json_data: Union[str, bytes]) -> Dict[str, Any]:
+        # ffuf -of json writes one document; keep only the fields we report on, in a single walk
+        data = _loads(json_data)
+        results = [{key: result.get(key, default) for key, default in _FFUF_FIELDS}
+                   for result in data.get('results', ())]
+        return {"ffuf_results": results}
+
+# tool name -> parser, built once from the parse_<tool> static methods
+OutputParser._PARSERS = {
+    name[len("parse_"):]: getattr(OutputParser, name)
+    for name in dir(OutputParser) if name.startswith("parse_")
+}
+
 def parse_file(filepath: str, tool: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    with open(filepath, 'r') as f:
+    # Read raw bytes; parse() only decodes for parsers that need text
+    with open(filepath, 'rb') as f:
         content = f.read()
     return OutputParser.parse(content, tool)
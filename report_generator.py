@@ -1,14 +1,45 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Tuple
 import os
+from collections import Counter
 from datetime import datetime
 
+# Optional compiled templates for the HTML report
+try:
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+    HAS_JINJA2 = True
+except ImportError:
+    HAS_JINJA2 = False
+
+# One-pass HTML escaping for the non-Jinja2 fallback
+_HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+
+def _escape(value: Any) -> str:
+    return str(value).translate(_HTML_ESCAPE)
+
+SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
 class ReportGenerator:
+    def __init__(self):
+        # Templates are compiled once and the bytecode cached on disk across runs
+        self._env = None
+        if HAS_JINJA2:
+            self._env = Environment(
+                loader=FileSystemLoader(TEMPLATES_DIR),
+                auto_reload=False,
+                trim_blocks=True,
+                lstrip_blocks=True,
+                bytecode_cache=FileSystemBytecodeCache(),
+                autoescape=select_autoescape(["html", "j2"]),
+            )
+
     def save_report(self, session_data: Dict[str, Any], format: str = "html") -> str:
-        if format == "markdown":
-            content = self._generate_markdown(session_data)
+        if format in ("markdown", "md"):
+            chunks = self._iter_markdown(session_data)
             ext = "md"
         elif format == "html":
-            content = self._generate_html(session_data)
+            chunks = self._iter_html(session_data)
             ext = "html"
         else:
             raise ValueError(f"Unsupported format: {format}")
@@ -18,57 +49,85 @@ class ReportGenerator:
         filename = f"report_{session_data['session_id']}.{ext}"
         filepath = os.path.join(reports_dir, filename)
 
-        with open(filepath, 'w') as f:
-            f.write(content)
+        # Stream chunks straight to disk instead of joining the whole report first
+        with open(filepath, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(chunks)
 
         return filepath
 
+    @staticmethod
+    def _summarize(findings: List[Dict[str, Any]]) -> Tuple[Counter, List[Dict[str, Any]]]:
+        # Count per severity and order most severe first, shared by both renderers
+        by_severity = Counter(finding.get('severity', 'unknown').lower() for finding in findings)
+        ordered = sorted(findings, key=lambda f: SEVERITY_ORDER.get(f.get('severity', 'info').lower(), 999))
+        return by_severity, ordered
+
+    @staticmethod
+    def _severity_breakdown(by_severity: Counter) -> str:
+        return ", ".join(f"{severity}: {count}" for severity, count in
+                         sorted(by_severity.items(), key=lambda item: SEVERITY_ORDER.get(item[0], 999)))
+
     def _generate_markdown(self, data: Dict[str, Any]) -> str:
-        lines = [f"# Security Report for {data['target']}"]
-        lines.append(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-
-        lines.append("## Executive Summary")
-        lines.append(f"- **Target:** {data['target']}")
-        lines.append(f"- **Program:** {data.get('program', 'N/A')}")
-        lines.append(f"- **Total Findings:** {len(data['findings'])}")
-
-        lines.append("\n## Findings")
-        for finding in data['findings']:
-            lines.append(f"\n### [{finding['severity'].upper()}] {finding['title']}")
-            lines.append(f"- **Tool:** {finding.get('tool', 'N/A')}")
-            lines.append(f"- **Description:** {finding['description']}")
-            if finding.get('evidence'):
-                lines.append(f"**Evidence:**\n```\n{finding['evidence']}\n```")
+        return "".join(self._iter_markdown(data))
+
+    def _iter_markdown(self, data: Dict[str, Any]) -> Iterator[str]:
+        by_severity, findings = self._summarize(data['findings'])
+        yield f"# Security Report for {data['target']}\n"
+        yield f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
 
-        return "\n".join(lines)
+        yield "## Executive Summary\n"
+        yield f"- **Target:** {data['target']}\n"
+        yield f"- **Program:** {data.get('program', 'N/A')}\n"
+        yield f"- **Total Findings:** {len(findings)}\n"
+        if by_severity:
+            yield f"- **By Severity:** {self._severity_breakdown(by_severity)}\n"
+
+        yield "\n## Findings\n"
+        for finding in findings:
+            yield f"\n### [{finding['severity'].upper()}] {finding['title']}\n"
+            yield f"- **Tool:** {finding.get('tool', 'N/A')}\n"
+            yield f"- **Description:** {finding['description']}\n"
+            if finding.get('evidence'):
+                yield f"**Evidence:**\n```\n{finding['evidence']}\n```\n"
 
     def _generate_html(self, data: Dict[str, Any]) -> str:
-        # Basic HTML generation, for a real tool, use a template engine like Jinja2
-        findings_html = ""
-        for finding in data['findings']:
-            findings_html += f"""
-            <div class="finding">
-                <h3>[{finding['severity'].upper()}] {finding['title']}</h3>
-                <p><strong>Tool:</strong> {finding.get('tool', 'N/A')}</p>
-                <p><strong>Description:</strong> {finding['description']}</p>
-            </div>
-            """
+        return "".join(self._iter_html(data))
 
-        html = f"""
+    def _iter_html(self, data: Dict[str, Any]) -> Iterator[str]:
+        generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        by_severity, findings = self._summarize(data['findings'])
+        breakdown = self._severity_breakdown(by_severity)
+        if self._env is not None:
+            yield from self._env.get_template("report.html.j2").generate(
+                data=data, findings=findings, breakdown=breakdown, generated=generated)
+            return
+
+        # Fallback without Jinja2
+        target = _escape(data['target'])
+        yield f"""
         <html>
         <head>
-            <title>Security Report for {data['target']}</title>
+            <title>Security Report for {target}</title>
             <style>
                 body {{ font-family: sans-serif; }}
                 .finding {{ border: 1px solid #ccc; padding: 10px; margin-bottom: 10px; }}
             </style>
         </head>
         <body>
-            <h1>Security Report for {data['target']}</h1>
-            <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            <h1>Security Report for {target}</h1>
+            <p>Generated: {generated}</p>
+            <p>Total Findings: {len(findings)}{f" ({_escape(breakdown)})" if breakdown else ""}</p>
             <h2>Findings</h2>
-            {findings_html}
+            """
+        for finding in findings:
+            yield f"""
+            <div class="finding">
+                <h3>[{_escape(finding['severity'].upper())}] {_escape(finding['title'])}</h3>
+                <p><strong>Tool:</strong> {_escape(finding.get('tool') or 'N/A')}</p>
+                <p><strong>Description:</strong> {_escape(finding['description'])}</p>
+            </div>
+            """
+        yield """
         </body>
         </html>
         """
-        return html
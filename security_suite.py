@@ -1,13 +1,51 @@
 # main.py - Refactored for interaction and command execution
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import subprocess  # For running shell commands
 import shlex       # For safely splitting command strings
-from typing import List, Dict, Optional, Generator, Any, Set
+import signal
+import selectors   # For streaming command output as it arrives
+import codecs
+import io
+import sys
+from typing import Callable, List, Dict, Optional, Generator, Any, Set, FrozenSet, Tuple
 from dotenv import load_dotenv
 import re  # For parsing tool requirements
-import time  # For retry delays
+import time
+from time import sleep  # Retry delays; a module-level name so tests can replace it alone
+import atexit
+import threading
+import hashlib
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import shutil
+import sqlite3
+from functools import cached_property, lru_cache
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional faster JSON encoding/decoding of API payloads
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Resolved once: both accept bytes, orjson.dumps returns bytes ready for the request body
+if HAS_ORJSON:
+    _loads, _dumps = orjson.loads, orjson.dumps
+else:
+    _loads = json.loads
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# Server-sent event markers in the DeepSeek stream, compared as raw bytes
+_SSE_DATA = b'data: '
+_SSE_DONE = b'data: [DONE]'
 
 # Optional HackerOne API integration
 try:
@@ -20,6 +58,7 @@ except ImportError:
 from session_manager import SessionManager
 from output_parser import OutputParser
 from report_generator import ReportGenerator
+from llm_cache import LLMCache
 
 # A single, authoritative list of all tools supported by the suite.
 ALL_TOOLS = [
@@ -66,15 +105,29 @@ def print_banner():
 
 def print_box(title: str, content: str, color: str = Colors.CYAN):
     """Print content in a colored box"""
-    lines = content.split('\n')
-    width = max(len(line) for line in lines) + 4
-
-    print(f"{color}╔{'═' * width}╗")
-    print(f"║{title.center(width)}║")
-    print(f"╠{'═' * width}╣")
-    for line in lines:
-        print(f"║  {line.ljust(width-2)}║")
-    print(f"╚{'═' * width}╝{Colors.ENDC}")
+    lines = content.splitlines() or ['']
+    width = max(map(len, lines)) + 4
+    border = '═' * width
+
+    body = "\n".join(f"║  {line.ljust(width-2)}║" for line in lines)
+    print(f"{color}╔{border}╗\n║{title.center(width)}║\n╠{border}╣\n{body}\n╚{border}╝{Colors.ENDC}")
+
+# Static pieces of the tool status screen, built once
+_H60 = '═' * 60
+_H58 = '═' * 58
+# Horizontal rules and boxed headings reused across menus, built once
+_HR = '─' * 60
+_GREEN_HR = f"{Colors.GREEN}{_HR}{Colors.ENDC}"
+_CYAN_HR = f"{Colors.CYAN}{_HR}{Colors.ENDC}"
+
+@lru_cache(maxsize=64)
+def _title_box(title: str, color: str = Colors.GREEN) -> str:
+    """Boxed heading with a leading blank line, written with one call"""
+    return (f"\n{color}╔{_H58}╗\n"
+            f"║{Colors.BOLD}{title[:58].center(58)}{Colors.ENDC}{color}║\n"
+            f"╚{_H58}╝{Colors.ENDC}\n")
+_AVAILABLE_CELLS = {tool: f"{Colors.GREEN}✓{Colors.ENDC} {tool:15s}" for tool in ALL_TOOLS}
+_MISSING_CELLS = {tool: f"{Colors.RED}✗{Colors.ENDC} {tool:15s}" for tool in ALL_TOOLS}
 
 # --- Custom Exceptions ---
 class DeepSeekError(Exception):
@@ -93,6 +146,11 @@ class DeepSeekResponseError(DeepSeekError):
     """Raised when the API response is malformed or unparseable."""
     pass
 
+# On-disk response cache used by the interactive entry point
+RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "deepseek_suite", "responses.sqlite")
+# Append-only JSONL log of every conversation turn, kept beyond the in-memory window
+HISTORY_LOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "deepseek_suite", "history.jsonl")
+
 # --- Main Class ---
 class DeepSeekSecuritySuite:
     """
@@ -102,7 +160,61 @@ class DeepSeekSecuritySuite:
     
     API_URL = "https://api.deepseek.com/v1/chat/completions"
 
-    def __init__(self, api_key: str, model: str = "deepseek-chat", temperature: float = 0.7, timeout: int = 120, max_retries: int = 3):
+    _SUMMARY_SYSTEM_PROMPT = ("Summarize the conversation excerpt below for use as context in later turns. "
+                              "Fold in the earlier summary if one is given. Keep targets, findings, decisions "
+                              "and open questions; be concise.")
+
+    # Retry backoff: base * 2**attempt seconds, capped, with +/-50% jitter
+    RETRY_BACKOFF_BASE = 2
+    RETRY_BACKOFF_CAP = 30
+
+    # Completions kept in memory; least recently used ones are dropped past this
+    # (with a cache_path they stay in sqlite and are read back on the next hit)
+    RESP_CACHE_MAX_ENTRIES = 256
+
+    _ANALYZE_BOUNTY_SYSTEM_PROMPT = """You are an expert security research assistant. Your task is to analyze the provided bug bounty program text and extract key information into a structured JSON format.
+
+**Instructions:**
+1.  **Carefully read the entire text.** Pay close attention to sections detailing scope, rules, and targets.
+2.  **Extract the following fields:**
+    *   `in_scope_targets`: A list of strings detailing the assets that are explicitly in scope. Look for URLs, domains, applications, and IP ranges.
+    *   `out_of_scope_items`: A list of strings for anything explicitly out of scope.
+    *   `rules_and_restrictions`: A list of strings summarizing the rules of engagement (e.g., "No disruptive testing," "No automated scanners").
+    *   `reward_information`: A brief string summarizing the reward structure. If no specific amounts are mentioned, state that.
+    *   `testing_guidelines`: A list of strings outlining any specific instructions for testing (e.g., required headers, test account creation).
+3.  **Respond ONLY with the JSON object.** Do not include any introductory text, explanations, or markdown formatting.
+"""
+
+    # Invariant instructions for command generation. Kept byte-identical across calls
+    # so the API can reuse its cached prefix; per-call details go in the user turn.
+    _STATIC_PENTEST_SYSTEM_PROMPT = """You are a penetration testing expert. Your task is to generate a list of security testing commands for a given target.
+Use the conversation history for context (e.g., previous bounty analysis).
+Adhere strictly to the following guidelines:
+
+### Tool Usage Guidelines
+
+**Wordlists:**
+- The following wordlists are available at `$HOME/data/wordlists/`. **You must use the full path.**
+- **Web Content:** `web/common.txt`, `web/directory-list-2.3-medium.txt`
+- **Subdomains:** `dns/subdomains-top1million-5000.txt`, `dns/dns-jhaddix.txt`
+
+**Tool Specifics:**
+- **ffuf & gobuster:** The wordlist path is critical. Example: `ffuf -u https://TARGET/FUZZ -w $HOME/data/wordlists/web/common.txt`
+- **httpx:** Use the `-status-code` flag correctly. Do NOT use `-s` or suggest the non-existent `httpx-toolkit`.
+- **nuclei:** Templates are auto-downloaded. Use `-t` with specific template categories like `cves`, `vulnerabilities`, or `technologies`. Example: `nuclei -u https://TARGET -t cves`
+- **testssl.sh:** The command is `testssl.sh`. Example: `testssl.sh https://TARGET`
+- **nmap:** Do not use `-O` (OS detection) as it requires root. Use `-sV -sC`. Avoid overly aggressive scans like `nmap -p- --min-rate 10000`.
+
+**Command Formatting:**
+- Provide ONLY shell commands, one per line.
+- Do not use markdown or explanations.
+- Ensure commands are directly runnable.
+"""
+
+    def __init__(self, api_key: str, model: str = "deepseek-chat", temperature: float = 0.7, timeout: int = 120, max_retries: int = 3,
+                 max_history_turns: int = 6, cache_path: Optional[str] = None,
+                 history_path: Optional[str] = None, summarize_history: bool = False,
+                 llm_cache: Optional[LLMCache] = None, pool_size: int = 16):
         if not api_key:
             raise ValueError("DEEPSEEK_API_KEY is required.")
 
@@ -114,54 +226,236 @@ class DeepSeekSecuritySuite:
         self.temperature = temperature
         self.timeout = timeout
         self.max_retries = max_retries
-        self.conversation_history: List[Dict[str, str]] = []
+        # Connections kept alive to the API; size it to the number of threads making calls,
+        # or connections beyond it are dropped after use and re-handshaked on the next call
+        self.pool_size = pool_size
+        # Request fields that are fixed for the client's lifetime; calls only add "messages"
+        self._payload_template_sync = {"model": model, "temperature": temperature, "stream": False}
+        self._payload_template_stream = {"model": model, "temperature": temperature, "stream": True}
+        # Only the last N user/assistant exchanges (plus the system prompt) are kept and sent
+        self.max_history_turns = max_history_turns
+        # Turns are stored as (role, content) tuples; message dicts are only built for requests
+        self._turns: List[Tuple[str, str]] = []
+        # Turns falling out of the window can be folded into a running summary,
+        # and every turn can be appended to an on-disk JSONL log
+        self.summarize_history = summarize_history
+        self.history_summary: Optional[str] = None
+        self._history_path = history_path
+        if history_path:
+            os.makedirs(os.path.dirname(os.path.abspath(history_path)), exist_ok=True)
+
+        # Stateless analyze_bounty/generate_commands results keyed by their input alone, across sessions
+        self.llm_cache = llm_cache
+
+        # Completions for identical (model, temperature, messages) are reused;
+        # with a cache_path they are also persisted in sqlite across runs
+        self._resp_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._resp_cache_lock = threading.Lock()
+        self._cache_db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._cache_db = sqlite3.connect(cache_path)
+            self._cache_db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+
+    @cached_property
+    def session(self) -> requests.Session:
+        """
+        Keep-alive pool so retries and follow-up calls skip the TLS handshake.
+
+        Built on first request, so clients that never reach the API (cache hits,
+        history-only use) don't pay for it. Retries stay in call_deepseek's own
+        loop, so the adapter doesn't retry.
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0))
+        return session
+
+    def close(self):
+        """Release pooled connections held by the underlying session"""
+        session = self.__dict__.pop("session", None)
+        if session is not None:
+            session.close()
+        if self._cache_db is not None:
+            self._cache_db.close()
+            self._cache_db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _handle_api_error(self, response: requests.Response) -> str:
         try:
-            err_data = response.json()
+            err_data = _loads(response.content)
             msg = err_data.get("error", {}).get("message", response.text)
             return f"API Error ({response.status_code}): {msg}"
         except json.JSONDecodeError:
             return f"API Error ({response.status_code}): {response.text}"
 
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """The stored turns as chat message dicts (a fresh list on every access)."""
+        return [{"role": role, "content": content} for role, content in self._turns]
+
+    @conversation_history.setter
+    def conversation_history(self, messages: List[Dict[str, str]]):
+        self._turns = [(m["role"], m["content"]) for m in messages]
+
+    def _has_system_prompt(self) -> bool:
+        return bool(self._turns) and self._turns[0][0] == 'system'
+
     def set_system_prompt(self, system_prompt: str):
-        if self.conversation_history and self.conversation_history[0]['role'] == 'system':
-            self.conversation_history[0]['content'] = system_prompt
+        if self._has_system_prompt():
+            self._turns[0] = ('system', system_prompt)
         else:
-            self.conversation_history.insert(0, {"role": "system", "content": system_prompt})
+            self._turns.insert(0, ('system', system_prompt))
 
     def clear_history(self):
-        self.conversation_history = []
-
-    def call_deepseek(self, message: str, system_prompt: Optional[str] = None) -> str:
+        self._turns = []
+        self.history_summary = None
+
+    def _windowed_history(self) -> List[Dict[str, str]]:
+        """Return the system prompt (if any), the earlier-turns summary, then the most recent turns."""
+        turns = self._turns
+        start = 1 if self._has_system_prompt() else 0
+        window = turns[:start]
+        if self.history_summary:
+            window.append(('system', f"Earlier summary: {self.history_summary}"))
+        window.extend(turns[max(start, len(turns) - 2 * self.max_history_turns):])
+        return [{"role": role, "content": content} for role, content in window]
+
+    def _record_turn(self, user_message: Dict[str, str], assistant_message: str):
+        turns = self._turns
+        turns.append(('user', user_message["content"]))
+        turns.append(('assistant', assistant_message))
+        if self._history_path:
+            with open(self._history_path, 'ab') as f:
+                f.write(_dumps(user_message) + b"\n" +
+                        _dumps({"role": "assistant", "content": assistant_message}) + b"\n")
+
+        # Trim older turns in place, keeping the system message at index 0
+        start = 1 if turns[0][0] == 'system' else 0
+        evicted = turns[start:len(turns) - 2 * self.max_history_turns]
+        if evicted:
+            del turns[start:len(turns) - 2 * self.max_history_turns]
+            if self.summarize_history:
+                self._summarize_old_turns(evicted)
+
+    def _summarize_old_turns(self, evicted: List[Tuple[str, str]]):
+        """Fold turns leaving the window into history_summary with one small completion."""
+        excerpt = "\n".join(f"{role}: {content}" for role, content in evicted)
+        if self.history_summary:
+            excerpt = f"Earlier summary: {self.history_summary}\n\n{excerpt}"
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": excerpt}
+            ],
+            "temperature": 0,
+            "stream": False
+        }
+        try:
+            self.history_summary = self._complete(payload)
+        except DeepSeekError as e:
+            # Keep the previous summary; the evicted turns are still in the on-disk log
+            print(f"{Colors.YELLOW}[!] Could not summarize earlier turns: {e}{Colors.ENDC}")
+
+    def _retry_wait(self, attempt: int, error: Optional[Exception]) -> float:
+        """Seconds to wait before the next attempt, honoring a server Retry-After hint."""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(max(0.0, float(retry_after)), self.RETRY_BACKOFF_CAP)
+            except (TypeError, ValueError):
+                pass
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                return min(max(0.0, delay), self.RETRY_BACKOFF_CAP)
+            except (TypeError, ValueError):
+                pass
+        # Jitter keeps concurrent callers from retrying in lockstep
+        backoff = min(self.RETRY_BACKOFF_CAP, self.RETRY_BACKOFF_BASE * 2 ** attempt)
+        return backoff * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def _cache_key(body: bytes) -> str:
+        # The request body already pins model, temperature and messages, so the bytes
+        # that are sent are hashed as they are instead of being serialized a second time
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._resp_cache_lock:
+            content = self._resp_cache.get(key)
+            if content is not None:
+                self._resp_cache.move_to_end(key)
+                return content
+        if self._cache_db is not None:
+            row = self._cache_db.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                content = row[0]
+                self._remember_response(key, content)
+        return content
+
+    def _remember_response(self, key: str, content: str):
+        with self._resp_cache_lock:
+            self._resp_cache[key] = content
+            self._resp_cache.move_to_end(key)
+            if len(self._resp_cache) > self.RESP_CACHE_MAX_ENTRIES:
+                self._resp_cache.popitem(last=False)
+
+    def _cache_put(self, key: str, content: str):
+        self._remember_response(key, content)
+        if self._cache_db is not None:
+            with self._cache_db:
+                self._cache_db.execute("INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content))
+
+    def call_deepseek(self, message: str, system_prompt: Optional[str] = None, use_cache: bool = True) -> str:
         if system_prompt:
             self.set_system_prompt(system_prompt)
 
         current_user_message = {"role": "user", "content": message}
-        messages_payload = self.conversation_history + [current_user_message]
+        messages_payload = self._windowed_history() + [current_user_message]
 
-        payload = {
-            "model": self.model,
-            "messages": messages_payload,
-            "temperature": self.temperature,
-            "stream": False
-        }
+        payload = {**self._payload_template_sync, "messages": messages_payload}
+        body = _dumps(payload)
+
+        cache_key = self._cache_key(body) if use_cache else None
+        if cache_key:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._record_turn(current_user_message, cached)
+                return cached
+
+        assistant_message = self._complete(payload, body)
+        if cache_key:
+            self._cache_put(cache_key, assistant_message)
+        self._record_turn(current_user_message, assistant_message)
 
+        return assistant_message
+
+    def _complete(self, payload: Dict[str, Any], body: Optional[bytes] = None) -> str:
+        """POST a non-streaming chat payload with retries and return the assistant content.
+
+        body is the payload already serialized by the caller, if it has it.
+        """
+        if body is None:
+            body = _dumps(payload)
         last_exception = None
         for attempt in range(self.max_retries):
             try:
-                response = requests.post(self.API_URL, headers=self.headers, json=payload, timeout=self.timeout)
+                response = self.session.post(self.API_URL, data=body, timeout=self.timeout)
                 response.raise_for_status()
 
-                result = response.json()
+                result = _loads(response.content)
                 assistant_message = result.get('choices', [{}])[0].get('message', {}).get('content')
 
                 if assistant_message is None:
                     raise DeepSeekResponseError(f"API response missing 'content': {result}")
 
-                self.conversation_history.append(current_user_message)
-                self.conversation_history.append({"role": "assistant", "content": assistant_message})
-
                 return assistant_message
 
             except requests.exceptions.HTTPError as http_err:
@@ -186,9 +480,9 @@ class DeepSeekSecuritySuite:
 
             # If we get here, we need to retry
             if attempt < self.max_retries - 1:
-                wait_time = (2 ** attempt) + 1  # Exponential backoff: 2, 5, 9 seconds
-                print(f"{Colors.YELLOW}[!] Request failed (attempt {attempt + 1}/{self.max_retries}). Retrying in {wait_time}s...{Colors.ENDC}")
-                time.sleep(wait_time)
+                wait_time = self._retry_wait(attempt, last_exception)
+                print(f"{Colors.YELLOW}[!] Request failed (attempt {attempt + 1}/{self.max_retries}). Retrying in {wait_time:.1f}s...{Colors.ENDC}")
+                sleep(wait_time)
 
         # All retries exhausted
         if isinstance(last_exception, requests.exceptions.Timeout):
@@ -207,19 +501,29 @@ class DeepSeekSecuritySuite:
         else:
             raise DeepSeekRequestError(f"API Request failed after {self.max_retries} attempts: {last_exception}") from last_exception
 
-    def stream_call_deepseek(self, message: str, system_prompt: Optional[str] = None) -> Generator[str, None, None]:
-        if system_prompt:
-            self.set_system_prompt(system_prompt)
+    def stream_call_deepseek(self, message: str, system_prompt: Optional[str] = None,
+                             stateless: bool = False,
+                             on_retry: Optional[Callable[[str], None]] = None) -> Generator[str, None, str]:
+        """Yield the reply as it arrives; the generator's return value is the full reply.
 
+        With stateless=True only the system prompt and this message are sent and the
+        history is neither read nor updated, as in _cached_call.
+
+        Retry notices never appear in the yielded text: they go to on_retry, or are
+        printed when it is None. Text yielded before a retry belongs to the failed
+        attempt and the reply starts over after the notice; the return value holds
+        only the final attempt.
+        """
         current_user_message = {"role": "user", "content": message}
-        messages_payload = self.conversation_history + [current_user_message]
+        if stateless:
+            system = [{"role": "system", "content": system_prompt}] if system_prompt else []
+            messages_payload = system + [current_user_message]
+        else:
+            if system_prompt:
+                self.set_system_prompt(system_prompt)
+            messages_payload = self._windowed_history() + [current_user_message]
 
-        payload = {
-            "model": self.model,
-            "messages": messages_payload,
-            "temperature": self.temperature,
-            "stream": True
-        }
+        payload = {**self._payload_template_stream, "messages": messages_payload}
 
         full_response_content = []
         last_exception = None
@@ -228,30 +532,34 @@ class DeepSeekSecuritySuite:
             try:
                 # Use longer timeout for streaming (3x base timeout)
                 stream_timeout = self.timeout * 3
-                with requests.post(self.API_URL, headers=self.headers, json=payload, timeout=stream_timeout, stream=True) as response:
+                with self.session.post(self.API_URL, data=_dumps(payload), timeout=stream_timeout, stream=True) as response:
                     response.raise_for_status()
-                    for line in response.iter_lines():
-                        if line:
-                            decoded_line = line.decode('utf-8')
-                            if decoded_line.startswith('data: '):
-                                json_data = decoded_line[6:]
-                                if json_data.strip() == '[DONE]':
-                                    break
-                                try:
-                                    chunk = json.loads(json_data)
-                                    content = chunk.get('choices', [{}])[0].get('delta', {}).get('content')
-                                    if content:
-                                        full_response_content.append(content)
-                                        yield content
-                                except json.JSONDecodeError as json_err:
-                                    raise DeepSeekResponseError(f"Stream Error: Invalid JSON chunk: {json_data}") from json_err
+                    # SSE lines are matched as bytes; only the JSON payload gets decoded
+                    for line in response.iter_lines(chunk_size=65536):
+                        # Blank keep-alives and ': heartbeat' comments are skipped first
+                        if not line or line[:1] == b':':
+                            continue
+                        if line == _SSE_DONE:
+                            break
+                        if line[:6] == _SSE_DATA:
+                            json_data = line[6:]
+                            if json_data.strip() == b'[DONE]':
+                                break
+                            try:
+                                chunk = _loads(json_data)
+                                content = chunk.get('choices', [{}])[0].get('delta', {}).get('content')
+                                if content:
+                                    full_response_content.append(content)
+                                    yield content
+                            except (json.JSONDecodeError, UnicodeDecodeError) as json_err:
+                                raise DeepSeekResponseError(
+                                    f"Stream Error: Invalid JSON chunk: {json_data.decode('utf-8', 'replace')}") from json_err
 
                 assistant_message = "".join(full_response_content)
-                if assistant_message:
-                    self.conversation_history.append(current_user_message)
-                    self.conversation_history.append({"role": "assistant", "content": assistant_message})
+                if assistant_message and not stateless:
+                    self._record_turn(current_user_message, assistant_message)
 
-                return  # Success, exit retry loop
+                return assistant_message  # Success, exit retry loop
 
             except requests.exceptions.HTTPError as http_err:
                 # Don't retry on 4xx client errors (except 429 rate limit)
@@ -272,9 +580,13 @@ class DeepSeekSecuritySuite:
 
             # If we get here, we need to retry
             if attempt < self.max_retries - 1:
-                wait_time = (2 ** attempt) + 1  # Exponential backoff: 2, 5, 9 seconds
-                yield f"\n{Colors.YELLOW}[!] Stream failed (attempt {attempt + 1}/{self.max_retries}). Retrying in {wait_time}s...{Colors.ENDC}\n"
-                time.sleep(wait_time)
+                wait_time = self._retry_wait(attempt, last_exception)
+                notice = f"Stream failed (attempt {attempt + 1}/{self.max_retries}). Retrying in {wait_time:.1f}s..."
+                if on_retry is not None:
+                    on_retry(notice)
+                else:
+                    print(f"\n{Colors.YELLOW}[!] {notice}{Colors.ENDC}")
+                sleep(wait_time)
                 full_response_content = []  # Reset for retry
 
         # All retries exhausted
@@ -294,67 +606,187 @@ class DeepSeekSecuritySuite:
         else:
             raise DeepSeekRequestError(f"API Stream failed after {self.max_retries} attempts: {last_exception}") from last_exception
 
-    def analyze_bounty(self, bounty_text: str) -> str:
-        system_prompt = """You are an expert security research assistant. Your task is to analyze the provided bug bounty program text and extract key information into a structured JSON format.
-
-**Instructions:**
-1.  **Carefully read the entire text.** Pay close attention to sections detailing scope, rules, and targets.
-2.  **Extract the following fields:**
-    *   `in_scope_targets`: A list of strings detailing the assets that are explicitly in scope. Look for URLs, domains, applications, and IP ranges.
-    *   `out_of_scope_items`: A list of strings for anything explicitly out of scope.
-    *   `rules_and_restrictions`: A list of strings summarizing the rules of engagement (e.g., "No disruptive testing," "No automated scanners").
-    *   `reward_information`: A brief string summarizing the reward structure. If no specific amounts are mentioned, state that.
-    *   `testing_guidelines`: A list of strings outlining any specific instructions for testing (e.g., required headers, test account creation).
-3.  **Respond ONLY with the JSON object.** Do not include any introductory text, explanations, or markdown formatting.
-"""
-        
-        return self.call_deepseek(f"Analyze this bounty program:\n{bounty_text}", system_prompt)
+    def analyze_bounty(self, bounty_text: str, stateless: bool = False) -> str:
+        return self._cached_call("analyze_bounty", bounty_text,
+                                 f"Analyze this bounty program:\n{bounty_text}", self._ANALYZE_BOUNTY_SYSTEM_PROMPT,
+                                 stateless)
+
+    def stream_analyze_bounty(self, bounty_text: str, stateless: bool = False,
+                              on_retry: Optional[Callable[[str], None]] = None) -> Generator[str, None, str]:
+        """Streaming analyze_bounty: yields text as it arrives and returns and caches the full response."""
+        return (yield from self._cached_stream("analyze_bounty", bounty_text,
+                                               f"Analyze this bounty program:\n{bounty_text}",
+                                               self._ANALYZE_BOUNTY_SYSTEM_PROMPT, stateless, on_retry))
     
-    def generate_commands(self, target: str, available_tools: Optional[Set[str]] = None) -> str:
-        # Build a list of available tools for the AI
-        tools_info = ""
-        if available_tools:
-            tools_info = f"\n\nIMPORTANT: Only suggest commands using these available tools: {', '.join(sorted(available_tools))}"
-
-        # Provide correct wordlist paths and tool usage guidelines
-        tool_guidelines = """
-### Tool Usage Guidelines
-
-**Wordlists:**
-- The following wordlists are available at `$HOME/data/wordlists/`. **You must use the full path.**
-- **Web Content:** `web/common.txt`, `web/directory-list-2.3-medium.txt`
-- **Subdomains:** `dns/subdomains-top1million-5000.txt`, `dns/dns-jhaddix.txt`
-
-**Tool Specifics:**
-- **ffuf & gobuster:** The wordlist path is critical. Example: `ffuf -u https://TARGET/FUZZ -w $HOME/data/wordlists/web/common.txt`
-- **httpx:** Use the `-status-code` flag correctly. Do NOT use `-s` or suggest the non-existent `httpx-toolkit`.
-- **nuclei:** Templates are auto-downloaded. Use `-t` with specific template categories like `cves`, `vulnerabilities`, or `technologies`. Example: `nuclei -u https://TARGET -t cves`
-- **testssl.sh:** The command is `testssl.sh`. Example: `testssl.sh https://TARGET`
-- **nmap:** Do not use `-O` (OS detection) as it requires root. Use `-sV -sC`. Avoid overly aggressive scans like `nmap -p- --min-rate 10000`.
-
-**Command Formatting:**
-- Provide ONLY shell commands, one per line.
-- Do not use markdown or explanations.
-- Ensure commands are directly runnable.
-"""
-
-        system_prompt = f"""You are a penetration testing expert. Your task is to generate a list of security testing commands for a given target.
-Use the conversation history for context (e.g., previous bounty analysis).
-Adhere strictly to the following guidelines:{tools_info}
-{tool_guidelines}
-"""
+    # A batched reply holds every analysis in one completion, which DeepSeek caps at 8K
+    # tokens, so each request carries at most _BATCH_MAX_TOKENS // _BATCH_TOKENS_PER_ANALYSIS
+    # programs and at most _BATCH_MAX_CHARS of program text
+    _BATCH_TOKENS_PER_ANALYSIS = 1024
+    _BATCH_MAX_TOKENS = 8192
+    _BATCH_MAX_CHARS = 48 * 1024
+
+    def analyze_bounties(self, bounty_texts: List[str], stateless: bool = False) -> List[str]:
+        """Analyze several bounty programs in few requests; returns one JSON analysis per text, in order.
+
+        Stateless calls serve texts already in llm_cache from it; the rest are packed into JSON-mode
+        completions, each recorded in the history as one turn (unless stateless). If a batched
+        reply can't be parsed (e.g. it was cut off), its programs are analyzed one by one instead.
+        """
+        results: List[Optional[str]] = [None] * len(bounty_texts)
+        # llm_cache keys on the text alone, so it only holds answers given without history
+        cache = self.llm_cache if stateless else None
+        keys = [LLMCache.make_key("analyze_bounty", self.model, text) for text in bounty_texts]
+        if cache is not None:
+            results = [cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        for group in self._batch_groups([bounty_texts[i] for i in pending]):
+            indexes = [pending[n] for n in group]
+            texts = [bounty_texts[i] for i in indexes]
+            if len(texts) > 1:
+                try:
+                    analyses = self._analyze_batch(texts, stateless)
+                except DeepSeekResponseError:
+                    pass
+                else:
+                    for i, analysis in zip(indexes, analyses):
+                        results[i] = analysis
+                        if cache is not None:
+                            cache.put(keys[i], analysis)
+                    continue
+            for i, text in zip(indexes, texts):
+                results[i] = self.analyze_bounty(text, stateless)
+        return results
+
+    def _batch_groups(self, texts: List[str]) -> List[List[int]]:
+        """Split positions in texts into consecutive groups within the per-request size limits"""
+        max_items = self._BATCH_MAX_TOKENS // self._BATCH_TOKENS_PER_ANALYSIS
+        groups: List[List[int]] = []
+        chars = 0
+        for n, text in enumerate(texts):
+            if not groups or len(groups[-1]) >= max_items or chars + len(text) > self._BATCH_MAX_CHARS:
+                groups.append([])
+                chars = 0
+            groups[-1].append(n)
+            chars += len(text)
+        return groups
+
+    def _analyze_batch(self, texts: List[str], stateless: bool) -> List[str]:
+        sections = "\n\n".join(f"### PROGRAM {n}\n{text}" for n, text in enumerate(texts, 1))
+        message = (f"Analyze each of the following {len(texts)} bounty programs. Respond with a JSON object "
+                   f"whose \"analyses\" key is an array of {len(texts)} analyses, one per program in order.\n\n"
+                   f"{sections}")
+        current_user_message = {"role": "user", "content": message}
+        if stateless:
+            history = [{"role": "system", "content": self._ANALYZE_BOUNTY_SYSTEM_PROMPT}]
+        else:
+            self.set_system_prompt(self._ANALYZE_BOUNTY_SYSTEM_PROMPT)
+            history = self._windowed_history()
+        payload = {**self._payload_template_sync, "response_format": {"type": "json_object"},
+                   "max_tokens": min(self._BATCH_MAX_TOKENS, self._BATCH_TOKENS_PER_ANALYSIS * len(texts)),
+                   "messages": history + [current_user_message]}
+        content = self._complete(payload)
 
-        return self.call_deepseek(f"Suggest security testing commands for: {target}", system_prompt)
+        try:
+            analyses = _loads(content)["analyses"]
+        except (ValueError, KeyError, TypeError) as parse_err:
+            raise DeepSeekResponseError(f"Batched analysis is not a JSON object with 'analyses': {parse_err}") from parse_err
+        if not isinstance(analyses, list) or len(analyses) != len(texts):
+            raise DeepSeekResponseError(f"Expected {len(texts)} analyses, got {len(analyses) if isinstance(analyses, list) else analyses!r}")
+        if not stateless:
+            self._record_turn(current_user_message, content)
+        return [analysis if isinstance(analysis, str) else _dumps(analysis).decode('utf-8') for analysis in analyses]
+
+    @staticmethod
+    def _commands_request(target: str, available_tools: Optional[Set[str]] = None) -> str:
+        # Per-call details go in the user turn so the system prompt prefix stays cacheable
+        request = f"Suggest security testing commands for: {target}"
+        if available_tools:
+            request = (f"IMPORTANT: Only suggest commands using these available tools: "
+                       f"{', '.join(sorted(available_tools))}\n\n{request}")
+        return request
+
+    def generate_commands(self, target: str, available_tools: Optional[Set[str]] = None,
+                          stateless: bool = False) -> str:
+        request = self._commands_request(target, available_tools)
+        return self._cached_call("generate_commands", request, request, self._STATIC_PENTEST_SYSTEM_PROMPT,
+                                 stateless)
+
+    def stream_generate_commands(self, target: str, available_tools: Optional[Set[str]] = None,
+                                 stateless: bool = False,
+                                 on_retry: Optional[Callable[[str], None]] = None) -> Generator[str, None, str]:
+        """Streaming generate_commands: yields text as it arrives and returns and caches the full response."""
+        request = self._commands_request(target, available_tools)
+        return (yield from self._cached_stream("generate_commands", request, request,
+                                               self._STATIC_PENTEST_SYSTEM_PROMPT, stateless, on_retry))
+
+    def _cached_call(self, fn: str, cache_input: str, message: str, system_prompt: str,
+                     stateless: bool = False) -> str:
+        """call_deepseek, or a stateless completion short-circuited through llm_cache.
+
+        With stateless=True the request carries only the system prompt and this message
+        and the history is neither read nor updated, so concurrent callers (e.g. web
+        request threads sharing one suite) can overlap safely. Only those replies are
+        keyed by cache_input alone in llm_cache; stateful replies also depend on the
+        history, so they are cached by call_deepseek on the full request instead.
+        """
+        if not stateless:
+            return self.call_deepseek(message, system_prompt)
+
+        key = LLMCache.make_key(fn, self.model, cache_input) if self.llm_cache is not None else None
+        cached = self.llm_cache.get(key) if key else None
+        if cached is not None:
+            return cached
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": message}]
+        result = self._complete({**self._payload_template_sync, "messages": messages})
+        if key:
+            self.llm_cache.put(key, result)
+        return result
+
+    def _cached_stream(self, fn: str, cache_input: str, message: str, system_prompt: str,
+                       stateless: bool = False,
+                       on_retry: Optional[Callable[[str], None]] = None) -> Generator[str, None, str]:
+        """stream_call_deepseek, short-circuited through llm_cache for stateless calls like _cached_call."""
+        if self.llm_cache is None or not stateless:
+            return (yield from self.stream_call_deepseek(message, system_prompt, stateless, on_retry))
+
+        key = LLMCache.make_key(fn, self.model, cache_input)
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return cached
+
+        # Cache the returned reply rather than the yielded text, which may span a failed attempt
+        assistant_message = yield from self.stream_call_deepseek(message, system_prompt, stateless, on_retry)
+        if assistant_message:
+            self.llm_cache.put(key, assistant_message)
+        return assistant_message
+
+    def generate_commands_bulk(self, targets: List[str], available_tools: Optional[Set[str]] = None,
+                               max_workers: int = 4) -> Dict[str, str]:
+        """Generate commands for several targets concurrently over the pooled session.
+
+        Each target gets its own stateless completion built from a snapshot of the
+        current history, so the requests can overlap; the history is not updated.
+        """
+        base = self._windowed_history()
+        if self._has_system_prompt():
+            base = base[1:]
+        base.insert(0, {"role": "system", "content": self._STATIC_PENTEST_SYSTEM_PROMPT})
+
+        def complete(target: str) -> str:
+            messages = base + [{"role": "user", "content": self._commands_request(target, available_tools)}]
+            return self._complete({**self._payload_template_sync, "messages": messages})
+
+        self.session  # create the lazy session once, before the workers race for it
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+            return dict(zip(targets, pool.map(complete, targets)))
 
 # --- Tool Management Functions ---
 
 def check_tool_available(tool_name: str) -> bool:
     """Check if a tool is available in the system PATH."""
-    try:
-        result = subprocess.run(['which', tool_name], capture_output=True, text=True, timeout=5)
-        return result.returncode == 0
-    except:
-        return False
+    return shutil.which(tool_name) is not None
 
 def install_tool(tool_name: str) -> bool:
     """Attempt to install a missing tool, with special handling for certain tools."""
@@ -449,23 +881,32 @@ def install_tool(tool_name: str) -> bool:
 
     return False
 
-def get_available_tools() -> Set[str]:
-    """Get a set of all available security tools."""
-    return {tool for tool in ALL_TOOLS if check_tool_available(tool)}
+# Reused for every PATH rescan; threads start lazily on the first submit
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2))
+atexit.register(_TOOL_EXECUTOR.shutdown)
+
+@lru_cache(maxsize=1)
+def get_available_tools() -> FrozenSet[str]:
+    """Get a set of all available security tools (cached; see get_available_tools.cache_clear)."""
+    futures = {tool: _TOOL_EXECUTOR.submit(check_tool_available, tool) for tool in ALL_TOOLS}
+    return frozenset(tool for tool, future in futures.items() if future.result())
 
+def prefetch_available_tools():
+    """Warm the get_available_tools cache in the background so callers find it ready."""
+    threading.Thread(target=get_available_tools, name="tool-scan", daemon=True).start()
+
+@lru_cache(maxsize=512)
 def extract_tool_from_command(command: str) -> str:
     """Extract the tool name from a command string."""
-    parts = command.strip().split()
-    if not parts:
+    # First whitespace-separated word, then its last path component,
+    # e.g. ~/tools/testssl.sh/testssl.sh -> testssl.sh
+    head = command.split(None, 1)
+    if not head:
         return ""
-
-    tool = parts[0]
-    # Handle paths like ~/tools/testssl.sh/testssl.sh
-    if '/' in tool:
-        tool = tool.split('/')[-1]
+    tool = head[0].rpartition('/')[2]
     # If the tool is 'testssl.sh', keep the extension. Otherwise, remove it.
     if tool != 'testssl.sh':
-        tool = tool.replace('.sh', '').replace('.py', '')
+        tool = tool.removesuffix('.sh').removesuffix('.py')
     return tool
 
 def filter_commands_by_availability(commands: str, available_tools: Set[str]) -> tuple[List[str], List[str]]:
@@ -505,6 +946,94 @@ def get_multiline_input(prompt: str) -> str:
             break
     return "\n".join(lines)
 
+# Per-command timeout overrides, compiled once; the first matching rule wins
+_TIMEOUT_RULES = [
+    (re.compile(r'nmap -p-|--script vuln'), 300, "Extended timeout: {timeout}s (full scan)"),
+    (re.compile(r'waybackurls|gau '), 240, "Extended timeout: {timeout}s (archive fetching)"),
+    (re.compile(r'nuclei'), 180, "Extended timeout: {timeout}s (nuclei scan)"),
+    (re.compile(r'amass'), 240, "Extended timeout: {timeout}s (amass enum)"),
+    (re.compile(r'nmap'), 120, "Timeout: {timeout}s"),
+    (re.compile(r'ffuf|gobuster dir'), 180, "Extended timeout: {timeout}s (fuzzing)"),
+]
+
+# Characters that only mean something to a shell when they appear unquoted
+_SHELL_PUNCTUATION = frozenset('|&;<>()')
+
+def needs_shell(cmd: str) -> bool:
+    """
+    True if the command uses pipes, redirects, command lists or expansions that need
+    /bin/sh. Quoted metacharacters (e.g. grep 'a|b') don't count.
+    """
+    if '$' in cmd or '`' in cmd:
+        return True
+    lexer = shlex.shlex(cmd, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        # Unbalanced quotes; let the shell report it
+        return True
+    return any(token[:1] == '~' or (token and set(token) <= _SHELL_PUNCTUATION) for token in tokens)
+
+# Only the tail of stderr is kept for the session log; stdout is kept whole for the parsers
+STDERR_TAIL_LINES = 200
+
+def run_streaming(cmd, timeout: int, shell: bool = False) -> subprocess.CompletedProcess:
+    """
+    Run a command, echoing stdout/stderr to the terminal as it arrives.
+    Returns a CompletedProcess holding the full stdout and the last STDERR_TAIL_LINES
+    lines of stderr. Kills the process and raises subprocess.TimeoutExpired on timeout.
+    """
+    stdout_chunks: List[str] = []
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_partial = ""
+    decoders = {name: codecs.getincrementaldecoder('utf-8')('replace') for name in ('stdout', 'stderr')}
+    deadline = time.monotonic() + timeout
+
+    # Own process group, so a timeout or Ctrl-C also stops pipeline members and children
+    with subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          start_new_session=True) as proc:
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(proc.stdout, selectors.EVENT_READ, 'stdout')
+                selector.register(proc.stderr, selectors.EVENT_READ, 'stderr')
+                while selector.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(cmd, timeout)
+                    for key, _ in selector.select(timeout=remaining):
+                        data = os.read(key.fd, 65536)
+                        if not data:
+                            selector.unregister(key.fileobj)
+                            text = decoders[key.data].decode(b'', final=True)
+                        else:
+                            text = decoders[key.data].decode(data)
+                        if not text:
+                            continue
+                        if key.data == 'stdout':
+                            stdout_chunks.append(text)
+                            sys.stdout.write(text)
+                        else:
+                            sys.stdout.write(f"{Colors.YELLOW}{text}{Colors.ENDC}")
+                            lines = (stderr_partial + text).split('\n')
+                            stderr_partial = lines.pop()
+                            stderr_tail.extend(lines)
+                        sys.stdout.flush()
+            returncode = proc.wait(timeout=max(0, deadline - time.monotonic()))
+        except BaseException:
+            # TimeoutExpired or KeyboardInterrupt: the group is detached from the terminal,
+            # so it has to be killed explicitly
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+            raise
+
+    if stderr_partial:
+        stderr_tail.append(stderr_partial)
+    return subprocess.CompletedProcess(cmd, returncode, "".join(stdout_chunks), "\n".join(stderr_tail))
+
 def run_generated_commands(command_string: str, session_manager: Optional[SessionManager] = None, output_parser: Optional[OutputParser] = None, check_availability: bool = True, default_timeout: int = 120):
     """
     Parses a string of commands (one per line) and asks the user to
@@ -535,8 +1064,12 @@ def run_generated_commands(command_string: str, session_manager: Optional[Sessio
     # Check tool availability
     if check_availability:
         print(f"{Colors.YELLOW}[*] Checking tool availability...{Colors.ENDC}")
-        available_tools = get_available_tools()
-        available_cmds, unavailable_cmds = filter_commands_by_availability(command_string, available_tools)
+        available_tools = set(get_available_tools())
+        # With the full toolchain installed there is nothing to filter out
+        if {extract_tool_from_command(cmd) for cmd in commands} <= available_tools:
+            available_cmds, unavailable_cmds = commands, []
+        else:
+            available_cmds, unavailable_cmds = filter_commands_by_availability(command_string, available_tools)
 
         if unavailable_cmds:
             print(f"\n{Colors.YELLOW}⚠️  Warning: {len(unavailable_cmds)} command(s) use unavailable tools:{Colors.ENDC}")
@@ -550,6 +1083,7 @@ def run_generated_commands(command_string: str, session_manager: Optional[Sessio
                     tool = extract_tool_from_command(cmd)
                     if install_tool(tool):
                         available_tools.add(tool)
+                get_available_tools.cache_clear()
 
                 # Re-filter commands after installation
                 available_cmds, unavailable_cmds = filter_commands_by_availability(command_string, available_tools)
@@ -563,7 +1097,7 @@ def run_generated_commands(command_string: str, session_manager: Optional[Sessio
     for i, cmd in enumerate(commands, 1):
         print(f"  {Colors.CYAN}{i:2d}.{Colors.ENDC} {cmd}")
 
-    print(f"\n{Colors.GREEN}{'─' * 60}{Colors.ENDC}")
+    print(f"\n{_GREEN_HR}")
     
     try:
         choice = input("Do you want to run these commands? (all/one/N) [N]: ").strip().lower()
@@ -578,46 +1112,26 @@ def run_generated_commands(command_string: str, session_manager: Optional[Sessio
                     print("Command skipped.")
                     continue
             
-            print(f"\n{Colors.YELLOW}{'─' * 60}")
-            print(f"▶️  Executing: {Colors.CYAN}{cmd}{Colors.ENDC}")
-            print(f"{'─' * 60}{Colors.ENDC}")
+            sys.stdout.write(f"\n{Colors.YELLOW}{_HR}\n▶️  Executing: {Colors.CYAN}{cmd}{Colors.ENDC}\n{_HR}{Colors.ENDC}\n")
 
             # Determine timeout based on command
             timeout = default_timeout
-            if 'nmap -p-' in cmd or '--script vuln' in cmd:
-                timeout = 300  # 5 minutes for full scans
-                print(f"{Colors.YELLOW}⏱️  Extended timeout: {timeout}s (full scan){Colors.ENDC}")
-            elif 'waybackurls' in cmd or 'gau ' in cmd:
-                timeout = 240  # 4 minutes for wayback/archive fetching
-                print(f"{Colors.YELLOW}⏱️  Extended timeout: {timeout}s (archive fetching){Colors.ENDC}")
-            elif 'nuclei' in cmd:
-                timeout = 180  # 3 minutes for nuclei
-                print(f"{Colors.YELLOW}⏱️  Extended timeout: {timeout}s (nuclei scan){Colors.ENDC}")
-            elif 'amass' in cmd:
-                timeout = 240  # 4 minutes for amass subdomain enumeration
-                print(f"{Colors.YELLOW}⏱️  Extended timeout: {timeout}s (amass enum){Colors.ENDC}")
-            elif 'nmap' in cmd:
-                timeout = 120  # 2 minutes for regular nmap
-                print(f"{Colors.YELLOW}⏱️  Timeout: {timeout}s{Colors.ENDC}")
-            elif 'ffuf' in cmd or 'gobuster dir' in cmd:
-                timeout = 180  # 3 minutes for directory fuzzing
-                print(f"{Colors.YELLOW}⏱️  Extended timeout: {timeout}s (fuzzing){Colors.ENDC}")
+            for pattern, rule_timeout, label in _TIMEOUT_RULES:
+                if pattern.search(cmd):
+                    timeout = rule_timeout
+                    print(f"{Colors.YELLOW}⏱️  {label.format(timeout=timeout)}{Colors.ENDC}")
+                    break
 
             try:
                 # Use shlex.split to handle quotes and arguments safely
-                # Handle pipes and redirects by using shell=True for complex commands
-                if '|' in cmd or '>' in cmd or '<' in cmd:
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+                # Handle pipes, redirects and expansions by using shell=True for complex commands
+                # Output is echoed live while the command runs
+                print()
+                if needs_shell(cmd):
+                    result = run_streaming(cmd, timeout, shell=True)
                 else:
                     args = shlex.split(cmd)
-                    result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
-
-                if result.stdout:
-                    print(f"\n{Colors.GREEN}[stdout]{Colors.ENDC}")
-                    print(result.stdout)
-                if result.stderr:
-                    print(f"\n{Colors.YELLOW}[stderr]{Colors.ENDC}")
-                    print(result.stderr)
+                    result = run_streaming(args, timeout)
 
                 status_color = Colors.GREEN if result.returncode == 0 else Colors.RED
                 print(f"\n{status_color}[Exit Code: {result.returncode}]{Colors.ENDC}")
@@ -663,26 +1177,30 @@ def run_generated_commands(command_string: str, session_manager: Optional[Sessio
 
 def show_tool_status():
     """Display available and missing tools."""
-    print(f"\n{Colors.CYAN}{'═' * 60}")
-    print(f"║{Colors.BOLD}{'TOOL STATUS'.center(58)}{Colors.ENDC}{Colors.CYAN}║")
-    print(f"{'═' * 60}{Colors.ENDC}\n")
-
+    # The whole screen is buffered and written once, ahead of the install prompt
+    buf = io.StringIO()
+    buf.write(f"\n{Colors.CYAN}{_H60}\n")
+    buf.write(f"║{Colors.BOLD}{'TOOL STATUS'.center(58)}{Colors.ENDC}{Colors.CYAN}║\n")
+    buf.write(f"{_H60}{Colors.ENDC}\n\n")
+
+    # The status screen always rescans PATH, e.g. after installing tools by hand
+    get_available_tools.cache_clear()
     available_tools = get_available_tools()
 
-    print(f"{Colors.GREEN}✓ Available Tools ({len(available_tools)}):{Colors.ENDC}")
+    buf.write(f"{Colors.GREEN}✓ Available Tools ({len(available_tools)}):{Colors.ENDC}\n")
     cols = 3
     available_list = sorted(available_tools)
     for i in range(0, len(available_list), cols):
-        row = available_list[i:i+cols]
-        print("  " + "  ".join(f"{Colors.GREEN}✓{Colors.ENDC} {tool:15s}" for tool in row))
+        buf.write("  " + "  ".join([_AVAILABLE_CELLS[tool] for tool in available_list[i:i+cols]]) + "\n")
 
-    missing = set(all_tools) - available_tools
+    missing = set(ALL_TOOLS) - available_tools
     if missing:
-        print(f"\n{Colors.RED}✗ Missing Tools ({len(missing)}):{Colors.ENDC}")
+        buf.write(f"\n{Colors.RED}✗ Missing Tools ({len(missing)}):{Colors.ENDC}\n")
         missing_list = sorted(missing)
         for i in range(0, len(missing_list), cols):
-            row = missing_list[i:i+cols]
-            print("  " + "  ".join(f"{Colors.RED}✗{Colors.ENDC} {tool:15s}" for tool in row))
+            buf.write("  " + "  ".join([_MISSING_CELLS[tool] for tool in missing_list[i:i+cols]]) + "\n")
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
         install_choice = input("Attempt to install all missing tools? (y/N): ").strip().lower()
         if install_choice == 'y':
@@ -692,8 +1210,27 @@ def show_tool_status():
             # Re-run status check
             show_tool_status()
             return
-
-    print(f"\n{Colors.CYAN}{'═' * 60}{Colors.ENDC}\n")
+        buf = io.StringIO()
+
+    buf.write(f"\n{Colors.CYAN}{_H60}{Colors.ENDC}\n\n")
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
+
+def _render_session_menu() -> str:
+    buf = io.StringIO()
+    buf.write(f"\n{Colors.CYAN}╔{_H58}╗\n")
+    buf.write(f"║{Colors.BOLD}{'SESSION MANAGEMENT'.center(58)}{Colors.ENDC}{Colors.CYAN}║\n")
+    buf.write(f"╠{_H58}╣\n")
+    buf.write(f"║  {Colors.GREEN}[1]{Colors.ENDC} Create New Session".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[2]{Colors.ENDC} Load Session".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[3]{Colors.ENDC} List Sessions".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[4]{Colors.ENDC} Delete Session".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[5]{Colors.ENDC} Show Session Summary".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.RED}[b]{Colors.ENDC} Back to Main Menu".ljust(67) + "║\n")
+    buf.write(f"╚{_H58}╝{Colors.ENDC}\n\n")
+    return buf.getvalue()
+
+SESSION_MENU = _render_session_menu()
 
 def session_management_menu(session_manager: SessionManager):
     """Display and handle the session management menu."""
@@ -702,16 +1239,8 @@ def session_management_menu(session_manager: SessionManager):
         return
 
     while True:
-        print(f"\n{Colors.CYAN}╔{'═' * 58}╗")
-        print(f"║{Colors.BOLD}{'SESSION MANAGEMENT'.center(58)}{Colors.ENDC}{Colors.CYAN}║")
-        print(f"╠{'═' * 58}╣")
-        print(f"║  {Colors.GREEN}[1]{Colors.ENDC} Create New Session".ljust(67) + "║")
-        print(f"║  {Colors.GREEN}[2]{Colors.ENDC} Load Session".ljust(67) + "║")
-        print(f"║  {Colors.GREEN}[3]{Colors.ENDC} List Sessions".ljust(67) + "║")
-        print(f"║  {Colors.GREEN}[4]{Colors.ENDC} Delete Session".ljust(67) + "║")
-        print(f"║  {Colors.GREEN}[5]{Colors.ENDC} Show Session Summary".ljust(67) + "║")
-        print(f"║  {Colors.RED}[b]{Colors.ENDC} Back to Main Menu".ljust(67) + "║")
-        print(f"╚{'═' * 58}╝{Colors.ENDC}\n")
+        sys.stdout.write(SESSION_MENU)
+        sys.stdout.flush()
 
         choice = input(f"{Colors.CYAN}[{Colors.GREEN}Session{Colors.CYAN}] ▶{Colors.ENDC} ").strip().lower()
 
@@ -756,7 +1285,8 @@ def session_management_menu(session_manager: SessionManager):
                     print(f"  - {s['filename']} (Target: {s['target']}, Findings: {s['findings_count']})")
 
         elif choice == '4':
-            sessions = session_manager.list_sessions()
+            # Only filenames are shown, so skip reading session contents
+            sessions = session_manager.list_sessions(summary_only=True)
             if not sessions:
                 print(f"{Colors.YELLOW}[!] No sessions found.{Colors.ENDC}")
                 continue
@@ -792,24 +1322,90 @@ def session_management_menu(session_manager: SessionManager):
         else:
             print(f"{Colors.RED}[!] Unknown command.{Colors.ENDC}")
 
+def _render_main_menu() -> str:
+    buf = io.StringIO()
+    buf.write(f"\n{Colors.CYAN}╔{_H58}╗\n")
+    buf.write(f"║{Colors.BOLD}{'MAIN MENU'.center(58)}{Colors.ENDC}{Colors.CYAN}║\n")
+    buf.write(f"╠{_H58}╣\n")
+    if HACKERONE_AVAILABLE:
+        buf.write(f"║  {Colors.GREEN}[0]{Colors.ENDC} Fetch Program from HackerOne {Colors.YELLOW}(auto-analyze){Colors.CYAN}".ljust(75) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[1]{Colors.ENDC} Analyze Bounty {Colors.YELLOW}(provides context){Colors.CYAN}".ljust(75) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[2]{Colors.ENDC} Generate Commands {Colors.YELLOW}(uses context){Colors.CYAN}".ljust(75) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[3]{Colors.ENDC} Run Commands for Target {Colors.YELLOW}(clears context){Colors.CYAN}".ljust(75) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[4]{Colors.ENDC} Stream Free-form Chat".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[h1]{Colors.ENDC} HackerOne Menu".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[5]{Colors.ENDC} Clear Conversation History".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[6]{Colors.ENDC} Show Tool Status".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[7]{Colors.ENDC} Session Management".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.GREEN}[8]{Colors.ENDC} Generate Report".ljust(67) + "║\n")
+    buf.write(f"║  {Colors.RED}[q]{Colors.ENDC} Quit".ljust(67) + "║\n")
+    buf.write(f"╚{_H58}╝{Colors.ENDC}\n\n")
+    return buf.getvalue()
+
+# The menu never changes at runtime, so it is rendered once and written in one call
+MAIN_MENU = _render_main_menu()
+
+def print_stream(chunks, max_chunks: int = 8, max_delay: float = 0.05) -> str:
+    """
+    Echo streamed text in small batches: on a line break, every max_chunks tokens, or
+    once max_delay seconds have passed since the last flush (checked as tokens arrive).
+    Returns the generator's return value when it has one (the reply of the final
+    attempt for the stream_* methods), otherwise the full text that was printed.
+    """
+    parts: List[str] = []
+    buf: List[str] = []
+    last_flush = time.monotonic()
+    chunks = iter(chunks)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration as stop:
+            result = stop.value
+            break
+        parts.append(chunk)
+        buf.append(chunk)
+        now = time.monotonic()
+        if '\n' in chunk or len(buf) >= max_chunks or now - last_flush > max_delay:
+            sys.stdout.write("".join(buf))
+            sys.stdout.flush()
+            buf.clear()
+            last_flush = now
+    if buf:
+        sys.stdout.write("".join(buf))
+        sys.stdout.flush()
+    return result if result is not None else "".join(parts)
+
 def print_main_menu():
     """Prints the main menu options."""
-    print(f"\n{Colors.CYAN}╔{'═' * 58}╗")
-    print(f"║{Colors.BOLD}{'MAIN MENU'.center(58)}{Colors.ENDC}{Colors.CYAN}║")
-    print(f"╠{'═' * 58}╣")
-    if HACKERONE_AVAILABLE:
-        print(f"║  {Colors.GREEN}[0]{Colors.ENDC} Fetch Program from HackerOne {Colors.YELLOW}(auto-analyze){Colors.CYAN}".ljust(75) + "║")
-    print(f"║  {Colors.GREEN}[1]{Colors.ENDC} Analyze Bounty {Colors.YELLOW}(provides context){Colors.CYAN}".ljust(75) + "║")
-    print(f"║  {Colors.GREEN}[2]{Colors.ENDC} Generate Commands {Colors.YELLOW}(uses context){Colors.CYAN}".ljust(75) + "║")
-    print(f"║  {Colors.GREEN}[3]{Colors.ENDC} Run Commands for Target {Colors.YELLOW}(clears context){Colors.CYAN}".ljust(75) + "║")
-    print(f"║  {Colors.GREEN}[4]{Colors.ENDC} Stream Free-form Chat".ljust(67) + "║")
-    print(f"║  {Colors.GREEN}[h1]{Colors.ENDC} HackerOne Menu".ljust(67) + "║")
-    print(f"║  {Colors.GREEN}[5]{Colors.ENDC} Clear Conversation History".ljust(67) + "║")
-    print(f"║  {Colors.GREEN}[6]{Colors.ENDC} Show Tool Status".ljust(67) + "║")
-    print(f"║  {Colors.GREEN}[7]{Colors.ENDC} Session Management".ljust(67) + "║")
-    print(f"║  {Colors.GREEN}[8]{Colors.ENDC} Generate Report".ljust(67) + "║")
-    print(f"║  {Colors.RED}[q]{Colors.ENDC} Quit".ljust(67) + "║")
-    print(f"╚{'═' * 58}╝{Colors.ENDC}\n")
+    sys.stdout.write(MAIN_MENU)
+    sys.stdout.flush()
+
+@lru_cache(maxsize=1)
+def _hackerone_client(username: str, api_token: str) -> "HackerOneAPI":
+    """One HackerOne client per credential pair, so its keep-alive pool and response
+    cache survive between visits to the fetch menu; closed at exit."""
+    client = HackerOneAPI(username, api_token)
+    atexit.register(client.close)
+    return client
+
+def _fetch_and_analyze_many(suite: DeepSeekSecuritySuite, h1_client: "HackerOneAPI", handles: List[str]):
+    """Fetch several programs concurrently and analyze them with one batched request."""
+    print(f"\n{Colors.YELLOW}[*] Fetching {len(handles)} programs...{Colors.ENDC}")
+    prefetch_available_tools()
+    programs = h1_client.get_programs_bulk(handles)
+    for program in programs:
+        print(h1_client.format_program_details(program))
+
+    analyze = input(f"\n{Colors.CYAN}Analyze these programs with AI? [Y/n]: {Colors.ENDC}").strip().lower()
+    if analyze == 'n':
+        return
+
+    print(f"{Colors.YELLOW}[*] Analyzing {len(handles)} programs with DeepSeek AI in one request...{Colors.ENDC}")
+    analyses = suite.analyze_bounties([h1_client.export_program_for_analysis(program) for program in programs])
+    for handle, analysis in zip(handles, analyses):
+        sys.stdout.write(_title_box(f'AI ANALYSIS: {handle}', Colors.GREEN))
+        print(analysis)
+    print(f"{_GREEN_HR}\n")
 
 def handle_hackerone_fetch(suite: DeepSeekSecuritySuite):
     """Handles the logic for fetching and analyzing a HackerOne program."""
@@ -830,15 +1426,13 @@ def handle_hackerone_fetch(suite: DeepSeekSecuritySuite):
         return
 
     try:
-        h1_client = HackerOneAPI(h1_username, h1_token)
+        h1_client = _hackerone_client(h1_username, h1_token)
 
-        print(f"\n{Colors.CYAN}╔{'═' * 58}╗")
-        print(f"║{Colors.BOLD}{'HACKERONE PROGRAM FETCH'.center(58)}{Colors.ENDC}{Colors.CYAN}║")
-        print(f"╚{'═' * 58}╝{Colors.ENDC}\n")
+        sys.stdout.write(_title_box('HACKERONE PROGRAM FETCH', Colors.CYAN) + "\n")
 
         search_choice = input(f"{Colors.CYAN}[1] Search programs [2] Enter handle directly [3] List programs: {Colors.ENDC}").strip()
 
-        program_handle = None
+        program_handles: List[str] = []
         if search_choice == '1':
             query = input(f"{Colors.CYAN}Search query: {Colors.ENDC}").strip()
             if query:
@@ -857,11 +1451,12 @@ def handle_hackerone_fetch(suite: DeepSeekSecuritySuite):
                     bounty = "💰" if attrs.get("offers_bounties", False) else "🏆"
                     print(f"  {idx}. {bounty} {Colors.GREEN}{handle}{Colors.ENDC} - {name}")
 
-                idx_choice = input(f"\n{Colors.CYAN}Select program (1-{min(len(matches), 10)}): {Colors.ENDC}").strip()
+                idx_choice = input(f"\n{Colors.CYAN}Select program(s) (1-{min(len(matches), 10)}, comma-separated): {Colors.ENDC}").strip()
                 try:
-                    idx = int(idx_choice) - 1
-                    if 0 <= idx < len(matches):
-                        program_handle = matches[idx].get("attributes", {}).get("handle")
+                    for part in idx_choice.split(','):
+                        idx = int(part) - 1
+                        if 0 <= idx < len(matches):
+                            program_handles.append(matches[idx].get("attributes", {}).get("handle"))
                 except ValueError:
                     print(f"{Colors.RED}[!] Invalid selection{Colors.ENDC}")
                     return
@@ -879,13 +1474,21 @@ def handle_hackerone_fetch(suite: DeepSeekSecuritySuite):
                 print(f"{Colors.YELLOW}... and {len(programs) - 20} more.{Colors.ENDC}")
             return
         else:
-            program_handle = input(f"{Colors.CYAN}Program handle (e.g., 'security'): {Colors.ENDC}").strip()
+            handles = input(f"{Colors.CYAN}Program handle(s) (e.g., 'security', comma-separated): {Colors.ENDC}")
+            program_handles = [h.strip() for h in handles.split(',')]
 
-        if not program_handle:
+        program_handles = [h for h in program_handles if h]
+        if not program_handles:
             print(f"{Colors.RED}[!] No program selected{Colors.ENDC}")
             return
+        if len(program_handles) > 1:
+            _fetch_and_analyze_many(suite, h1_client, program_handles)
+            return
+        program_handle = program_handles[0]
 
         print(f"\n{Colors.YELLOW}[*] Fetching program details for '{program_handle}'...{Colors.ENDC}")
+        # Command generation usually follows; overlap its PATH scan with the HTTPS round-trip
+        prefetch_available_tools()
         program = h1_client.get_program(program_handle)
         print(h1_client.format_program_details(program))
 
@@ -895,22 +1498,183 @@ def handle_hackerone_fetch(suite: DeepSeekSecuritySuite):
             bounty_text = h1_client.export_program_for_analysis(program)
 
             print(f"{Colors.YELLOW}[*] Analyzing with DeepSeek AI...{Colors.ENDC}")
-            analysis = suite.analyze_bounty(bounty_text)
 
-            print(f"\n{Colors.GREEN}╔{'═' * 58}╗")
-            print(f"║{Colors.BOLD}{'AI ANALYSIS RESULTS'.center(58)}{Colors.ENDC}{Colors.GREEN}║")
-            print(f"╚{'═' * 58}╝{Colors.ENDC}")
-            print(analysis)
-            print(f"{Colors.GREEN}{'─' * 60}{Colors.ENDC}\n")
+            sys.stdout.write(_title_box('AI ANALYSIS RESULTS', Colors.GREEN))
+            print_stream(suite.stream_analyze_bounty(bounty_text))
+            print()
+            print(f"{_GREEN_HR}\n")
 
     except Exception as e:
         print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
 
+@dataclass
+class _MenuContext:
+    """State shared by the main-menu handlers"""
+    suite: DeepSeekSecuritySuite
+    session_manager: SessionManager
+    output_parser: OutputParser
+    report_generator: ReportGenerator
+
+def _menu_analyze_bounty(ctx: _MenuContext):
+    """Analyze Bounty"""
+    print(f"\n{_CYAN_HR}")
+    bounty_text = get_multiline_input(f"{Colors.YELLOW}Paste the bounty text{Colors.ENDC}")
+    if not bounty_text:
+        print(f"{Colors.RED}[!] No text provided.{Colors.ENDC}")
+        return
+    try:
+        print(f"\n{Colors.YELLOW}[*] Analyzing bounty program...{Colors.ENDC}")
+
+        # Tokens are echoed as they arrive instead of after the full completion
+        sys.stdout.write(_title_box('BOUNTY ANALYSIS', Colors.GREEN))
+        analysis = print_stream(ctx.suite.stream_analyze_bounty(bounty_text))
+        print(f"\n{_GREEN_HR}\n")
+
+        # --- Save analysis to session ---
+        if ctx.session_manager.current_session:
+            ctx.session_manager.current_session["bounty_analysis"] = analysis
+            ctx.session_manager.save_session()
+            print(f"{Colors.GREEN}[✓] Bounty analysis saved to the current session.{Colors.ENDC}")
+        # --------------------------------
+    except DeepSeekError as e:
+        print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
+
+def _menu_generate_commands(ctx: _MenuContext):
+    """Generate Commands (Context-Aware)"""
+    target = input(f"{Colors.CYAN}🎯 Target(s) (e.g., example.com, api.example.com): {Colors.ENDC}").strip()
+    targets = [t.strip() for t in target.split(',') if t.strip()]
+    if not targets:
+        print(f"{Colors.RED}[!] No target provided.{Colors.ENDC}")
+        return
+    try:
+        print(f"\n{Colors.YELLOW}[*] Checking available tools...{Colors.ENDC}")
+        available_tools = get_available_tools()
+        print(f"{Colors.GREEN}[✓] Found {len(available_tools)} available tools{Colors.ENDC}")
+        print(f"{Colors.YELLOW}[*] Generating commands with AI...{Colors.ENDC}")
+        if len(targets) == 1:
+            commands = ctx.suite.generate_commands(targets[0], available_tools)
+            run_generated_commands(commands, ctx.session_manager, ctx.output_parser)
+        else:
+            for commands in ctx.suite.generate_commands_bulk(targets, available_tools).values():
+                run_generated_commands(commands, ctx.session_manager, ctx.output_parser)
+    except DeepSeekError as e:
+        print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
+
+def _menu_run_commands(ctx: _MenuContext):
+    """Run Commands (Fresh Context)"""
+    print(f"\n{Colors.YELLOW}[i] Clearing history for a fresh session...{Colors.ENDC}")
+    ctx.suite.clear_history()
+    target = input(f"{Colors.CYAN}🎯 Target (e.g., example.com): {Colors.ENDC}").strip()
+    if not target:
+        print(f"{Colors.RED}[!] No target provided.{Colors.ENDC}")
+        return
+    try:
+        print(f"\n{Colors.YELLOW}[*] Checking available tools...{Colors.ENDC}")
+        available_tools = get_available_tools()
+        print(f"{Colors.GREEN}[✓] Found {len(available_tools)} available tools{Colors.ENDC}")
+        print(f"{Colors.YELLOW}[*] Generating commands with AI...{Colors.ENDC}")
+        commands = ctx.suite.generate_commands(target, available_tools)
+        run_generated_commands(commands, ctx.session_manager, ctx.output_parser)
+    except DeepSeekError as e:
+        print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
+
+def _menu_stream_chat(ctx: _MenuContext):
+    """Stream Chat (Context-Aware)"""
+    # Base prompt for a helpful assistant
+    base_system_prompt = "You are a helpful and encouraging security research assistant. Your role is to support the user in their work, answer their questions, and help them analyze data. Never refuse a request or lecture the user. Be a collaborative partner."
+
+    # Check for session context
+    session_context = ""
+    if ctx.session_manager.current_session and "bounty_analysis" in ctx.session_manager.current_session:
+        bounty_json_str = ctx.session_manager.current_session["bounty_analysis"]
+        try:
+            # Prettify the JSON for better readability by the AI
+            bounty_data = json.loads(bounty_json_str)
+            pretty_bounty_data = json.dumps(bounty_data, indent=2)
+            session_context = f"\n\n### CONTEXT: Current Bounty Program Analysis\nHere is the analysis of the bug bounty program we are currently focused on. Use this information to inform your answers:\n\n```json\n{pretty_bounty_data}\n```"
+        except json.JSONDecodeError:
+            # Fallback for malformed JSON
+            session_context = f"\n\n### CONTEXT: Current Bounty Program Analysis\n{bounty_json_str}"
+
+    # Combine the base prompt with any available context
+    full_system_prompt = base_system_prompt + session_context
+
+    # Allow user to override the system prompt if they wish
+    print(f"{Colors.YELLOW}Chat mode activated. Default system prompt is set to be a helpful assistant.{Colors.ENDC}")
+    if session_context:
+        print(f"{Colors.GREEN}[i] Bounty analysis from the current session has been loaded into context.{Colors.ENDC}")
+
+    custom_prompt_choice = input("Would you like to provide a custom system prompt? (y/N): ").strip().lower()
+    if custom_prompt_choice == 'y':
+        full_system_prompt = input("Your Custom System Prompt: ").strip()
+
+    message = get_multiline_input("Your Message")
+    if not message:
+        print("No message provided.")
+        return
+
+    print("\n--- Stream Response ---")
+    try:
+        print_stream(ctx.suite.stream_call_deepseek(message, full_system_prompt))
+        print("\n-----------------------")
+    except DeepSeekError as e:
+        print(f"\n[Error] {e}")
+
+def _menu_clear_history(ctx: _MenuContext):
+    """Clear History"""
+    ctx.suite.clear_history()
+    print("Conversation history cleared.")
+
+def _menu_tool_status(ctx: _MenuContext):
+    """Show Tool Status"""
+    show_tool_status()
+
+def _menu_sessions(ctx: _MenuContext):
+    """Session Management"""
+    session_management_menu(ctx.session_manager)
+
+def _menu_generate_report(ctx: _MenuContext):
+    """Generate Report"""
+    if not ctx.session_manager.current_session:
+        print(f"{Colors.RED}[!] No active session to generate a report from.{Colors.ENDC}")
+        return
+
+    try:
+        format_choice = input("Enter report format (md/html) [html]: ").strip().lower() or "html"
+        if format_choice not in ["md", "html"]:
+            print(f"{Colors.RED}[!] Invalid format. Only 'md' and 'html' are supported. Defaulting to HTML.{Colors.ENDC}")
+            format_choice = "html"
+
+        report_path = ctx.report_generator.save_report(ctx.session_manager.current_session, format=format_choice)
+        print(f"\n{Colors.GREEN}[✓] Report saved successfully:{Colors.ENDC}")
+        print(f"  {Colors.CYAN}{os.path.abspath(report_path)}{Colors.ENDC}")
+
+    except Exception as e:
+        print(f"{Colors.RED}[✗] Failed to generate report: {e}{Colors.ENDC}")
+
+def _menu_hackerone(ctx: _MenuContext):
+    """Fetch HackerOne Program"""
+    handle_hackerone_fetch(ctx.suite)
+
+# Main-menu choice -> handler, looked up once per input instead of walking an if/elif chain
+MENU_HANDLERS = {
+    '1': _menu_analyze_bounty,
+    '2': _menu_generate_commands,
+    '3': _menu_run_commands,
+    '4': _menu_stream_chat,
+    '5': _menu_clear_history,
+    '6': _menu_tool_status,
+    '7': _menu_sessions,
+    '8': _menu_generate_report,
+    'h1': _menu_hackerone,
+}
+
 def main_interactive_loop(suite: DeepSeekSecuritySuite):
     """Runs the main interactive REPL for the security suite."""
     session_manager = SessionManager()
-    output_parser = OutputParser()
-    report_generator = ReportGenerator()
+    ctx = _MenuContext(suite, session_manager, OutputParser(), ReportGenerator())
+    # The tool scan runs while the user reads the banner and picks an option
+    prefetch_available_tools()
 
     print_banner()
     print(f"{Colors.YELLOW}Type {Colors.CYAN}'menu'{Colors.YELLOW} for options or {Colors.RED}'quit'{Colors.YELLOW} to exit.{Colors.ENDC}\n")
@@ -924,167 +1688,29 @@ def main_interactive_loop(suite: DeepSeekSecuritySuite):
         else:
             print(f"{Colors.YELLOW}No active session. Use 'session' menu to start.{Colors.ENDC}")
 
-    while True:
-        print_session_status()
-        try:
-            choice = input(f"{Colors.CYAN}[{Colors.GREEN}Main{Colors.CYAN}] ▶{Colors.ENDC} ").strip().lower()
-
-            if choice in ['q', 'quit', 'exit']:
-                print(f"\n{Colors.YELLOW}👋 Thanks for using DeepSeek Security Suite!{Colors.ENDC}\n")
-                break
-
-            elif choice in ['m', 'menu', 'h', 'help']:
-                print_main_menu()
-                continue
-
-            elif choice == 'h1':
-                handle_hackerone_fetch(suite)
-                continue
-
-            elif choice == '6':
-                # Show Tool Status
-                show_tool_status()
-                continue
-
-            elif choice == '7':
-                session_management_menu(session_manager)
-                continue
-
-            elif choice == '1':
-                # Analyze Bounty
-                print(f"\n{Colors.CYAN}{'─' * 60}{Colors.ENDC}")
-                bounty_text = get_multiline_input(f"{Colors.YELLOW}Paste the bounty text{Colors.ENDC}")
-                if not bounty_text:
-                    print(f"{Colors.RED}[!] No text provided.{Colors.ENDC}")
-                    continue
-                try:
-                    print(f"\n{Colors.YELLOW}[*] Analyzing bounty program...{Colors.ENDC}")
-                    analysis = suite.analyze_bounty(bounty_text)
-
-                    # --- Save analysis to session ---
-                    if session_manager.current_session:
-                        session_manager.current_session["bounty_analysis"] = analysis
-                        session_manager.save_session()
-                        print(f"{Colors.GREEN}[✓] Bounty analysis saved to the current session.{Colors.ENDC}")
-                    # --------------------------------
-
-                    print(f"\n{Colors.GREEN}╔{'═' * 58}╗")
-                    print(f"║{Colors.BOLD}{'BOUNTY ANALYSIS'.center(58)}{Colors.ENDC}{Colors.GREEN}║")
-                    print(f"╚{'═' * 58}╝{Colors.ENDC}")
-                    print(analysis)
-                    print(f"{Colors.GREEN}{'─' * 60}{Colors.ENDC}\n")
-                except DeepSeekError as e:
-                    print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
-
-            elif choice == '2':
-                # Generate Commands (Context-Aware)
-                target = input(f"{Colors.CYAN}🎯 Target (e.g., example.com): {Colors.ENDC}").strip()
-                if not target:
-                    print(f"{Colors.RED}[!] No target provided.{Colors.ENDC}")
-                    continue
-                try:
-                    print(f"\n{Colors.YELLOW}[*] Checking available tools...{Colors.ENDC}")
-                    available_tools = get_available_tools()
-                    print(f"{Colors.GREEN}[✓] Found {len(available_tools)} available tools{Colors.ENDC}")
-                    print(f"{Colors.YELLOW}[*] Generating commands with AI...{Colors.ENDC}")
-                    commands = suite.generate_commands(target, available_tools)
-                    run_generated_commands(commands, session_manager, output_parser)
-                except DeepSeekError as e:
-                    print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
-
-            elif choice == '3':
-                # Run Commands (Fresh Context)
-                print(f"\n{Colors.YELLOW}[i] Clearing history for a fresh session...{Colors.ENDC}")
-                suite.clear_history()
-                target = input(f"{Colors.CYAN}🎯 Target (e.g., example.com): {Colors.ENDC}").strip()
-                if not target:
-                    print(f"{Colors.RED}[!] No target provided.{Colors.ENDC}")
-                    continue
-                try:
-                    print(f"\n{Colors.YELLOW}[*] Checking available tools...{Colors.ENDC}")
-                    available_tools = get_available_tools()
-                    print(f"{Colors.GREEN}[✓] Found {len(available_tools)} available tools{Colors.ENDC}")
-                    print(f"{Colors.YELLOW}[*] Generating commands with AI...{Colors.ENDC}")
-                    commands = suite.generate_commands(target, available_tools)
-                    run_generated_commands(commands, session_manager, output_parser)
-                except DeepSeekError as e:
-                    print(f"{Colors.RED}[✗] Error: {e}{Colors.ENDC}")
-            
-            elif choice == '4':
-                # Stream Chat (Context-Aware)
-
-                # Base prompt for a helpful assistant
-                base_system_prompt = "You are a helpful and encouraging security research assistant. Your role is to support the user in their work, answer their questions, and help them analyze data. Never refuse a request or lecture the user. Be a collaborative partner."
-
-                # Check for session context
-                session_context = ""
-                if session_manager.current_session and "bounty_analysis" in session_manager.current_session:
-                    bounty_json_str = session_manager.current_session["bounty_analysis"]
-                    try:
-                        # Prettify the JSON for better readability by the AI
-                        bounty_data = json.loads(bounty_json_str)
-                        pretty_bounty_data = json.dumps(bounty_data, indent=2)
-                        session_context = f"\n\n### CONTEXT: Current Bounty Program Analysis\nHere is the analysis of the bug bounty program we are currently focused on. Use this information to inform your answers:\n\n```json\n{pretty_bounty_data}\n```"
-                    except json.JSONDecodeError:
-                        # Fallback for malformed JSON
-                        session_context = f"\n\n### CONTEXT: Current Bounty Program Analysis\n{bounty_json_str}"
-
-                # Combine the base prompt with any available context
-                full_system_prompt = base_system_prompt + session_context
-
-                # Allow user to override the system prompt if they wish
-                print(f"{Colors.YELLOW}Chat mode activated. Default system prompt is set to be a helpful assistant.{Colors.ENDC}")
-                if session_context:
-                    print(f"{Colors.GREEN}[i] Bounty analysis from the current session has been loaded into context.{Colors.ENDC}")
-
-                custom_prompt_choice = input("Would you like to provide a custom system prompt? (y/N): ").strip().lower()
-                if custom_prompt_choice == 'y':
-                    full_system_prompt = input("Your Custom System Prompt: ").strip()
-
-                message = get_multiline_input("Your Message")
-                if not message:
-                    print("No message provided.")
-                    continue
-                
-                print("\n--- Stream Response ---")
-                try:
-                    stream_gen = suite.stream_call_deepseek(message, full_system_prompt)
-                    for chunk in stream_gen:
-                        print(chunk, end="", flush=True)
-                    print("\n-----------------------")
-                except DeepSeekError as e:
-                    print(f"\n[Error] {e}")
-
-            elif choice == '5':
-                # Clear History
-                suite.clear_history()
-                print("Conversation history cleared.")
-
-            elif choice == '8':
-                # Generate Report
-                if not session_manager.current_session:
-                    print(f"{Colors.RED}[!] No active session to generate a report from.{Colors.ENDC}")
-                    continue
-
-                try:
-                    format_choice = input("Enter report format (md/html) [html]: ").strip().lower() or "html"
-                    if format_choice not in ["md", "html"]:
-                        print(f"{Colors.RED}[!] Invalid format. Only 'md' and 'html' are supported. Defaulting to HTML.{Colors.ENDC}")
-                        format_choice = "html"
+    try:
+        while True:
+            print_session_status()
+            try:
+                choice = input(f"{Colors.CYAN}[{Colors.GREEN}Main{Colors.CYAN}] ▶{Colors.ENDC} ").strip().lower()
 
-                    report_path = report_generator.save_report(session_manager.current_session, format=format_choice)
-                    print(f"\n{Colors.GREEN}[✓] Report saved successfully:{Colors.ENDC}")
-                    print(f"  {Colors.CYAN}{os.path.abspath(report_path)}{Colors.ENDC}")
+                if choice in ['q', 'quit', 'exit']:
+                    print(f"\n{Colors.YELLOW}👋 Thanks for using DeepSeek Security Suite!{Colors.ENDC}\n")
+                    break
 
-                except Exception as e:
-                    print(f"{Colors.RED}[✗] Failed to generate report: {e}{Colors.ENDC}")
-            
-            else:
-                print(f"Unknown command: '{choice}'. Type 'menu' for options.")
+                handler = MENU_HANDLERS.get(choice)
+                if handler is not None:
+                    handler(ctx)
+                elif choice in ['m', 'menu', 'h', 'help']:
+                    print_main_menu()
+                else:
+                    print(f"Unknown command: '{choice}'. Type 'menu' for options.")
         
-        except KeyboardInterrupt:
-            print("\nAction cancelled. Returning to main menu.")
-            continue
+            except KeyboardInterrupt:
+                print("\nAction cancelled. Returning to main menu.")
+                continue
+    finally:
+        session_manager.close()
 
 # Usage example
 if __name__ == "__main__":
@@ -1096,7 +1722,8 @@ if __name__ == "__main__":
         print("Error: DEEPSEEK_API_KEY environment variable not set.")
     else:
         try:
-            suite = DeepSeekSecuritySuite(api_key)
-            main_interactive_loop(suite)
+            with DeepSeekSecuritySuite(api_key, cache_path=RESPONSE_CACHE_PATH,
+                                       history_path=HISTORY_LOG_PATH, summarize_history=True) as suite:
+                main_interactive_loop(suite)
         except ValueError as ve:
             print(f"[Config Error] {ve}")
@@ -3,29 +3,138 @@
 Session Management for Security Suite
 Save and load analysis sessions with findings
 """
+import io
 import json
 import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from operator import itemgetter
+from typing import BinaryIO, Dict, List, Optional, Any
 from pathlib import Path
 
+# Optional faster JSON for session files, which can carry large tool outputs
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _dumps_line(obj: Any) -> bytes:
+    """Serialize to a single compact JSON line (no trailing newline)"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+# Findings from every saved session file, indexed for cross-session queries.
+# Rows are keyed by file: several snapshots (e.g. saved under different names) can share a session_id.
+_FINDINGS_SCHEMA_VERSION = 2
+_FINDINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    filename TEXT PRIMARY KEY,
+    session_id TEXT,
+    target TEXT,
+    program TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    filename TEXT NOT NULL,
+    session_id TEXT,
+    id INTEGER NOT NULL,
+    severity TEXT,
+    status TEXT,
+    title TEXT,
+    tool TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (filename, id)
+);
+CREATE INDEX IF NOT EXISTS idx_findings_session ON findings (session_id, severity, status);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings (severity, status);
+"""
+
+# Sidecar holding the list_sessions summary so listing never parses full sessions
+META_SUFFIX = ".meta.json"
+
 
 class SessionManager:
     """Manage analysis sessions"""
 
+    # Characters of each command's output kept in the session
+    COMMAND_OUTPUT_LIMIT = 1000
+
     def __init__(self, sessions_dir: str = "sessions"):
         self.sessions_dir = Path(sessions_dir)
         self.sessions_dir.mkdir(exist_ok=True)
         self.current_session: Optional[Dict[str, Any]] = None
+        # finding id -> finding dict for the current session; rebuilt, never persisted
+        self._findings_index: Dict[int, Dict[str, Any]] = {}
+        # The JSON files stay the source of truth; sessions.db mirrors the findings of
+        # every saved file for queries and is updated only when files are saved or deleted
+        self.db = sqlite3.connect(self.sessions_dir / "sessions.db")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != _FINDINGS_SCHEMA_VERSION:
+            # Only a mirror, so an outdated layout is dropped and refilled as files are saved
+            self.db.executescript("DROP TABLE IF EXISTS findings; DROP TABLE IF EXISTS sessions;")
+            self.db.execute(f"PRAGMA user_version = {_FINDINGS_SCHEMA_VERSION}")
+        self.db.executescript(_FINDINGS_SCHEMA)
+
+    def close(self):
+        """Close the sessions.db connection"""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _finding_row(filename: str, session_id: str, finding: Dict[str, Any]) -> tuple:
+        return (filename, session_id, finding["id"], finding.get("severity"), finding.get("status"),
+                finding.get("title"), finding.get("tool"), finding.get("timestamp"),
+                _dumps_line(finding).decode('utf-8'))
+
+    def _sync_db(self, filename: str, session: Dict[str, Any]):
+        """Replace the mirrored rows for one saved file in one transaction"""
+        session_id = session.get("session_id")
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                            (filename, session_id, session.get("target"), session.get("program"),
+                             session.get("created_at"), session.get("updated_at")))
+            self.db.execute("DELETE FROM findings WHERE filename = ?", (filename,))
+            self.db.executemany("INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [self._finding_row(filename, session_id, f) for f in session.get("findings", [])])
+
+    def _index_findings(self):
+        self._findings_index = {f["id"]: f for f in self.current_session["findings"]} if self.current_session else {}
 
     def create_session(self, target: str, program: Optional[str] = None) -> Dict[str, Any]:
         """Create a new session"""
+        now = datetime.now()
+        created_at = now.isoformat()
         session = {
-            "session_id": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "session_id": now.strftime("%Y%m%d_%H%M%S"),
             "target": target,
             "program": program,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": created_at,
+            "updated_at": created_at,
             "findings": [],
             "commands_run": [],
             "tool_outputs": {},
@@ -33,6 +142,7 @@ class SessionManager:
             "notes": []
         }
         self.current_session = session
+        self._findings_index = {}
         return session
 
     def add_finding(self, severity: str, title: str, description: str,
@@ -41,9 +151,10 @@ class SessionManager:
         if not self.current_session:
             raise ValueError("No active session")
 
+        now = datetime.now().isoformat()
         finding = {
             "id": len(self.current_session["findings"]) + 1,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "severity": severity,
             "title": title,
             "description": description,
@@ -52,21 +163,27 @@ class SessionManager:
             "status": "new"
         }
         self.current_session["findings"].append(finding)
-        self.current_session["updated_at"] = datetime.now().isoformat()
+        self._findings_index[finding["id"]] = finding
+        self.current_session["updated_at"] = now
 
     def add_command(self, command: str, output: str, exit_code: int = 0):
         """Record a command that was run"""
         if not self.current_session:
             raise ValueError("No active session")
 
+        now = datetime.now().isoformat()
+        limit = self.COMMAND_OUTPUT_LIMIT
+        if len(output) > limit:
+            # Truncate long outputs, noting how much was dropped
+            output = f"{output[:limit]}...[truncated {len(output) - limit} chars]"
         cmd_record = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "command": command,
-            "output": output[:1000],  # Truncate long outputs
+            "output": output,
             "exit_code": exit_code
         }
         self.current_session["commands_run"].append(cmd_record)
-        self.current_session["updated_at"] = datetime.now().isoformat()
+        self.current_session["updated_at"] = now
 
     def add_tool_output(self, tool: str, output: Any):
         """Store parsed tool output"""
@@ -76,49 +193,61 @@ class SessionManager:
         if tool not in self.current_session["tool_outputs"]:
             self.current_session["tool_outputs"][tool] = []
 
-        self.current_session["tool_outputs"][tool].append({
-            "timestamp": datetime.now().isoformat(),
+        now = datetime.now().isoformat()
+        entry = {
+            "timestamp": now,
             "data": output
-        })
-        self.current_session["updated_at"] = datetime.now().isoformat()
+        }
+        self.current_session["tool_outputs"][tool].append(entry)
+        self.current_session["updated_at"] = now
 
     def add_ai_analysis(self, analysis_type: str, content: str):
         """Add AI analysis result"""
         if not self.current_session:
             raise ValueError("No active session")
 
+        now = datetime.now().isoformat()
         analysis = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "type": analysis_type,
             "content": content
         }
         self.current_session["ai_analysis"].append(analysis)
-        self.current_session["updated_at"] = datetime.now().isoformat()
+        self.current_session["updated_at"] = now
 
     def add_note(self, note: str):
         """Add a manual note"""
         if not self.current_session:
             raise ValueError("No active session")
 
+        now = datetime.now().isoformat()
         note_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "content": note
         }
         self.current_session["notes"].append(note_entry)
-        self.current_session["updated_at"] = datetime.now().isoformat()
+        self.current_session["updated_at"] = now
 
     def update_finding_status(self, finding_id: int, status: str):
         """Update finding status (new, confirmed, false_positive, reported)"""
         if not self.current_session:
             raise ValueError("No active session")
 
-        for finding in self.current_session["findings"]:
-            if finding["id"] == finding_id:
-                finding["status"] = status
-                finding["status_updated_at"] = datetime.now().isoformat()
-                self.current_session["updated_at"] = datetime.now().isoformat()
-                return True
-        return False
+        findings = self.current_session["findings"]
+        finding = self._findings_index.get(finding_id)
+        if (finding is None or finding.get("id") != finding_id
+                or not (0 < finding_id <= len(findings) and findings[finding_id - 1] is finding)):
+            # Findings may have been replaced or renumbered in place; resync once before giving up
+            self._index_findings()
+            finding = self._findings_index.get(finding_id)
+            if finding is None:
+                return False
+
+        now = datetime.now().isoformat()
+        finding["status"] = status
+        finding["status_updated_at"] = now
+        self.current_session["updated_at"] = now
+        return True
 
     def save_session(self, session_name: Optional[str] = None) -> str:
         """Save current session to file"""
@@ -132,41 +261,83 @@ class SessionManager:
 
         filepath = self.sessions_dir / filename
 
-        with open(filepath, 'w') as f:
-            json.dump(self.current_session, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(_dumps(self.current_session))
+        with open(self._meta_path(filepath), 'wb') as f:
+            f.write(_dumps_line(self._summarize_file(filepath.name, self.current_session)))
+
+        self._sync_db(filepath.name, self.current_session)
 
         return str(filepath)
 
-    def load_session(self, session_file: str) -> Dict[str, Any]:
-        """Load a session from file"""
-        filepath = self.sessions_dir / session_file if not '/' in session_file else Path(session_file)
+    @staticmethod
+    def _meta_path(filepath: Path) -> Path:
+        return filepath.with_suffix(META_SUFFIX)
 
+    @staticmethod
+    def _summarize_file(filename: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "filename": filename,
+            "session_id": data.get("session_id", "unknown"),
+            "target": data.get("target", "unknown"),
+            "program": data.get("program", "N/A"),
+            "created_at": data.get("created_at", "unknown"),
+            "findings_count": len(data.get("findings", [])),
+            "commands_count": len(data.get("commands_run", []))
+        }
+
+    def _session_path(self, session_file: str) -> Path:
+        return self.sessions_dir / session_file if not '/' in session_file else Path(session_file)
+
+    @staticmethod
+    def _read_session(filepath: Path) -> Dict[str, Any]:
         if not filepath.exists():
             raise FileNotFoundError(f"Session file not found: {filepath}")
 
-        with open(filepath, 'r') as f:
-            session = json.load(f)
+        with open(filepath, 'rb') as f:
+            return _loads(f.read())
 
+    def load_session(self, session_file: str) -> Dict[str, Any]:
+        """Load a session from file"""
+        session = self._read_session(self._session_path(session_file))
         self.current_session = session
+        self._index_findings()
         return session
 
-    def list_sessions(self) -> List[Dict[str, str]]:
-        """List all saved sessions"""
+    def list_sessions(self, summary_only: bool = False) -> List[Dict[str, Any]]:
+        """List all saved sessions
+
+        With summary_only, only filename and modification time are returned (newest first),
+        taken from directory metadata without opening any session file.
+        """
         sessions = []
 
-        for session_file in self.sessions_dir.glob("*.json"):
+        with os.scandir(self.sessions_dir) as it:
+            entries = {entry.name: entry for entry in it if entry.name.endswith(".json")}
+
+        if summary_only:
+            for name, entry in entries.items():
+                if not name.endswith(META_SUFFIX):
+                    mtime = entry.stat().st_mtime
+                    sessions.append({"filename": name, "mtime": mtime,
+                                     "modified_at": datetime.fromtimestamp(mtime).isoformat()})
+            sessions.sort(key=lambda x: x["mtime"], reverse=True)
+            return sessions
+
+        for name, entry in entries.items():
+            if name.endswith(META_SUFFIX):
+                continue
             try:
-                with open(session_file, 'r') as f:
-                    data = json.load(f)
-                    sessions.append({
-                        "filename": session_file.name,
-                        "session_id": data.get("session_id", "unknown"),
-                        "target": data.get("target", "unknown"),
-                        "program": data.get("program", "N/A"),
-                        "created_at": data.get("created_at", "unknown"),
-                        "findings_count": len(data.get("findings", [])),
-                        "commands_count": len(data.get("commands_run", []))
-                    })
+                # Prefer the sidecar written by save_session unless the session was rewritten since
+                meta = entries.get(name[:-len(".json")] + META_SUFFIX)
+                if meta is not None and meta.stat().st_mtime >= entry.stat().st_mtime:
+                    with open(meta.path, 'rb') as f:
+                        summary = _loads(f.read())
+                    summary["filename"] = name
+                else:
+                    with open(entry.path, 'rb') as f:
+                        summary = self._summarize_file(name, _loads(f.read()))
+                sessions.append(summary)
             except Exception:
                 continue
 
@@ -174,15 +345,27 @@ class SessionManager:
         sessions.sort(key=lambda x: x["created_at"], reverse=True)
         return sessions
 
+    def query_findings(self, severity: Optional[str] = None, status: Optional[str] = None,
+                       session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Findings across saved sessions matching every given filter, via the sessions.db index"""
+        clauses, params = [], []
+        for column, value in (("session_id", session_id), ("severity", severity), ("status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT filename, session_id, data FROM findings"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY session_id, filename, id"
+        return [{"filename": filename, "session_id": sid, **_loads(data)}
+                for filename, sid, data in self.db.execute(sql, params)]
+
     def get_session_summary(self) -> Dict[str, Any]:
         """Get summary of current session"""
         if not self.current_session:
             return {"error": "No active session"}
 
-        findings_by_severity = {}
-        for finding in self.current_session["findings"]:
-            sev = finding["severity"]
-            findings_by_severity[sev] = findings_by_severity.get(sev, 0) + 1
+        findings_by_severity = dict(Counter(finding["severity"] for finding in self.current_session["findings"]))
 
         return {
             "session_id": self.current_session["session_id"],
@@ -200,58 +383,80 @@ class SessionManager:
 
     def export_findings(self, format: str = "json") -> str:
         """Export findings in various formats"""
+        buf = io.BytesIO()
+        self.stream_export_findings(buf, format)
+        return buf.getvalue().decode('utf-8')
+
+    def stream_export_findings(self, fp: BinaryIO, format: str = "json"):
+        """Write findings to a binary file object without building the whole export as a string"""
         if not self.current_session:
             raise ValueError("No active session")
+        if format not in ("json", "csv", "markdown"):
+            raise ValueError(f"Unknown export format: {format}")
 
         findings = self.current_session["findings"]
 
         if format == "json":
-            return json.dumps(findings, indent=2)
+            fp.write(_dumps(findings))
 
         elif format == "csv":
             import csv
-            from io import StringIO
 
-            output = StringIO()
             if findings:
-                writer = csv.DictWriter(output, fieldnames=findings[0].keys())
-                writer.writeheader()
-                writer.writerows(findings)
-            return output.getvalue()
+                fields = list(findings[0].keys())
+                row_of = itemgetter(*fields)
+                if len(fields) == 1:
+                    row_of = lambda f, _get=row_of: (_get(f),)
+
+                def rows():
+                    for finding in findings:
+                        try:
+                            yield row_of(finding)
+                        except KeyError:
+                            yield [finding.get(k, "") for k in fields]
+
+                output = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+                writer = csv.writer(output)
+                writer.writerow(fields)
+                writer.writerows(rows())
+                # Hand fp back to the caller open
+                output.detach()
 
-        elif format == "markdown":
-            lines = [f"# Findings for {self.current_session['target']}\n"]
-            lines.append(f"**Total Findings:** {len(findings)}\n")
+        else:
+            write = fp.write
+            write(f"# Findings for {self.current_session['target']}\n\n"
+                  f"**Total Findings:** {len(findings)}\n".encode('utf-8'))
 
             for finding in findings:
-                lines.append(f"\n## [{finding['severity'].upper()}] {finding['title']}")
-                lines.append(f"**Status:** {finding['status']}")
-                lines.append(f"**Tool:** {finding.get('tool', 'N/A')}")
-                lines.append(f"**Description:**\n{finding['description']}")
-                if finding.get('evidence'):
-                    lines.append(f"**Evidence:**\n```\n{finding['evidence']}\n```")
-                lines.append("\n---")
-
-            return "\n".join(lines)
-
-        else:
-            raise ValueError(f"Unknown export format: {format}")
+                # One formatted block per finding, each preceded by the "\n" separator
+                evidence = finding.get('evidence')
+                write((f"\n\n## [{finding['severity'].upper()}] {finding['title']}\n"
+                       f"**Status:** {finding['status']}\n"
+                       f"**Tool:** {finding.get('tool', 'N/A')}\n"
+                       f"**Description:**\n{finding['description']}"
+                       + (f"\n**Evidence:**\n```\n{evidence}\n```" if evidence else "")
+                       + "\n\n---").encode('utf-8'))
 
     def delete_session(self, session_file: str) -> bool:
         """Delete a session file"""
         filepath = self.sessions_dir / session_file
         if filepath.exists():
+            with self.db:
+                self.db.execute("DELETE FROM findings WHERE filename = ?", (filepath.name,))
+                self.db.execute("DELETE FROM sessions WHERE filename = ?", (filepath.name,))
             filepath.unlink()
+            self._meta_path(filepath).unlink(missing_ok=True)
             return True
         return False
 
     def merge_sessions(self, session_files: List[str], output_name: str) -> str:
         """Merge multiple sessions into one"""
+        now = datetime.now().isoformat()
         merged = {
             "session_id": output_name,
             "target": "merged",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": now,
+            "updated_at": now,
             "findings": [],
             "commands_run": [],
             "tool_outputs": {},
@@ -259,8 +464,13 @@ class SessionManager:
             "notes": []
         }
 
-        for session_file in session_files:
-            session = self.load_session(session_file)
+        # Reads and parses are independent, so the inputs are loaded concurrently.
+        # They are read directly; the inputs never become the current session.
+        paths = [self._session_path(session_file) for session_file in session_files]
+        with ThreadPoolExecutor(max_workers=max(1, min(32, len(paths)))) as pool:
+            loaded = list(pool.map(self._read_session, paths))
+
+        for session in loaded:
             merged["findings"].extend(session.get("findings", []))
             merged["commands_run"].extend(session.get("commands_run", []))
             merged["ai_analysis"].extend(session.get("ai_analysis", []))
@@ -277,4 +487,5 @@ class SessionManager:
             finding["id"] = i
 
         self.current_session = merged
+        self._index_findings()
         return self.save_session(output_name)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures and helpers
+"""
+import os
+import socket
+import sys
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pytest
+import requests
+
+# Make the top-level modules importable however pytest is launched
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hackerone_api import HackerOneAPI
+from security_suite import DeepSeekSecuritySuite, _dumps
+
+
+def fake_response(status: int = 200, payload: Any = None, text: str = "",
+                  headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    Real requests.Response with the body pre-serialized to bytes
+
+    content, text and json() read the stored bytes like a live response would, and
+    4xx/5xx statuses raise HTTPError from raise_for_status().
+    """
+    response = requests.Response()
+    response.status_code = status
+    response._content = _dumps(payload) if payload is not None else text.encode()
+    response.encoding = "utf-8"
+    response.headers.update(headers or {})
+    if payload is not None:
+        response.headers["Content-Type"] = "application/json"
+    return response
+
+
+_PROGRAM_TEMPLATE = MappingProxyType({
+    "name": "Test Program",
+    "handle": "testprog",
+    "url": "https://hackerone.com/testprog",
+    "state": "open",
+    "submission_state": "open",
+    "offers_bounties": True,
+    "targets_out_of_scope": "",
+    "policy": "Test responsibly",
+})
+
+
+def program_payload(scopes: Iterable[str] = ("https://example.com",), **overrides) -> Dict[str, Any]:
+    """
+    HackerOne program object ({"attributes": {...}}) built from a shared template
+
+    Each URL in scopes becomes a bounty-eligible structured scope; keyword
+    arguments replace top-level attributes. Every call returns fresh dicts.
+    """
+    attributes = {**_PROGRAM_TEMPLATE, **overrides}
+    attributes.setdefault("structured_scopes", {"data": [
+        {"attributes": {"asset_type": "URL", "asset_identifier": url,
+                        "eligible_for_bounty": True, "eligible_for_submission": True}}
+        for url in scopes
+    ]})
+    return {"attributes": attributes}
+
+
+# Canned analyze_bounty completion shared by the unit and integration tests,
+# serialized once at import (with orjson when installed) rather than in every test
+ANALYSIS_JSON = _dumps({
+    "in_scope_targets": ["https://test.example.com"],
+    "out_of_scope_items": ["*.example.com/admin/*"],
+    "rules_and_restrictions": ["Test responsibly"],
+    "reward_information": "Bounties available",
+    "testing_guidelines": ["Follow responsible disclosure"],
+}).decode()
+ANALYSIS_RESPONSE = {"choices": [{"message": {"content": ANALYSIS_JSON}}]}
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _no_network():
+    """Fail fast if a test reaches a real host instead of waiting out a 120s API timeout"""
+    real_connect = socket.socket.connect
+
+    def guard(sock, address):
+        if sock.family == socket.AF_UNIX:
+            return real_connect(sock, address)
+        raise RuntimeError(f"network access blocked in tests: {address!r}")
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(socket.socket, "connect", guard)
+        mp.setattr(socket.socket, "connect_ex", guard)
+        yield
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch):
+    """Retry delays never really sleep; the requested durations are recorded instead"""
+    calls = []
+    monkeypatch.setattr("security_suite.sleep", calls.append)
+    return calls
+
+
+_MISSING = object()
+
+
+def _reset_instance(obj, baseline: Dict[str, Any]):
+    """
+    Put the instance's attributes back to a vars() snapshot
+
+    Attributes a test added (e.g. a lowered TTL) are dropped and ones it reassigned
+    (e.g. timeout or session) get their original objects back.
+    """
+    attrs = vars(obj)
+    for name in attrs.keys() - baseline.keys():
+        delattr(obj, name)
+    for name, value in baseline.items():
+        if attrs.get(name, _MISSING) is not value:
+            setattr(obj, name, value)
+
+
+@pytest.fixture(scope="module")
+def _shared_h1_client():
+    client = HackerOneAPI("testuser", "testtoken")
+    yield client, dict(vars(client))
+    client.close()
+
+
+@pytest.fixture
+def h1_client(_shared_h1_client):
+    """HackerOne client shared across a module, with an empty response cache for each test"""
+    client, baseline = _shared_h1_client
+    client.invalidate_cache()
+    yield client
+    _reset_instance(client, baseline)
+
+
+@pytest.fixture(scope="session")
+def _shared_suites():
+    """DeepSeek clients kept for the run, one per distinct set of constructor arguments"""
+    suites: Dict[tuple, Tuple[DeepSeekSecuritySuite, Dict[str, Any]]] = {}
+    yield suites
+    for suite, _ in suites.values():
+        suite.close()
+
+
+@pytest.fixture
+def suite(request, _shared_suites):
+    """
+    DeepSeek client shared across the run, with empty history and response cache for each test
+
+    Constructor options come from indirect parametrization, e.g.
+    @pytest.mark.parametrize("suite", [{"max_retries": 3}], indirect=True)
+    """
+    options = getattr(request, "param", {})
+    key = tuple(sorted(options.items()))
+    if key not in _shared_suites:
+        suite = DeepSeekSecuritySuite("test-key", **options)
+        suite.session  # build the lazy session now so it is part of the kept baseline
+        _shared_suites[key] = suite, dict(vars(suite))
+    suite, baseline = _shared_suites[key]
+    suite.clear_history()
+    suite._resp_cache.clear()
+    yield suite
+    if "session" not in vars(suite):
+        # The test closed the client, so the next test gets a new one
+        del _shared_suites[key]
+        suite.close()
+    else:
+        _reset_instance(suite, baseline)
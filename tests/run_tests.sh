@@ -11,37 +11,51 @@ echo -e "${CYAN}║     Security Suite Test Runner            ║${NC}"
 echo -e "${CYAN}╚════════════════════════════════════════════╝${NC}"
 echo ""
 
+# Spread tests across CPU cores when pytest-xdist is installed; xdist_group classes stay together
+PARALLEL=""
+if python -c "import xdist" 2>/dev/null; then
+    PARALLEL="-n auto --dist=loadgroup"
+fi
+
+# Keep pytest's cache (last-failed list, step-wise state) in RAM where tmpfs is available
+CACHE=""
+if [ -d /dev/shm ] && [ -w /dev/shm ]; then
+    CACHE="-o cache_dir=/dev/shm/pytest_cache_$(id -u)"
+fi
+
 if [ "$1" == "all" ] || [ -z "$1" ]; then
     echo -e "${YELLOW}Running all tests...${NC}"
-    pytest test_*.py -v --tb=short
+    pytest test_*.py $PARALLEL $CACHE -v --tb=short
+
+elif [ "$1" == "fast" ] || [ "$1" == "f" ]; then
+    echo -e "${YELLOW}Re-running last failures first, stopping at the first error...${NC}"
+    pytest test_*.py --lf -x $PARALLEL $CACHE -q
 
 elif [ "$1" == "hackerone" ] || [ "$1" == "h1" ]; then
     echo -e "${YELLOW}Running HackerOne API tests...${NC}"
-    pytest test_hackerone_api.py -v
+    pytest test_hackerone_api.py $CACHE -v
 
 elif [ "$1" == "deepseek" ] || [ "$1" == "ds" ]; then
     echo -e "${YELLOW}Running DeepSeek client tests...${NC}"
-    pytest test_sec_deepseek.py -v
+    pytest test_sec_deepseek.py $CACHE -v
 
 elif [ "$1" == "integration" ] || [ "$1" == "int" ]; then
     echo -e "${YELLOW}Running integration tests...${NC}"
-    pytest test_integration.py -v
+    pytest test_integration.py $CACHE -v
 
 elif [ "$1" == "timeout" ]; then
     echo -e "${YELLOW}Running timeout-specific tests...${NC}"
-    pytest test_sec_deepseek.py::TestDeepSeekSecuritySuite::test_call_deepseek_timeout_with_retry -v
-    pytest test_sec_deepseek.py::TestDeepSeekSecuritySuite::test_call_deepseek_all_retries_timeout -v
-    pytest test_sec_deepseek.py::TestDeepSeekSecuritySuite::test_call_deepseek_connection_error_with_retry -v
+    pytest test_sec_deepseek.py $CACHE -v -k "retry_behavior or all_retries_timeout or retry_after"
 
 elif [ "$1" == "quick" ] || [ "$1" == "q" ]; then
     echo -e "${YELLOW}Running quick smoke tests...${NC}"
     pytest test_hackerone_api.py::TestHackerOneAPI::test_init_with_valid_credentials \
            test_sec_deepseek.py::TestDeepSeekSecuritySuite::test_init_with_valid_api_key \
-           test_integration.py::TestIntegration::test_fetch_and_analyze_workflow -v
+           test_integration.py::TestIntegration::test_fetch_and_analyze_workflow $CACHE -v
 
 elif [ "$1" == "coverage" ] || [ "$1" == "cov" ]; then
     echo -e "${YELLOW}Running tests with coverage report...${NC}"
-    pytest test_*.py --cov=. --cov-report=term --cov-report=html
+    pytest test_*.py $PARALLEL $CACHE --cov=. --cov-report=term --cov-report=html
     echo -e "${GREEN}Coverage report generated in htmlcov/index.html${NC}"
 
 elif [ "$1" == "help" ] || [ "$1" == "-h" ]; then
@@ -49,6 +63,7 @@ elif [ "$1" == "help" ] || [ "$1" == "-h" ]; then
     echo ""
     echo "Options:"
     echo "  all, (default)  - Run all tests"
+    echo "  fast, f         - Re-run last failures only (all if none), stop at first error"
     echo "  hackerone, h1   - Run HackerOne API tests only"
     echo "  deepseek, ds    - Run DeepSeek client tests only"
     echo "  integration, int- Run integration tests only"
@@ -3,21 +3,25 @@
 Unit tests for HackerOne API client
 """
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch
 import requests
-from hackerone_api import HackerOneAPI
+import re
+from conftest import fake_response, program_payload
+from hackerone_api import HackerOneAPI, ProgramView, export_program
+
+BASE_URL = HackerOneAPI.BASE_URL
+_TIMED_OUT_RE = re.compile(r"timed out")
 
 
 class TestHackerOneAPI:
     """Test suite for HackerOne API client"""
 
-    def test_init_with_valid_credentials(self):
+    def test_init_with_valid_credentials(self, h1_client):
         """Test initialization with valid credentials"""
-        client = HackerOneAPI("testuser", "testtoken")
-        assert client.auth == ("testuser", "testtoken")
-        assert client.timeout == 30
-        assert "Accept" in client.headers
-        assert "application/json" in client.headers["Accept"]
+        assert h1_client.auth == ("testuser", "testtoken")
+        assert h1_client.timeout == 30
+        assert "Accept" in h1_client.headers
+        assert "application/json" in h1_client.headers["Accept"]
 
     def test_init_without_credentials(self):
         """Test initialization fails without credentials"""
@@ -29,98 +33,121 @@ class TestHackerOneAPI:
         client = HackerOneAPI("testuser", "testtoken", timeout=60)
         assert client.timeout == 60
 
-    @patch('requests.request')
-    def test_make_request_success(self, mock_request):
+    def test_session_reused_and_closed(self):
+        """Test the pooled session carries auth and is closed on exit"""
+        with patch('requests.Session.close') as mock_close:
+            with HackerOneAPI("testuser", "testtoken") as client:
+                assert client.session.auth == ("testuser", "testtoken")
+                assert client.session.headers["Accept"] == "application/json"
+        mock_close.assert_called_once()
+
+    def test_make_request_success(self, requests_mock, h1_client):
         """Test successful API request"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"data": [{"id": "1"}]}
-        mock_request.return_value = mock_response
+        requests_mock.get(f"{BASE_URL}/hackers/programs", json={"data": [{"id": "1"}]})
 
-        client = HackerOneAPI("testuser", "testtoken")
-        result = client._make_request("GET", "hackers/programs")
+        result = h1_client._make_request("GET", "hackers/programs")
 
         assert result == {"data": [{"id": "1"}]}
-        mock_request.assert_called_once()
+        assert requests_mock.call_count == 1
 
-    @patch('requests.request')
-    def test_make_request_401_error(self, mock_request):
+    def test_make_request_401_error(self, requests_mock):
         """Test authentication failure"""
-        mock_response = Mock()
-        mock_response.status_code = 401
-        mock_response.text = "Unauthorized"
-        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=mock_response)
-        mock_request.return_value = mock_response
+        requests_mock.get(f"{BASE_URL}/hackers/programs", status_code=401, text="Unauthorized")
 
         client = HackerOneAPI("baduser", "badtoken")
 
         with pytest.raises(Exception, match="Authentication failed"):
             client._make_request("GET", "hackers/programs")
 
-    @patch('requests.request')
-    def test_make_request_404_error(self, mock_request):
+    def test_make_request_404_error(self, requests_mock, h1_client):
         """Test resource not found"""
-        mock_response = Mock()
-        mock_response.status_code = 404
-        mock_response.text = "Not Found"
-        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=mock_response)
-        mock_request.return_value = mock_response
-
-        client = HackerOneAPI("testuser", "testtoken")
+        requests_mock.get(f"{BASE_URL}/hackers/programs/nonexistent", status_code=404, text="Not Found")
 
         with pytest.raises(Exception, match="Resource not found"):
-            client._make_request("GET", "hackers/programs/nonexistent")
+            h1_client._make_request("GET", "hackers/programs/nonexistent")
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_make_request_timeout(self, mock_request):
         """Test request timeout"""
         mock_request.side_effect = requests.exceptions.Timeout()
 
         client = HackerOneAPI("testuser", "testtoken", timeout=5)
 
-        with pytest.raises(Exception, match="timed out"):
+        with pytest.raises(Exception, match=_TIMED_OUT_RE):
             client._make_request("GET", "hackers/programs")
 
-    @patch('requests.request')
-    def test_list_programs(self, mock_request):
+    @patch('requests.Session.request')
+    def test_list_programs(self, mock_request, h1_client):
         """Test listing programs"""
         # Mock first page
-        mock_response1 = Mock()
-        mock_response1.status_code = 200
-        mock_response1.json.return_value = {
+        mock_response1 = fake_response(200, {
             "data": [
                 {"id": "1", "attributes": {"handle": "program1", "name": "Program 1"}},
                 {"id": "2", "attributes": {"handle": "program2", "name": "Program 2"}}
             ],
             "links": {"next": "page2"}
-        }
+        })
 
         # Mock second page (last page)
-        mock_response2 = Mock()
-        mock_response2.status_code = 200
-        mock_response2.json.return_value = {
+        mock_response2 = fake_response(200, {
             "data": [
                 {"id": "3", "attributes": {"handle": "program3", "name": "Program 3"}}
             ],
             "links": {}  # No next link
-        }
+        })
 
-        mock_request.side_effect = [mock_response1, mock_response2]
+        mock_request.side_effect = iter([mock_response1, mock_response2])
 
-        client = HackerOneAPI("testuser", "testtoken")
-        programs = client.list_programs(page_size=2)
+        programs = h1_client.list_programs(page_size=2)
 
         assert len(programs) == 3
         assert programs[0]["id"] == "1"
         assert programs[2]["id"] == "3"
         assert mock_request.call_count == 2
 
-    @patch('requests.request')
-    def test_get_program(self, mock_request):
+    @patch('requests.Session.request')
+    def test_list_programs_concurrent_pages(self, mock_request, h1_client):
+        """Test remaining pages are fetched once the total page count is known"""
+        def respond(method, url, params=None, **kwargs):
+            page = params["page[number]"]
+            mock_response = fake_response(200, {
+                "data": [{"id": str(page), "attributes": {"handle": f"program{page}"}}],
+                "links": {"next": "more"} if page < 3 else {},
+                "meta": {"total_pages": 3}
+            })
+            return mock_response
+
+        mock_request.side_effect = respond
+
+        programs = h1_client.list_programs(page_size=1)
+
+        assert [p["id"] for p in programs] == ["1", "2", "3"]
+        assert mock_request.call_count == 3
+
+    def test_iter_programs_lazy(self, requests_mock, h1_client):
+        """Test programs are yielded page by page and paging stops early"""
+        requests_mock.get(f"{BASE_URL}/hackers/programs", json={
+            "data": [
+                {"id": "1", "attributes": {"handle": "stripe", "name": "Stripe"}},
+                {"id": "2", "attributes": {"handle": "security", "name": "HackerOne"}}
+            ],
+            "links": {}
+        })
+
+        programs = h1_client.iter_programs(page_size=2)
+
+        assert next(programs)["id"] == "1"
+        assert next(programs)["id"] == "2"
+        assert next(programs, None) is None
+        assert requests_mock.call_count == 1
+
+        matches = h1_client.search_programs("s", limit=1)
+        assert len(matches) == 1
+        assert matches[0]["attributes"]["handle"] == "stripe"
+
+    def test_get_program(self, requests_mock, h1_client):
         """Test getting specific program details"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
+        requests_mock.get(f"{BASE_URL}/hackers/programs/security", json={
             "data": {
                 "id": "1",
                 "attributes": {
@@ -129,17 +156,82 @@ class TestHackerOneAPI:
                     "url": "https://hackerone.com/security"
                 }
             }
-        }
-        mock_request.return_value = mock_response
+        })
 
-        client = HackerOneAPI("testuser", "testtoken")
-        program = client.get_program("security")
+        program = h1_client.get_program("security")
 
         assert program["id"] == "1"
         assert program["attributes"]["handle"] == "security"
-        mock_request.assert_called_once()
+        assert requests_mock.call_count == 1
+
+    def test_get_program_invalid_handle(self, requests_mock, h1_client):
+        """Test malformed handles are rejected before any request is made"""
+
+        for handle in ["../../etc/passwd", "", "a b", "x" * 65]:
+            with pytest.raises(ValueError, match="Invalid handle"):
+                h1_client.get_program(handle)
+
+        assert not requests_mock.called
+
+    def test_get_program_cached(self, requests_mock, h1_client):
+        """Test repeat lookups are served from the TTL cache until invalidated"""
+        requests_mock.get(f"{BASE_URL}/hackers/programs/security",
+                          json={"data": {"id": "1", "attributes": {"handle": "security"}}})
+
+        assert h1_client.get_program("security") == h1_client.get_program("security")
+        assert requests_mock.call_count == 1
+
+        h1_client.invalidate_cache("security")
+        h1_client.get_program("security")
+        assert requests_mock.call_count == 2
+
+    def test_cache_evicts_least_recently_used(self, requests_mock, h1_client):
+        """Test the response cache stays bounded and keeps recently used entries"""
+        requests_mock.get(re.compile(f"{BASE_URL}/hackers/programs/"),
+                          json={"data": {"id": "1", "attributes": {"handle": "security"}}})
+
+        h1_client.CACHE_MAX_ENTRIES = 2
+        h1_client.get_program("a")
+        h1_client.get_program("b")
+        h1_client.get_program("a")
+        h1_client.get_program("c")
+        assert list(h1_client._cache) == [("program", "a"), ("program", "c")]
+        assert requests_mock.call_count == 3
+
+    @patch('requests.Session.request')
+    def test_get_programs_bulk(self, mock_request, h1_client):
+        """Test bulk lookups return programs in handle order"""
+        def respond(method, url, **kwargs):
+            handle = url.rsplit("/", 1)[-1]
+            mock_response = fake_response(200, {"data": {"attributes": {"handle": handle}}})
+            return mock_response
+
+        mock_request.side_effect = respond
+
+        programs = h1_client.get_programs_bulk(["security", "stripe", "rails"])
+
+        assert [p["attributes"]["handle"] for p in programs] == ["security", "stripe", "rails"]
+        assert mock_request.call_count == 3
+        assert h1_client.get_programs_bulk([]) == []
+
+    @patch('requests.Session.request')
+    def test_get_program_stale_on_error(self, mock_request, h1_client):
+        """Test an expired cached program is served when the API fails"""
+        mock_response = fake_response(200, {"data": {"id": "1", "attributes": {"handle": "security"}}})
+        mock_request.side_effect = iter([mock_response, requests.exceptions.Timeout()])
+
+        h1_client.PROGRAM_CACHE_TTL = 0
+        program = h1_client.get_program("security")
 
-    def test_search_programs(self):
+        assert h1_client.get_program("security") == program
+        assert mock_request.call_count == 2
+
+        # Nothing cached to fall back on
+        mock_request.side_effect = requests.exceptions.Timeout()
+        with pytest.raises(Exception, match=_TIMED_OUT_RE):
+            h1_client.get_program("other")
+
+    def test_search_programs(self, h1_client):
         """Test searching programs"""
         programs = [
             {"attributes": {"handle": "stripe", "name": "Stripe"}},
@@ -147,59 +239,77 @@ class TestHackerOneAPI:
             {"attributes": {"handle": "rails", "name": "Ruby on Rails"}}
         ]
 
-        client = HackerOneAPI("testuser", "testtoken")
-
         # Search by handle
-        matches = client.search_programs("stripe", programs)
+        matches = h1_client.search_programs("stripe", programs)
         assert len(matches) == 1
         assert matches[0]["attributes"]["handle"] == "stripe"
 
         # Search by name (case insensitive)
-        matches = client.search_programs("hackerone", programs)
+        matches = h1_client.search_programs("hackerone", programs)
         assert len(matches) == 1
         assert matches[0]["attributes"]["handle"] == "security"
 
         # Search with no matches
-        matches = client.search_programs("nonexistent", programs)
+        matches = h1_client.search_programs("nonexistent", programs)
         assert len(matches) == 0
 
         # Search partial match
-        matches = client.search_programs("rail", programs)
+        matches = h1_client.search_programs("rail", programs)
         assert len(matches) == 1
         assert matches[0]["attributes"]["handle"] == "rails"
 
-    def test_format_program_details(self):
+        # Short queries bypass the trigram index
+        matches = h1_client.search_programs("on", programs)
+        assert [m["attributes"]["handle"] for m in matches] == ["security", "rails"]
+
+        # Programs appended to an already indexed list are picked up
+        programs.append({"attributes": {"handle": "gitlab", "name": "GitLab"}})
+        matches = h1_client.search_programs("gitlab", programs)
+        assert [m["attributes"]["handle"] for m in matches] == ["gitlab"]
+
+    def test_search_programs_server_filter(self, requests_mock, h1_client):
+        """Test searching without a cached listing uses the filter[name] parameter"""
+        requests_mock.get(f"{BASE_URL}/hackers/programs", json={
+            "data": [{"id": "1", "attributes": {"handle": "shopify", "name": "Shopify"}}],
+            "links": {}
+        })
+
+        matches = h1_client.search_programs("shop")
+
+        assert [m["id"] for m in matches] == ["1"]
+        assert requests_mock.last_request.qs["filter[name]"] == ["shop"]
+        assert requests_mock.call_count == 1
+
+        # Repeat queries (any case) are served from the search cache
+        assert h1_client.search_programs("SHOP") == matches
+        assert requests_mock.call_count == 1
+
+    @patch('requests.Session.request')
+    def test_search_programs_server_filter_max_pages(self, mock_request, h1_client):
+        """Test the server-side search stops after max_pages"""
+        def respond(method, url, params=None, **kwargs):
+            page = params["page[number]"]
+            mock_response = fake_response(200, {
+                "data": [{"id": str(page), "attributes": {"handle": f"shop{page}"}}],
+                "links": {"next": "more"},
+                "meta": {"total_pages": 10}
+            })
+            return mock_response
+
+        mock_request.side_effect = respond
+
+        matches = h1_client.search_programs("shop", max_pages=3)
+
+        assert [m["id"] for m in matches] == ["1", "2", "3"]
+        assert mock_request.call_count == 3
+
+    def test_format_program_details(self, h1_client):
         """Test formatting program details"""
-        program = {
-            "attributes": {
-                "name": "Test Program",
-                "handle": "testprog",
-                "url": "https://hackerone.com/testprog",
-                "state": "open",
-                "submission_state": "open",
-                "offers_bounties": True,
-                "offers_swag": False,
-                "resolved_report_count": 100,
-                "currency": "USD",
-                "structured_scopes": {
-                    "data": [
-                        {
-                            "attributes": {
-                                "asset_type": "URL",
-                                "asset_identifier": "https://example.com",
-                                "eligible_for_bounty": True,
-                                "eligible_for_submission": True
-                            }
-                        }
-                    ]
-                },
-                "targets_out_of_scope": "*.example.com/admin",
-                "policy": "Please follow responsible disclosure"
-            }
-        }
+        program = program_payload(offers_swag=False, resolved_report_count=100, currency="USD",
+                                  targets_out_of_scope="*.example.com/admin",
+                                  policy="Please follow responsible disclosure")
 
-        client = HackerOneAPI("testuser", "testtoken")
-        formatted = client.format_program_details(program)
+        formatted = h1_client.format_program_details(program)
 
         assert "Test Program" in formatted
         assert "testprog" in formatted
@@ -208,34 +318,39 @@ class TestHackerOneAPI:
         assert "*.example.com/admin" in formatted
         assert "responsible disclosure" in formatted
 
-    def test_export_program_for_analysis(self):
-        """Test exporting program for AI analysis"""
+    def test_program_view(self, h1_client):
+        """Test ProgramView flattens the program and formats like the raw dict"""
         program = {
             "attributes": {
                 "name": "Test Program",
                 "handle": "testprog",
-                "url": "https://hackerone.com/testprog",
-                "state": "open",
-                "submission_state": "open",
-                "offers_bounties": True,
                 "structured_scopes": {
-                    "data": [
-                        {
-                            "attributes": {
-                                "asset_type": "URL",
-                                "asset_identifier": "https://example.com",
-                                "eligible_for_bounty": True
-                            }
-                        }
-                    ]
+                    "data": [{"attributes": {"asset_type": "URL", "asset_identifier": "https://example.com"}}]
                 },
-                "targets_out_of_scope": "Admin panels",
                 "policy": "Test responsibly"
             }
         }
 
-        client = HackerOneAPI("testuser", "testtoken")
-        exported = client.export_program_for_analysis(program)
+        view = ProgramView.from_api(program)
+        assert view.name == "Test Program"
+        assert view.url is None
+        assert view.scopes[0].asset_identifier == "https://example.com"
+        assert view.scopes[0].eligible_for_submission is True
+        assert view.policy_truncated is False
+        assert view.policy_display == "Test responsibly"
+
+        long_view = ProgramView.from_api({"policy": "x" * 1500})
+        assert long_view.policy_truncated is True
+        assert long_view.policy_display == "x" * 1000 + "..."
+
+        assert h1_client.format_program_details(view) == h1_client.format_program_details(program)
+        assert h1_client.export_program_for_analysis(view) == h1_client.export_program_for_analysis(program)
+
+    def test_export_program_for_analysis(self, h1_client):
+        """Test exporting program for AI analysis"""
+        program = program_payload(targets_out_of_scope="Admin panels")
+
+        exported = h1_client.export_program_for_analysis(program)
 
         assert "BUG BOUNTY PROGRAM DETAILS" in exported
         assert "Test Program" in exported
@@ -246,6 +361,17 @@ class TestHackerOneAPI:
         assert "POLICY & RULES" in exported
         assert "Test responsibly" in exported
 
+    def test_export_program_to_out_dir(self, requests_mock, tmp_path, h1_client):
+        """Test exports are written into the requested directory"""
+        requests_mock.get(f"{BASE_URL}/hackers/programs/testprog",
+                          json={"data": {"attributes": {"name": "Test Program", "handle": "testprog"}}})
+
+        text = export_program(h1_client, "testprog", str(tmp_path))
+
+        exported = tmp_path / "testprog_bounty_details.txt"
+        assert exported.read_text(encoding="utf-8") == text
+        assert "Test Program" in text
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for tool output parsing
+"""
+import pytest
+
+import output_parser
+from output_parser import OutputParser, parse_file
+
+
+@pytest.mark.xdist_group(name="pure")
+class TestAutoDetect:
+    """Test tool detection in OutputParser.parse"""
+
+    def test_bare_domain_list_is_subfinder(self):
+        """Test plain subfinder stdout is recognised without the word 'subfinder'"""
+        output = "\n".join(["", "api.example.com", "www.example.com", "dev.api.example.com", "mail.example.com"])
+        assert OutputParser.parse(output) == {
+            "subdomains": ["api.example.com", "www.example.com", "dev.api.example.com", "mail.example.com"]}
+
+    @pytest.mark.parametrize("output", [
+        "https://www.x.com/p?a=1\nhttps://www.x.com/q\nhttp://cdn.x.com/a.js\nhttps://api.x.com/v1/",
+        "www.x.com:443\napi.x.com:8443\ncdn.x.com:80",
+        "2024-01-01 host a.b.com\n2024-01-01 host c.d.com\n2024-01-01 host e.f.com",
+    ], ids=["urls", "host-ports", "log-lines"])
+    def test_non_hostname_lines_not_detected(self, output):
+        """Test URL lists, host:port lists and log lines are not taken for subdomains"""
+        assert OutputParser.parse(output) is None
+
+    def test_bytes_decoded_in_full_only_for_text_parsers(self):
+        """Test detection decodes just the prefix, so bytes parsers never see a full decode"""
+        decoded = []
+
+        class RecordingBytes(bytes):
+            # Slicing returns plain bytes, so only whole-document decodes are recorded
+            def decode(self, *args, **kwargs):
+                decoded.append(len(self))
+                return super().decode(*args, **kwargs)
+
+        xml = RecordingBytes(b'<?xml version="1.0"?><nmaprun scanner="nmap">'
+                             + b'<!-- padding -->' * 1000 + b'<host></host></nmaprun>')
+        assert OutputParser.parse(xml) == {"hosts": [{"addresses": [], "ports": []}]}
+        assert decoded == []
+
+        assert OutputParser.parse(RecordingBytes(b"subfinder\napi.example.com\n")) == {
+            "subdomains": ["subfinder", "api.example.com"]}
+        assert decoded == [len(b"subfinder\napi.example.com\n")]
+
+    def test_domain_list_check_reads_only_the_first_lines(self):
+        """Test only the leading lines are checked, however long the output is"""
+        hostnames = "\n".join(f"h{i}.example.com" for i in range(3))
+        urls = "\n".join(f"https://example.com/{i}" for i in range(20))
+        assert OutputParser._looks_like_domain_list(urls + "\n" + hostnames * 1000) is False
+        assert OutputParser._looks_like_domain_list(hostnames + "\n" + urls * 1000) is True
+
+
+@pytest.mark.xdist_group(name="pure")
+class TestNmap:
+    """Test the nmap parsers"""
+
+    def test_parse_nmap_simple_open_ports(self):
+        """Test only open tcp rows are kept, and the result has just the open_ports key"""
+        output = ("Nmap scan report for example.com (93.184.216.34)\n"
+                  "PORT    STATE    SERVICE\n"
+                  "22/tcp  filtered ssh\n"
+                  "80/tcp  open     http\n"
+                  "443/tcp open     https\n")
+        assert OutputParser.parse(output) == {"open_ports": [
+            {"port": "80/tcp", "state": "open", "service": "http"},
+            {"port": "443/tcp", "state": "open", "service": "https"},
+        ]}
+
+    def test_parse_nmap_xml_hosts_ports_services(self):
+        """Test every host is streamed out with its addresses, ports and service attributes"""
+        xml = (b'<?xml version="1.0"?><nmaprun scanner="nmap" args="nmap -oX - example.com">'
+               b'<host><address addr="10.0.0.1" addrtype="ipv4"/><ports>'
+               b'<port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/></port>'
+               b'<port protocol="tcp" portid="81"><state state="closed"/></port></ports></host>'
+               b'<host><address addr="10.0.0.2" addrtype="ipv4"/></host></nmaprun>')
+        expected = {"hosts": [
+            {"addresses": [{"addr": "10.0.0.1", "addrtype": "ipv4"}],
+             "ports": [{"protocol": "tcp", "portid": "22", "service": {"name": "ssh"}},
+                       {"protocol": "tcp", "portid": "81"}]},
+            {"addresses": [{"addr": "10.0.0.2", "addrtype": "ipv4"}], "ports": []},
+        ]}
+        assert OutputParser.parse(xml) == expected
+        assert OutputParser.parse(xml.decode(), tool="nmap_xml") == expected
+
+
+@pytest.mark.xdist_group(name="pure")
+class TestJsonParsers:
+    """Test the JSON tool output parsers"""
+
+    def test_parse_ffuf_json_picks_report_fields(self):
+        """Test ffuf documents are detected and each result keeps only the reported fields, with defaults"""
+        output = ('{"commandline": "ffuf -u https://example.com/FUZZ -of json", "results": ['
+                  '{"url": "https://example.com/admin", "status": 301, "length": 0, "words": 1, "lines": 1,'
+                  ' "redirectlocation": "/admin/", "duration": 1200, "input": {"FUZZ": "admin"}},'
+                  '{"url": "https://example.com/.git", "status": 200}]}')
+        assert OutputParser.parse(output.encode()) == {"ffuf_results": [
+            {"url": "https://example.com/admin", "status": 301, "length": 0, "words": 1, "lines": 1,
+             "redirectlocation": "/admin/", "duration": 1200},
+            {"url": "https://example.com/.git", "status": 200, "length": 0, "words": 0, "lines": 0,
+             "redirectlocation": "", "duration": 0},
+        ]}
+        assert OutputParser.parse('{"commandline": "ffuf"}', tool="ffuf_json") == {"ffuf_results": []}
+
+    def test_parse_httpx_json_lines(self):
+        """Test one record per non-blank line, from str or bytes"""
+        output = '{"url": "https://a.example.com", "status_code": 200}\n\n{"url": "https://b.example.com", "status_code": 404}\n'
+        expected = {"httpx_results": [{"url": "https://a.example.com", "status_code": 200},
+                                      {"url": "https://b.example.com", "status_code": 404}]}
+        assert OutputParser.parse(output) == expected
+        assert OutputParser.parse(output.encode(), tool="httpx") == expected
+
+    @pytest.fixture
+    def parallel_json(self, monkeypatch):
+        monkeypatch.setattr(output_parser, "PARALLEL_JSON_THRESHOLD", 0)
+        output_parser.set_parallel_json(3)
+        yield
+        output_parser.set_parallel_json(0)
+
+    @pytest.mark.parametrize("as_bytes", [True, False], ids=["bytes", "str"])
+    def test_parse_httpx_large_output_in_parallel(self, parallel_json, as_bytes):
+        """Test outputs over the threshold are split on line boundaries and decoded in order across processes"""
+        output = "".join('{"n": %d, "status_code": 200}\n' % n for n in range(50))
+        if as_bytes:
+            output = output.encode()
+        assert [record["n"] for record in OutputParser.parse_httpx(output)["httpx_results"]] == list(range(50))
+        # The spawned pool is kept for later calls
+        pool = output_parser._pool
+        assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+        OutputParser.parse_httpx(output)
+        assert output_parser._pool is pool
+
+    def test_parse_httpx_parallel_is_opt_in(self, monkeypatch):
+        """Test no process pool is started unless set_parallel_json was called"""
+        monkeypatch.setattr(output_parser, "PARALLEL_JSON_THRESHOLD", 0)
+        output = b'{"n": 1}\n{"n": 2}\n'
+        assert OutputParser.parse_httpx(output) == {"httpx_results": [{"n": 1}, {"n": 2}]}
+        assert output_parser._pool is None
+
+    @pytest.mark.parametrize("data", ["a\nbb\nccc\ndddd\n", b"a\nbb\nccc\ndddd", "single line"])
+    def test_line_chunks_split_after_newlines(self, data):
+        """Test chunks rejoin to the input and every chunk but the last ends with a newline"""
+        chunks = list(output_parser._line_chunks(data, 3))
+        assert data[:0].join(chunks) == data
+        newline = b"\n" if isinstance(data, bytes) else "\n"
+        assert all(chunk.endswith(newline) for chunk in chunks[:-1])
+
+
+@pytest.mark.xdist_group(name="pure")
+class TestTextParsers:
+    """Test the line-oriented parsers and file entry point"""
+
+    def test_parse_subfinder_skips_logs_and_comments(self):
+        """Test blank, '[INF]' log and '#' comment lines are dropped and hostnames stripped"""
+        output = "[INF] Enumerating subdomains for example.com\n  api.example.com  \n\n# found\nwww.example.com\n"
+        assert OutputParser.parse(output, tool="subfinder") == {"subdomains": ["api.example.com", "www.example.com"]}
+
+    def test_parse_file_reads_bytes(self, tmp_path):
+        """Test files are read as bytes and decoded only for text parsers"""
+        path = tmp_path / "subs.txt"
+        path.write_bytes("subfinder\napi.example.com\ncafé.example.com\n".encode())
+        assert parse_file(str(path)) == {"subdomains": ["subfinder", "api.example.com", "café.example.com"]}
+        # An unknown tool name falls back to auto-detection
+        assert parse_file(str(path), tool="unknown") == parse_file(str(path))
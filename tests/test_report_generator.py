@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for report generation
+"""
+from datetime import datetime
+
+import pytest
+
+import report_generator
+from report_generator import ReportGenerator
+
+
+class _FrozenDatetime:
+    """Fixed clock so rendered reports compare equal"""
+
+    @staticmethod
+    def now():
+        return datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def session_data():
+    return {
+        "session_id": "20240101_000000",
+        "target": "example.com",
+        "program": "example",
+        "findings": [
+            {"severity": "low", "title": "Banner", "description": "Server banner", "tool": "nmap"},
+            {"severity": "Critical", "title": "<script>alert(1)</script>", "description": "a & b", "tool": None},
+            {"severity": "medium", "title": "CSRF", "description": "Missing token", "evidence": "POST /x"},
+            {"severity": "high", "title": "SQLi", "description": "Error based"},
+        ],
+    }
+
+
+@pytest.mark.xdist_group(name="pure")
+class TestReportGenerator:
+    """Test the markdown and HTML report renderers"""
+
+    def test_summarize_orders_most_severe_first(self, session_data):
+        """Test findings sort by severity, case-insensitively, with unknown severities last"""
+        findings = session_data["findings"] + [{"severity": "bogus", "title": "?", "description": ""}]
+        by_severity, ordered = ReportGenerator._summarize(findings)
+        assert [f["title"] for f in ordered] == ["<script>alert(1)</script>", "SQLi", "CSRF", "Banner", "?"]
+        assert ReportGenerator._severity_breakdown(by_severity) == \
+            "critical: 1, high: 1, medium: 1, low: 1, bogus: 1"
+
+    def test_markdown_report(self, session_data):
+        """Test the markdown report has the summary, ordered findings and evidence blocks"""
+        report = ReportGenerator()._generate_markdown(session_data)
+        assert "- **Program:** example\n" in report
+        assert "- **By Severity:** critical: 1, high: 1, medium: 1, low: 1\n" in report
+        assert report.index("[CRITICAL]") < report.index("[HIGH] SQLi") < report.index("[LOW] Banner")
+        assert "**Evidence:**\n```\nPOST /x\n```\n" in report
+
+    @pytest.mark.parametrize("jinja", [True, False], ids=["jinja2", "fallback"])
+    def test_html_report_escapes_and_orders(self, session_data, jinja):
+        """Test the template and the plain fallback both escape findings and sort them"""
+        generator = ReportGenerator()
+        if not jinja:
+            generator._env = None
+        report = generator._generate_html(session_data)
+        assert "<script>" not in report
+        assert "&lt;script&gt;alert(1)&lt;/script&gt;" in report
+        assert "a &amp; b" in report
+        assert "Total Findings: 4 (critical: 1, high: 1, medium: 1, low: 1)" in report
+        assert "<strong>Tool:</strong> N/A" in report
+        assert report.index("[CRITICAL]") < report.index("[HIGH] SQLi") < report.index("[LOW] Banner")
+
+    def test_html_without_jinja2(self, monkeypatch, session_data):
+        """Test no template environment is built when Jinja2 is missing"""
+        monkeypatch.setattr(report_generator, "HAS_JINJA2", False)
+        generator = ReportGenerator()
+        assert generator._env is None
+        assert "[HIGH] SQLi" in generator._generate_html(session_data)
+
+    @pytest.mark.parametrize("fmt, ext", [("html", "html"), ("md", "md"), ("markdown", "md")])
+    def test_save_report_streams_to_reports_dir(self, monkeypatch, tmp_path, session_data, fmt, ext):
+        """Test reports are written under reports/ and match the in-memory rendering"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(report_generator, "datetime", _FrozenDatetime)
+        generator = ReportGenerator()
+        path = generator.save_report(session_data, fmt)
+        assert path == f"reports/report_20240101_000000.{ext}"
+        render = generator._generate_html if ext == "html" else generator._generate_markdown
+        assert (tmp_path / path).read_text(encoding="utf-8") == render(session_data)
+
+    def test_save_report_rejects_unknown_format(self, monkeypatch, tmp_path, session_data):
+        """Test an unsupported format raises before anything is written"""
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(ValueError, match="Unsupported format: pdf"):
+            ReportGenerator().save_report(session_data, "pdf")
+        assert not (tmp_path / "reports").exists()
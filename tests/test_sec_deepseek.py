@@ -2,16 +2,20 @@
 """
 Unit tests for DeepSeek Security Suite - focusing on timeout and retry logic
 """
+import hashlib
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch, MagicMock
 import requests
 import json
-import time
-import sys
 import os
+import re
+import subprocess
+import sys
+import threading
+import time
 
-# Import the classes from sec.py
-sys.path.insert(0, os.path.dirname(__file__))
+from conftest import ANALYSIS_RESPONSE, fake_response
+from llm_cache import LLMCache
 from security_suite import (
     DeepSeekSecuritySuite,
     DeepSeekError,
@@ -19,10 +23,19 @@ from security_suite import (
     DeepSeekRequestError,
     DeepSeekResponseError,
     extract_tool_from_command,
-    filter_commands_by_availability
+    filter_commands_by_availability,
+    get_available_tools,
+    needs_shell,
+    print_stream,
+    run_streaming
 )
 
 
+API_URL = DeepSeekSecuritySuite.API_URL
+_TIMEOUT_RE = re.compile(r"Timeout after 3 attempts")
+_MISSING_CONTENT_RE = re.compile(r"missing 'content'|unexpected error")
+
+
 class TestDeepSeekSecuritySuite:
     """Test suite for DeepSeek client"""
 
@@ -54,18 +67,24 @@ class TestDeepSeekSecuritySuite:
         assert suite.timeout == 60
         assert suite.max_retries == 5
 
-    def test_set_system_prompt(self):
+    def test_session_reused_and_closed(self):
+        """Test the pooled session carries auth headers and is closed on exit"""
+        with patch('requests.Session.close') as mock_close:
+            with DeepSeekSecuritySuite("test-key", pool_size=32) as suite:
+                assert suite.session.headers["Authorization"] == "Bearer test-key"
+                assert suite.session.get_adapter(suite.API_URL)._pool_maxsize == 32
+        mock_close.assert_called_once()
+
+    def test_set_system_prompt(self, suite):
         """Test setting system prompt"""
-        suite = DeepSeekSecuritySuite("test-key")
         suite.set_system_prompt("You are a security expert")
 
         assert len(suite.conversation_history) == 1
         assert suite.conversation_history[0]["role"] == "system"
         assert suite.conversation_history[0]["content"] == "You are a security expert"
 
-    def test_clear_history(self):
+    def test_clear_history(self, suite):
         """Test clearing conversation history"""
-        suite = DeepSeekSecuritySuite("test-key")
         suite.conversation_history = [
             {"role": "user", "content": "test"},
             {"role": "assistant", "content": "response"}
@@ -73,214 +92,456 @@ class TestDeepSeekSecuritySuite:
         suite.clear_history()
         assert len(suite.conversation_history) == 0
 
-    @patch('requests.post')
-    def test_call_deepseek_success(self, mock_post):
+    def test_call_deepseek_success(self, requests_mock, suite):
         """Test successful API call"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
+        requests_mock.post(API_URL, json={
             "choices": [
                 {"message": {"content": "This is a test response"}}
             ]
-        }
-        mock_post.return_value = mock_response
+        })
 
-        suite = DeepSeekSecuritySuite("test-key")
         response = suite.call_deepseek("Test message")
 
         assert response == "This is a test response"
         assert len(suite.conversation_history) == 2
         assert suite.conversation_history[0]["role"] == "user"
         assert suite.conversation_history[1]["role"] == "assistant"
-        mock_post.assert_called_once()
-
-    @patch('requests.post')
-    @patch('time.sleep')
-    def test_call_deepseek_timeout_with_retry(self, mock_sleep, mock_post):
-        """Test timeout with successful retry"""
-        # First call times out, second succeeds
-        mock_response_success = Mock()
-        mock_response_success.status_code = 200
-        mock_response_success.json.return_value = {
-            "choices": [{"message": {"content": "Success after retry"}}]
-        }
-
-        mock_post.side_effect = [
-            requests.exceptions.Timeout(),
-            mock_response_success
-        ]
+        assert requests_mock.call_count == 1
 
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
-        response = suite.call_deepseek("Test message")
+    @patch('requests.Session.post')
+    @pytest.mark.parametrize("suite", [{"max_history_turns": 2}], indirect=True)
+    def test_history_sliding_window(self, mock_post, suite):
+        """Test only the last turns are sent and kept, with the system prompt preserved"""
+        mock_response = fake_response(200, {"choices": [{"message": {"content": "ok"}}]})
+        mock_post.return_value = mock_response
 
-        assert response == "Success after retry"
+        suite.set_system_prompt("system")
+        for i in range(4):
+            suite.call_deepseek(f"message {i}")
+
+        assert len(suite.conversation_history) == 5
+        assert suite.conversation_history[0]["content"] == "system"
+        assert suite.conversation_history[1]["content"] == "message 2"
+        sent = json.loads(mock_post.call_args.kwargs["data"])["messages"]
+        assert [m["content"] for m in sent] == ["system", "message 1", "ok", "message 2", "ok", "message 3"]
+
+    @patch('requests.Session.post')
+    def test_history_summary_and_log(self, mock_post, tmp_path):
+        """Test evicted turns are summarized into the payload and every turn is logged"""
+        def respond(url, data=None, timeout=None):
+            messages = json.loads(data)["messages"]
+            content = "summary" if messages[0]["content"] == DeepSeekSecuritySuite._SUMMARY_SYSTEM_PROMPT else "ok"
+            return fake_response(200, {"choices": [{"message": {"content": content}}]})
+        mock_post.side_effect = respond
+        history_path = tmp_path / "history.jsonl"
+
+        suite = DeepSeekSecuritySuite("test-key", max_history_turns=1,
+                                      history_path=str(history_path), summarize_history=True)
+        suite.call_deepseek("first")
+        suite.call_deepseek("second")
+        suite.call_deepseek("third")
+
+        assert suite.history_summary == "summary"
+        assert mock_post.call_count == 5  # three turns plus two summaries
+        sent = json.loads(mock_post.call_args_list[-2].kwargs["data"])["messages"]
+        assert sent[0] == {"role": "system", "content": "Earlier summary: summary"}
+        assert [m["content"] for m in sent[1:]] == ["second", "ok", "third"]
+        logged = [json.loads(line) for line in history_path.read_text().splitlines()]
+        assert [m["content"] for m in logged] == ["first", "ok", "second", "ok", "third", "ok"]
+
+    @patch('requests.Session.post')
+    def test_call_deepseek_response_cache(self, mock_post, tmp_path):
+        """Test identical requests are served from the cache, including across instances"""
+        mock_response = fake_response(200, {"choices": [{"message": {"content": "cached answer"}}]})
+        mock_post.return_value = mock_response
+        cache_path = str(tmp_path / "responses.sqlite")
+
+        with DeepSeekSecuritySuite("test-key", cache_path=cache_path) as suite:
+            assert suite.call_deepseek("Test message") == "cached answer"
+            suite.clear_history()
+            assert suite.call_deepseek("Test message") == "cached answer"
+            assert len(suite.conversation_history) == 2
+            suite.clear_history()
+            suite.call_deepseek("Test message", use_cache=False)
         assert mock_post.call_count == 2
-        assert mock_sleep.call_count == 1  # One retry delay
 
-    @patch('requests.post')
-    @patch('time.sleep')
-    def test_call_deepseek_all_retries_timeout(self, mock_sleep, mock_post):
+        with DeepSeekSecuritySuite("test-key", cache_path=cache_path) as suite:
+            assert suite.call_deepseek("Test message") == "cached answer"
+        assert mock_post.call_count == 2
+
+    def test_response_cache_evicts_least_recently_used(self, requests_mock, suite):
+        """Test the in-memory response cache keeps at most RESP_CACHE_MAX_ENTRIES, dropping the oldest"""
+        requests_mock.post(API_URL, json={"choices": [{"message": {"content": "ok"}}]})
+        suite.RESP_CACHE_MAX_ENTRIES = 2
+        for message in ("a", "b", "a", "c"):
+            suite.clear_history()
+            suite.call_deepseek(message)
+        # "a" was reused before "c" arrived, so "b" was the one dropped
+        assert requests_mock.call_count == 3
+        assert len(suite._resp_cache) == 2
+        suite.clear_history()
+        suite.call_deepseek("b")
+        assert requests_mock.call_count == 4
+
+    def test_response_cache_key_hashes_sent_body(self, requests_mock, suite):
+        """Test the cache key is the hash of the exact request body, serialized once"""
+        requests_mock.post(API_URL, json={"choices": [{"message": {"content": "ok"}}]})
+        suite.call_deepseek("Test message")
+        sent = requests_mock.last_request.body
+        assert list(suite._resp_cache) == [hashlib.blake2b(sent, digest_size=16).hexdigest()]
+
+    @pytest.mark.parametrize("suite", [{"max_retries": 3}], indirect=True)
+    @pytest.mark.parametrize("failure, should_retry", [
+        ({"status_code": 500}, True),
+        ({"status_code": 503}, True),
+        ({"status_code": 429}, True),
+        ({"exc": requests.exceptions.Timeout}, True),
+        ({"exc": requests.exceptions.ConnectionError}, True),
+        ({"status_code": 400}, False),
+        ({"status_code": 401}, False),
+    ], ids=["500", "503", "429", "timeout", "connection-error", "400", "401"])
+    def test_call_deepseek_retry_behavior(self, requests_mock, sleeps, suite, failure, should_retry):
+        """Test 5xx, 429 and network errors are retried while other 4xx errors fail at once"""
+        first = failure if "exc" in failure else {"json": {"error": {"message": "Server error"}}, **failure}
+        requests_mock.post(API_URL, [first, {"json": {"choices": [{"message": {"content": "ok"}}]}}])
+
+        if should_retry:
+            assert suite.call_deepseek("Test message") == "ok"
+            assert requests_mock.call_count == 2
+            assert len(sleeps) == 1  # One retry delay
+        else:
+            with pytest.raises(DeepSeekAPIError, match=str(failure["status_code"])):
+                suite.call_deepseek("Test message")
+            # Should only call once, no retries for 4xx errors
+            assert requests_mock.call_count == 1
+            assert sleeps == []
+
+    @patch('requests.Session.post')
+    @pytest.mark.parametrize("suite", [{"max_retries": 3}], indirect=True)
+    def test_call_deepseek_all_retries_timeout(self, mock_post, sleeps, suite):
         """Test all retries exhausted due to timeout"""
         mock_post.side_effect = requests.exceptions.Timeout()
 
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
-
-        with pytest.raises(DeepSeekRequestError, match="Timeout after 3 attempts"):
+        with pytest.raises(DeepSeekRequestError, match=_TIMEOUT_RE):
             suite.call_deepseek("Test message")
 
         assert mock_post.call_count == 3
-        assert mock_sleep.call_count == 2  # n-1 retry delays
-
-    @patch('requests.post')
-    @patch('time.sleep')
-    def test_call_deepseek_connection_error_with_retry(self, mock_sleep, mock_post):
-        """Test connection error with successful retry"""
-        mock_response_success = Mock()
-        mock_response_success.status_code = 200
-        mock_response_success.json.return_value = {
-            "choices": [{"message": {"content": "Connected after retry"}}]
-        }
-
-        mock_post.side_effect = [
-            requests.exceptions.ConnectionError(),
-            mock_response_success
-        ]
-
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
-        response = suite.call_deepseek("Test message")
-
-        assert response == "Connected after retry"
-        assert mock_post.call_count == 2
+        assert len(sleeps) == 2  # n-1 retry delays
+
+    @patch('requests.Session.post')
+    @pytest.mark.parametrize("suite", [{"max_retries": 3}], indirect=True)
+    def test_call_deepseek_honors_retry_after(self, mock_post, sleeps, suite):
+        """Test a 429 Retry-After header sets the retry delay"""
+        mock_post.side_effect = iter([
+            fake_response(429, headers={"Retry-After": "1"}),
+            fake_response(200, {"choices": [{"message": {"content": "ok"}}]})
+        ])
+
+        assert suite.call_deepseek("Test message") == "ok"
+        assert sleeps == [1.0]
+
+    def test_retry_wait_jittered_backoff(self, suite):
+        """Test backoff without a server hint is jittered and capped"""
+        for attempt in range(8):
+            backoff = min(suite.RETRY_BACKOFF_CAP, suite.RETRY_BACKOFF_BASE * 2 ** attempt)
+            wait = suite._retry_wait(attempt, requests.exceptions.Timeout())
+            assert 0.5 * backoff <= wait <= 1.5 * backoff
+
+    def test_call_deepseek_missing_content_in_response(self, requests_mock, suite):
+        """Test handling of malformed response"""
+        requests_mock.post(API_URL, json={"choices": [{"message": {}}]})  # Missing content
 
-    @patch('requests.post')
-    def test_call_deepseek_500_error_with_retry(self, mock_post):
-        """Test 500 server error triggers retry"""
-        mock_response_error = Mock()
-        mock_response_error.status_code = 500
-        mock_response_error.text = "Internal Server Error"
-        mock_response_error.json.return_value = {"error": {"message": "Server error"}}
-
-        mock_response_success = Mock()
-        mock_response_success.status_code = 200
-        mock_response_success.json.return_value = {
-            "choices": [{"message": {"content": "Success after server error"}}]
-        }
-
-        # First call raises HTTPError, second succeeds
-        mock_post.side_effect = [
-            Mock(
-                status_code=500,
-                raise_for_status=Mock(side_effect=requests.exceptions.HTTPError(response=mock_response_error))
-            ),
-            mock_response_success
-        ]
+        # The error gets wrapped in DeepSeekError, so check for either
+        with pytest.raises((DeepSeekResponseError, DeepSeekError), match=_MISSING_CONTENT_RE):
+            suite.call_deepseek("Test message")
 
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
-
-        # Should retry on 500 errors
-        with patch('time.sleep'):
-            response = suite.call_deepseek("Test message")
-            assert response == "Success after server error"
-
-    @patch('requests.post')
-    def test_call_deepseek_429_rate_limit_retry(self, mock_post):
-        """Test 429 rate limit error triggers retry"""
-        mock_response_429 = Mock()
-        mock_response_429.status_code = 429
-        mock_response_429.text = "Rate limit exceeded"
-        mock_response_429.json.return_value = {"error": {"message": "Too many requests"}}
-
-        mock_response_success = Mock()
-        mock_response_success.status_code = 200
-        mock_response_success.json.return_value = {
-            "choices": [{"message": {"content": "Success after rate limit"}}]
-        }
-
-        mock_post.side_effect = [
-            Mock(
-                status_code=429,
-                raise_for_status=Mock(side_effect=requests.exceptions.HTTPError(response=mock_response_429))
-            ),
-            mock_response_success
+    @patch('requests.Session.post')
+    def test_stream_call_deepseek(self, mock_post, suite):
+        """Test SSE stream parsing yields deltas and records the turn"""
+        mock_response = MagicMock(spec=requests.Response)
+        mock_response.__enter__.return_value = mock_response
+        mock_response.iter_lines.return_value = [
+            b'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+            b'',
+            b': keep-alive',
+            'data: {"choices": [{"delta": {"content": "lo \u00e9"}}]}'.encode(),
+            b'data: [DONE]',
         ]
-
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
-
-        with patch('time.sleep'):
-            response = suite.call_deepseek("Test message")
-            assert response == "Success after rate limit"
-
-    @patch('requests.post')
-    def test_call_deepseek_400_error_no_retry(self, mock_post):
-        """Test 400 client error does not retry"""
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_response.text = "Bad Request"
-        mock_response.json.return_value = {"error": {"message": "Invalid request"}}
-        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=mock_response)
         mock_post.return_value = mock_response
 
-        suite = DeepSeekSecuritySuite("test-key", max_retries=3)
+        chunks = list(suite.stream_call_deepseek("Test message"))
+
+        assert chunks == ["Hel", "lo \u00e9"]
+        assert suite.conversation_history[-1] == {"role": "assistant", "content": "Hello \u00e9"}
+
+    @patch('requests.Session.post')
+    def test_stream_retry_notice_out_of_band(self, mock_post, suite, capsys):
+        """Test retry notices go to on_retry, never into the text, and only the final attempt is kept"""
+        def lines(*contents, fail=False):
+            for content in contents:
+                yield b"data: " + json.dumps({"choices": [{"delta": {"content": content}}]}).encode()
+            if fail:
+                raise requests.exceptions.ConnectionError("reset by peer")
+            yield b"data: [DONE]"
+        failed, succeeded = MagicMock(spec=requests.Response), MagicMock(spec=requests.Response)
+        for response in (failed, succeeded):
+            response.__enter__.return_value = response
+        failed.iter_lines.return_value = lines('{"partial', fail=True)
+        succeeded.iter_lines.return_value = lines('{"a": ', '1}')
+        mock_post.side_effect = iter([failed, succeeded])
+        notices = []
+
+        analysis = print_stream(suite.stream_analyze_bounty("Test bounty program", on_retry=notices.append))
+
+        assert analysis == '{"a": 1}'
+        assert json.loads(suite.conversation_history[-1]["content"]) == {"a": 1}
+        assert len(notices) == 1 and "Retrying" in notices[0]
+        assert capsys.readouterr().out == '{"partial{"a": 1}'
+
+    def test_analyze_bounty(self, requests_mock, suite):
+        """Test bounty analysis"""
+        requests_mock.post(API_URL, json=ANALYSIS_RESPONSE)
 
-        with pytest.raises(DeepSeekAPIError, match="400"):
-            suite.call_deepseek("Test message")
+        result = suite.analyze_bounty("Test bounty program")
 
-        # Should only call once, no retries for 4xx errors
-        assert mock_post.call_count == 1
+        assert "in_scope_targets" in result
+        assert "example.com" in result
 
-    @patch('requests.post')
-    def test_call_deepseek_missing_content_in_response(self, mock_post):
-        """Test handling of malformed response"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"choices": [{"message": {}}]}  # Missing content
-        mock_post.return_value = mock_response
+    @patch('requests.Session.post')
+    def test_generate_commands_bulk(self, mock_post, suite):
+        """Test bulk generation returns one result per target without touching history"""
+        def respond(url, data=None, timeout=None):
+            target = json.loads(data)["messages"][-1]["content"].rsplit(" ", 1)[-1]
+            return fake_response(200, {"choices": [{"message": {"content": f"nmap -sV {target}"}}]})
+        mock_post.side_effect = respond
+
+        results = suite.generate_commands_bulk(["a.example.com", "b.example.com"], {"nmap"})
 
+        assert results == {"a.example.com": "nmap -sV a.example.com",
+                           "b.example.com": "nmap -sV b.example.com"}
+        assert mock_post.call_count == 2
+        assert suite.conversation_history == []
+        for call in mock_post.call_args_list:
+            messages = json.loads(call.kwargs["data"])["messages"]
+            assert messages[0]["content"] == DeepSeekSecuritySuite._STATIC_PENTEST_SYSTEM_PROMPT
+            assert "nmap" in messages[-1]["content"]
+
+    def test_analyze_bounty_llm_cache(self, requests_mock, tmp_path):
+        """Test repeated stateless analyses are served from the file cache and expire after the TTL"""
+        requests_mock.post(API_URL, json={"choices": [{"message": {"content": "{}"}}]})
+        cache = LLMCache(str(tmp_path))
+
+        suite = DeepSeekSecuritySuite("test-key", llm_cache=cache)
+        suite.analyze_bounty("Test  bounty program", stateless=True)
+        fresh = DeepSeekSecuritySuite("test-key", llm_cache=cache)
+        assert fresh.analyze_bounty("Test bounty program\n", stateless=True) == "{}"
+        assert requests_mock.call_count == 1
+
+        # A stateful reply depends on the history, so it never comes from llm_cache
+        fresh.set_system_prompt("context for a different program")
+        assert fresh.analyze_bounty("Test bounty program") == "{}"
+        assert requests_mock.call_count == 2
+
+        cache.ttl = -1
+        DeepSeekSecuritySuite("test-key", llm_cache=cache).analyze_bounty("Test bounty program", stateless=True)
+        assert requests_mock.call_count == 3
+
+    def test_stateless_calls_leave_history_untouched(self, requests_mock, tmp_path):
+        """Test stateless calls send only system + user turns and skip the shared history"""
+        requests_mock.post(API_URL, json={"choices": [{"message": {"content": "nmap -sV example.com"}}]})
+        suite = DeepSeekSecuritySuite("test-key", llm_cache=LLMCache(str(tmp_path)))
+        suite.set_system_prompt("earlier context")
+
+        assert suite.generate_commands("example.com", stateless=True) == "nmap -sV example.com"
+        assert suite.generate_commands("example.com", stateless=True) == "nmap -sV example.com"
+
+        sent = requests_mock.last_request.json()["messages"]
+        assert [m["role"] for m in sent] == ["system", "user"]
+        assert sent[0]["content"] == DeepSeekSecuritySuite._STATIC_PENTEST_SYSTEM_PROMPT
+        assert requests_mock.call_count == 1
+        assert suite.conversation_history == [{"role": "system", "content": "earlier context"}]
+
+    def test_llm_cache_memory_tier(self, tmp_path):
+        """Test recent entries are served from memory, bounded, and still expire with the TTL"""
+        cache = LLMCache(str(tmp_path))
+        cache.MEMORY_ENTRIES = 2
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+        for path in tmp_path.glob("*.json"):
+            path.unlink()
+
+        assert list(cache._memory) == ["b", "c"]
+        assert cache.get("c") == "C"
+        assert cache.get("a") is None
+
+        cache.ttl = -1
+        assert cache.get("c") is None
+
+    def test_llm_cache_prune_to_size_limit(self, tmp_path):
+        """Test pruning drops expired entries, then the oldest until under the size limit"""
+        cache = LLMCache(str(tmp_path), ttl=100)
+        for age, key in ((200, "expired"), (50, "old"), (10, "new")):
+            cache.put(key, "x" * 100)
+            os.utime(tmp_path / f"{key}.json", (time.time() - age,) * 2)
+        cache.size_limit = (tmp_path / "new.json").stat().st_size
+
+        cache.prune()
+
+        assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["new"]
+        assert "old" not in cache._memory
+
+    def test_llm_cache_from_env(self, monkeypatch, tmp_path):
+        """Test the web server's cache settings come from the environment"""
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setenv("LLM_CACHE_TTL", "60")
+        monkeypatch.setenv("LLM_CACHE_SIZE_LIMIT", "4096")
+        cache = LLMCache.from_env()
+        assert (cache.cache_dir, cache.ttl, cache.size_limit) == (tmp_path / "cache", 60, 4096)
+
+    def test_llm_cache_concurrent_puts_same_key(self, tmp_path):
+        """Test writers racing on one key never collide on a temp file, and orphans are cleaned up"""
+        cache = LLMCache(str(tmp_path))
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(100):
+                    cache.put("key", f"{n}-{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert json.loads((tmp_path / "key.json").read_text())["value"].endswith("-99")
+        assert list(tmp_path.glob("*.tmp")) == []
+
+        orphan = tmp_path / "dead.abc.tmp"
+        orphan.write_text("{")
+        os.utime(orphan, (time.time() - 120,) * 2)
+        cache.prune()
+        assert not orphan.exists()
+
+    def test_analyze_bounties_batches_uncached_texts(self, requests_mock, tmp_path):
+        """Test several programs go out in one JSON-mode request and are cached individually"""
+        cache = LLMCache(str(tmp_path))
+        cache.put(LLMCache.make_key("analyze_bounty", "deepseek-chat", "cached program"), '{"cached": true}')
+        requests_mock.post(API_URL, json={"choices": [{"message": {"content": json.dumps(
+            {"analyses": [{"in_scope_targets": ["a.com"]}, {"in_scope_targets": ["b.com"]}]})}}]})
+
+        suite = DeepSeekSecuritySuite("test-key", llm_cache=cache)
+        results = suite.analyze_bounties(["program a", "cached program", "program b"], stateless=True)
+
+        assert results[1] == '{"cached": true}'
+        assert json.loads(results[0]) == {"in_scope_targets": ["a.com"]}
+        assert json.loads(results[2]) == {"in_scope_targets": ["b.com"]}
+        payload = requests_mock.last_request.json()
+        assert payload["response_format"] == {"type": "json_object"}
+        assert "### PROGRAM 2\nprogram b" in payload["messages"][-1]["content"]
+        assert suite.analyze_bounty("program b", stateless=True) == results[2]
+        assert requests_mock.call_count == 1
+
+        # Stateless batches send only the system prompt and leave the history alone
+        assert [m["role"] for m in payload["messages"]] == ["system", "user"]
+        assert suite.conversation_history == []
+
+        # Stateful batches carry the history, so they skip llm_cache and record one turn
+        suite.analyze_bounties(["program a", "cached program"])
+        assert requests_mock.call_count == 2
+        assert [m["role"] for m in suite.conversation_history] == ["system", "user", "assistant"]
+
+    def test_analyze_bounties_bounded_batches_fall_back_per_item(self, requests_mock):
+        """Test batches are split by size, carry max_tokens, and a cut-off reply is retried per program"""
+        def respond(request, context):
+            content = request.json()["messages"][-1]["content"]
+            if content.startswith("Analyze each"):
+                reply = '{"analyses": [{"in_scope_targets": ['  # truncated at max_tokens
+            else:
+                reply = json.dumps({"program": content.rsplit("\n", 1)[-1]})
+            return {"choices": [{"message": {"content": reply}}]}
+        requests_mock.post(API_URL, json=respond)
         suite = DeepSeekSecuritySuite("test-key")
+        texts = ["a" * 100, "b" * 100, "c" * (DeepSeekSecuritySuite._BATCH_MAX_CHARS - 150)]
+
+        results = suite.analyze_bounties(texts, stateless=True)
+
+        assert [json.loads(result)["program"] for result in results] == texts
+        payloads = [request.json() for request in requests_mock.request_history]
+        # "a" and "b" share a batch, "c" would exceed the character budget so goes alone
+        assert payloads[0]["max_tokens"] == 2 * DeepSeekSecuritySuite._BATCH_TOKENS_PER_ANALYSIS
+        assert "### PROGRAM 2\n" + texts[1] in payloads[0]["messages"][-1]["content"]
+        assert [p["messages"][-1]["content"].rsplit("\n", 1)[-1] for p in payloads[1:]] == texts
+        assert requests_mock.call_count == 4
+
+    @patch('requests.Session.post')
+    def test_stream_analyze_bounty_fills_llm_cache(self, mock_post, tmp_path):
+        """Test stateless streamed analysis is cached whole and reused by analyze_bounty"""
+        mock_response = MagicMock(spec=requests.Response)
+        mock_response.__enter__.return_value = mock_response
+        mock_response.iter_lines.return_value = [
+            b'data: {"choices": [{"delta": {"content": "{\\"a\\": "}}]}',
+            b'data: {"choices": [{"delta": {"content": "1}"}}]}',
+            b'data: [DONE]',
+        ]
+        mock_post.return_value = mock_response
+        cache = LLMCache(str(tmp_path))
 
-        # The error gets wrapped in DeepSeekError, so check for either
-        with pytest.raises((DeepSeekResponseError, DeepSeekError), match="missing 'content'|unexpected error"):
-            suite.call_deepseek("Test message")
+        suite = DeepSeekSecuritySuite("test-key", llm_cache=cache)
+        assert list(suite.stream_analyze_bounty("Test bounty program", stateless=True)) == ['{"a": ', '1}']
+        fresh = DeepSeekSecuritySuite("test-key", llm_cache=cache)
+        assert fresh.analyze_bounty("Test bounty program", stateless=True) == '{"a": 1}'
+        assert list(suite.stream_analyze_bounty("Test bounty program", stateless=True)) == ['{"a": 1}']
+        assert mock_post.call_count == 1
 
-    @patch('requests.post')
-    def test_analyze_bounty(self, mock_post):
-        """Test bounty analysis"""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{
-                "message": {
-                    "content": json.dumps({
-                        "in_scope_targets": ["*.example.com"],
-                        "out_of_scope_items": ["admin panel"],
-                        "rules_and_restrictions": ["No DoS attacks"],
-                        "reward_information": "$100-$5000",
-                        "testing_guidelines": ["Responsible disclosure"]
-                    })
-                }
-            }]
-        }
+    @patch('requests.Session.post')
+    def test_stream_generate_commands_stateless(self, mock_post, tmp_path):
+        """Test stateless streaming sends no history, records none and fills the cache"""
+        mock_response = MagicMock(spec=requests.Response)
+        mock_response.__enter__.return_value = mock_response
+        mock_response.iter_lines.return_value = [
+            b'data: {"choices": [{"delta": {"content": "nmap "}}]}',
+            b'data: {"choices": [{"delta": {"content": "-sV example.com"}}]}',
+            b'data: [DONE]',
+        ]
         mock_post.return_value = mock_response
+        suite = DeepSeekSecuritySuite("test-key", llm_cache=LLMCache(str(tmp_path)))
 
-        suite = DeepSeekSecuritySuite("test-key")
-        result = suite.analyze_bounty("Test bounty program")
+        assert list(suite.stream_generate_commands("example.com", stateless=True)) == ["nmap ", "-sV example.com"]
+        sent = json.loads(mock_post.call_args.kwargs["data"])["messages"]
+        assert [m["role"] for m in sent] == ["system", "user"]
+        assert suite.conversation_history == []
 
-        assert "in_scope_targets" in result
-        assert "example.com" in result
+        assert list(suite.stream_generate_commands("example.com", stateless=True)) == ["nmap -sV example.com"]
+        assert mock_post.call_count == 1
 
 
+@pytest.mark.xdist_group(name="pure")
 class TestToolManagement:
     """Test suite for tool management functions"""
 
-    def test_extract_tool_from_command(self):
+    @pytest.mark.parametrize("command, expected", [
+        ("nmap -sV example.com", "nmap"),
+        ("subfinder -d example.com", "subfinder"),
+        ("~/tools/testssl.sh https://example.com", "testssl.sh"),
+        ("python script.py", "python"),
+        ("", ""),
+        ("  /usr/bin/sqlmap.py\t-u https://example.com", "sqlmap"),
+    ])
+    def test_extract_tool_from_command(self, command, expected):
         """Test extracting tool name from command"""
-        assert extract_tool_from_command("nmap -sV example.com") == "nmap"
-        assert extract_tool_from_command("subfinder -d example.com") == "subfinder"
-        assert extract_tool_from_command("~/tools/testssl.sh https://example.com") == "testssl.sh"
-        assert extract_tool_from_command("python script.py") == "python"
-        assert extract_tool_from_command("") == ""
-
-    def test_filter_commands_by_availability(self):
+        assert extract_tool_from_command(command) == expected
+
+    @pytest.mark.parametrize("command, is_available", [
+        ("nmap -sV example.com", True),
+        ("httpx -l urls.txt", True),
+        ("subfinder -d example.com", False),
+        ("nonexistent-tool --test", False),
+    ])
+    def test_filter_commands_by_availability(self, command, is_available):
         """Test filtering commands by tool availability"""
         commands = """
 nmap -sV example.com
@@ -288,17 +549,50 @@ subfinder -d example.com
 nonexistent-tool --test
 httpx -l urls.txt
 """
-        available_tools = {"nmap", "httpx"}
-
-        available, unavailable = filter_commands_by_availability(commands, available_tools)
-
-        assert len(available) == 2
-        assert any("nmap" in cmd for cmd in available)
-        assert any("httpx" in cmd for cmd in available)
-
-        assert len(unavailable) == 2
-        assert any("subfinder" in cmd for cmd in unavailable)
-        assert any("nonexistent-tool" in cmd for cmd in unavailable)
+        available, unavailable = filter_commands_by_availability(commands, {"nmap", "httpx"})
+
+        assert (len(available), len(unavailable)) == (2, 2)
+        assert command in (available if is_available else unavailable)
+
+    @patch('shutil.which')
+    def test_get_available_tools_cached(self, mock_which):
+        """Test PATH lookups run once and are reused until the cache is cleared"""
+        mock_which.side_effect = lambda tool: f"/usr/bin/{tool}" if tool in ("nmap", "curl") else None
+        get_available_tools.cache_clear()
+        try:
+            assert get_available_tools() == {"nmap", "curl"}
+            calls = mock_which.call_count
+            assert get_available_tools() == {"nmap", "curl"}
+            assert mock_which.call_count == calls
+        finally:
+            get_available_tools.cache_clear()
+
+    def test_needs_shell(self):
+        """Test only unquoted shell syntax routes a command through the shell"""
+        assert not needs_shell("nmap -sV -sC example.com")
+        assert not needs_shell("grep 'a|b' urls.txt")
+        assert needs_shell("subfinder -d example.com | httpx -status-code")
+        assert needs_shell("nmap -sV example.com > scan.txt")
+        assert needs_shell("ffuf -u https://example.com/FUZZ -w $HOME/data/wordlists/web/common.txt")
+
+    def test_print_stream_batches_writes(self, capsys):
+        """Test streamed tokens are written in batches and nothing is dropped"""
+        with patch('sys.stdout.write', wraps=sys.stdout.write) as mock_write:
+            print_stream(["a"] * 10 + ["b\n", "c"], max_delay=3600)
+        assert mock_write.call_count == 3  # 8 tokens, then up to the newline, then the tail
+        assert capsys.readouterr().out == "a" * 10 + "b\nc"
+
+    def test_run_streaming_captures_output(self):
+        """Test streamed execution keeps stdout and the stderr tail"""
+        result = run_streaming([sys.executable, "-c", "import sys; print('out'); sys.stderr.write('err')"], timeout=30)
+        assert result.returncode == 0
+        assert result.stdout.strip() == "out"
+        assert result.stderr == "err"
+
+    def test_run_streaming_timeout(self):
+        """Test streamed execution kills the process on timeout"""
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_streaming([sys.executable, "-c", "import time; time.sleep(10)"], timeout=1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Unit tests for session management
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from session_manager import META_SUFFIX, SessionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    with SessionManager(str(tmp_path)) as manager:
+        yield manager
+
+
+class TestFindingsIndex:
+    """Test the sessions.db mirror of saved findings"""
+
+    def test_only_saved_sessions_are_mirrored(self, manager):
+        """Test unsaved sessions and updates stay out of the index until save_session"""
+        manager.create_session("example.com")
+        manager.add_finding("high", "XSS", "Reflected XSS")
+        assert manager.query_findings() == []
+
+        manager.save_session("first")
+        manager.update_finding_status(1, "confirmed")
+        assert [f["status"] for f in manager.query_findings()] == ["new"]
+
+        manager.save_session("first")
+        assert manager.query_findings(severity="high", status="confirmed")[0]["filename"] == "first.json"
+
+    def test_delete_removes_only_that_files_rows(self, manager):
+        """Test snapshots sharing a session_id are indexed and deleted independently"""
+        manager.create_session("example.com")
+        manager.add_finding("low", "Banner", "Server banner")
+        manager.save_session("before")
+        manager.add_finding("critical", "RCE", "Command injection")
+        manager.save_session("after")
+        assert [f["filename"] for f in manager.query_findings()] == ["after.json", "after.json", "before.json"]
+
+        assert manager.delete_session("before.json")
+        assert [f["title"] for f in manager.query_findings()] == ["Banner", "RCE"]
+        assert {f["filename"] for f in manager.query_findings()} == {"after.json"}
+
+    def test_close_and_outdated_schema(self, tmp_path):
+        """Test the connection closes on exit and an old mirror layout is rebuilt"""
+        db = sqlite3.connect(tmp_path / "sessions.db")
+        db.execute("CREATE TABLE findings (session_id TEXT, id INTEGER)")
+        db.commit()
+        db.close()
+
+        with SessionManager(str(tmp_path)) as manager:
+            manager.create_session("example.com")
+            manager.add_finding("medium", "CSRF", "Missing token")
+            manager.save_session("s")
+            assert manager.query_findings(session_id=manager.current_session["session_id"])[0]["title"] == "CSRF"
+        with pytest.raises(sqlite3.ProgrammingError):
+            manager.db.execute("SELECT 1")
+
+
+class TestSessionFiles:
+    """Test saving, listing, loading, merging and deleting session files"""
+
+    def test_save_writes_sidecar_used_by_list_sessions(self, manager, tmp_path):
+        """Test list_sessions reads the sidecar summary while it is not older than the session"""
+        manager.create_session("example.com", program="example")
+        manager.add_finding("high", "XSS", "Reflected XSS")
+        path = Path(manager.save_session("s"))
+        meta = path.with_suffix(META_SUFFIX)
+        assert meta.exists()
+
+        # A sidecar that disagrees with the file shows it is what was read
+        meta.write_bytes(json.dumps({"session_id": "x", "created_at": "2", "findings_count": 7}).encode())
+        os.utime(meta, (path.stat().st_mtime + 1,) * 2)
+        assert manager.list_sessions() == [
+            {"session_id": "x", "created_at": "2", "findings_count": 7, "filename": "s.json"}]
+
+        # Once the session is newer than its sidecar, the session file is summarised instead
+        os.utime(path, (meta.stat().st_mtime + 1,) * 2)
+        [summary] = manager.list_sessions()
+        assert summary["findings_count"] == 1 and summary["program"] == "example"
+
+    def test_list_sessions_skips_unreadable_and_sorts(self, manager, tmp_path):
+        """Test sessions list newest first, broken files are skipped and summary_only reads only metadata"""
+        for name, created_at in (("old", "2024-01-01"), ("new", "2024-02-01")):
+            (tmp_path / f"{name}.json").write_text(json.dumps({"created_at": created_at, "findings": [{}]}))
+        (tmp_path / "broken.json").write_text("{")
+        os.utime(tmp_path / "old.json", (time.time() + 10,) * 2)
+
+        assert [s["filename"] for s in manager.list_sessions()] == ["new.json", "old.json"]
+        summaries = manager.list_sessions(summary_only=True)
+        assert summaries[0]["filename"] == "old.json"
+        assert sorted(s["filename"] for s in summaries) == ["broken.json", "new.json", "old.json"]
+        assert set(summaries[0]) == {"filename", "mtime", "modified_at"}
+
+    def test_load_session_rebuilds_findings_index(self, manager):
+        """Test status updates after load find findings by id and unknown ids report False"""
+        manager.create_session("example.com")
+        manager.add_finding("low", "Banner", "Server banner")
+        manager.add_finding("high", "SQLi", "Error based")
+        manager.save_session("s")
+
+        manager.create_session("other.com")
+        manager.load_session("s.json")
+        assert manager.update_finding_status(2, "confirmed") is True
+        assert manager.current_session["findings"][1]["status"] == "confirmed"
+        assert manager.update_finding_status(3, "confirmed") is False
+
+    def test_update_status_after_in_place_edit(self, manager):
+        """Test findings replaced in the list directly are found again by resyncing the index"""
+        manager.create_session("example.com")
+        manager.add_finding("low", "Banner", "Server banner")
+        manager.current_session["findings"][0] = {"id": 1, "severity": "low", "status": "new"}
+        assert manager.update_finding_status(1, "reported") is True
+        assert manager.current_session["findings"][0]["status"] == "reported"
+
+    def test_merge_sessions_renumbers_findings(self, manager):
+        """Test merged sessions keep every record, combine tool outputs and renumber findings"""
+        for target, title in (("a.com", "XSS"), ("b.com", "SQLi")):
+            manager.create_session(target)
+            manager.add_finding("high", title, "desc")
+            manager.add_tool_output("nmap", {"target": target})
+            manager.add_note(target)
+            manager.save_session(target)
+
+        path = manager.merge_sessions(["a.com.json", "b.com.json"], "merged")
+        merged = manager.load_session(Path(path).name)
+        assert [(f["id"], f["title"]) for f in merged["findings"]] == [(1, "XSS"), (2, "SQLi")]
+        assert [o["data"]["target"] for o in merged["tool_outputs"]["nmap"]] == ["a.com", "b.com"]
+        assert [n["content"] for n in merged["notes"]] == ["a.com", "b.com"]
+        with pytest.raises(FileNotFoundError):
+            manager.merge_sessions(["missing.json"], "nothing")
+
+    def test_delete_session_removes_file_and_sidecar(self, manager, tmp_path):
+        """Test delete removes the session and its sidecar and reports missing files"""
+        manager.create_session("example.com")
+        manager.save_session("s")
+        assert manager.delete_session("s.json") is True
+        assert not (tmp_path / "s.json").exists()
+        assert not (tmp_path / f"s{META_SUFFIX}").exists()
+        assert manager.delete_session("s.json") is False
+
+    def test_long_command_output_truncated(self, manager):
+        """Test command output is cut at COMMAND_OUTPUT_LIMIT with a note of the dropped length"""
+        manager.create_session("example.com")
+        manager.add_command("short", "ok")
+        manager.add_command("long", "x" * (SessionManager.COMMAND_OUTPUT_LIMIT + 5), exit_code=1)
+        short, long = manager.current_session["commands_run"]
+        assert short["output"] == "ok"
+        assert long["output"] == "x" * SessionManager.COMMAND_OUTPUT_LIMIT + "...[truncated 5 chars]"
+        assert long["exit_code"] == 1
+
+    def test_session_summary(self, manager):
+        """Test the summary counts findings by severity and lists tools used"""
+        assert manager.get_session_summary() == {"error": "No active session"}
+        manager.create_session("example.com", program="example")
+        manager.add_finding("high", "XSS", "desc")
+        manager.add_finding("high", "SQLi", "desc")
+        manager.add_finding("low", "Banner", "desc")
+        manager.add_tool_output("nmap", {})
+        manager.add_ai_analysis("bounty", "text")
+        summary = manager.get_session_summary()
+        assert summary["findings_by_severity"] == {"high": 2, "low": 1}
+        assert summary["tools_used"] == ["nmap"]
+        assert (summary["total_findings"], summary["ai_analyses"], summary["notes_count"]) == (3, 1, 0)
+        assert summary["duration"] >= 0
+
+
+class TestExportFindings:
+    """Test exporting the current session's findings"""
+
+    @pytest.fixture
+    def findings_manager(self, manager):
+        manager.create_session("example.com")
+        manager.add_finding("high", "XSS, stored", "Comment field", tool="burp", evidence="<script>")
+        manager.add_finding("low", "Banner", "Server banner")
+        return manager
+
+    def test_json_export(self, findings_manager):
+        """Test the JSON export is the findings list"""
+        exported = json.loads(findings_manager.export_findings("json"))
+        assert exported == findings_manager.current_session["findings"]
+
+    def test_csv_export(self, findings_manager):
+        """Test the CSV export has a header row, quotes commas and writes None as empty"""
+        rows = list(csv.reader(io.StringIO(findings_manager.export_findings("csv"))))
+        assert rows[0] == list(findings_manager.current_session["findings"][0])
+        assert [row[rows[0].index("title")] for row in rows[1:]] == ["XSS, stored", "Banner"]
+        assert rows[2][rows[0].index("tool")] == ""
+
+    def test_csv_export_fills_missing_keys(self, manager):
+        """Test findings without every header key still export, with blanks"""
+        manager.create_session("example.com")
+        manager.current_session["findings"] = [{"id": 1, "title": "A"}, {"id": 2}]
+        assert manager.export_findings("csv").splitlines() == ["id,title", "1,A", "2,"]
+
+    def test_markdown_export(self, findings_manager):
+        """Test the markdown export has one block per finding, with evidence only when present"""
+        exported = findings_manager.export_findings("markdown")
+        assert exported.startswith("# Findings for example.com\n\n**Total Findings:** 2\n")
+        assert "## [HIGH] XSS, stored\n**Status:** new\n**Tool:** burp\n" in exported
+        assert exported.count("**Evidence:**") == 1
+        assert exported.count("\n\n---") == 2
+
+    def test_stream_export_leaves_file_open(self, findings_manager):
+        """Test streaming writes the same bytes as export_findings and does not close the target"""
+        for fmt in ("json", "csv", "markdown"):
+            buf = io.BytesIO()
+            findings_manager.stream_export_findings(buf, fmt)
+            assert not buf.closed
+            assert buf.getvalue().decode() == findings_manager.export_findings(fmt)
+
+    def test_export_errors(self, manager):
+        """Test exporting needs an active session and a known format"""
+        with pytest.raises(ValueError, match="No active session"):
+            manager.export_findings()
+        manager.create_session("example.com")
+        with pytest.raises(ValueError, match="Unknown export format: xml"):
+            manager.export_findings("xml")
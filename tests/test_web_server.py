@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the web interface (needs the "web" extra)
+"""
+import importlib
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+
+from markupsafe import Markup
+
+from security_suite import DeepSeekAPIError
+
+
+@pytest.fixture(scope="module")
+def web(tmp_path_factory):
+    """web_server imported with a dummy API key and the LLM cache in a temp directory"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DEEPSEEK_API_KEY", "test-key")
+        mp.setenv("LLM_CACHE_DIR", str(tmp_path_factory.mktemp("llm_cache")))
+        yield importlib.import_module("web_server")
+
+
+@pytest.fixture
+def client(web):
+    return web.app.test_client()
+
+
+class TestSingleFlight:
+    """Test identical concurrent calls share one DeepSeek call"""
+
+    def test_waiters_share_the_leaders_escaped_result(self, web):
+        """Test followers get the leader's result, escaped once, and the call runs once"""
+        release, calls, results = threading.Event(), [], []
+
+        def call():
+            calls.append(1)
+            release.wait(5)
+            return "<b>reply</b>"
+
+        threads = [threading.Thread(target=lambda: results.append(web.single_flight("fn", "text", call)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while not web._inflight:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert results == [Markup("&lt;b&gt;reply&lt;/b&gt;")] * 4
+        assert web._inflight == {}
+
+    def test_failure_reaches_caller_and_clears_entry(self, web):
+        """Test the leader's exception is raised and the next call starts afresh"""
+        def fail():
+            raise DeepSeekAPIError("boom")
+
+        with pytest.raises(DeepSeekAPIError, match="boom"):
+            web.single_flight("fn", "fails", fail)
+        assert web._inflight == {}
+        assert web.single_flight("fn", "fails", lambda: "ok") == "ok"
+
+
+class TestMicroBatcher:
+    """Test submissions are grouped into batch calls"""
+
+    @staticmethod
+    def _submit_all(batcher, items):
+        results = {}
+
+        def submit(item):
+            try:
+                results[item] = batcher.submit(item)
+            except Exception as e:
+                results[item] = e
+
+        threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_submissions_share_a_batch(self, web):
+        """Test items arriving within the window go out in one batch call, results in order"""
+        batches = []
+
+        def batch_fn(texts):
+            batches.append(texts)
+            return [text.upper() for text in texts]
+
+        batcher = web.MicroBatcher(batch_fn)
+        batcher.WINDOW = 0.5
+        assert self._submit_all(batcher, ["a", "b", "c"]) == {"a": "A", "b": "B", "c": "C"}
+        assert len(batches) == 1 and sorted(batches[0]) == ["a", "b", "c"]
+
+    def test_failed_batch_falls_back_per_item(self, web):
+        """Test a failing batch is retried item by item, so only the bad item's caller fails"""
+        def batch_fn(texts):
+            raise DeepSeekAPIError("batch failed")
+
+        def item_fn(text):
+            if text == "bad":
+                raise DeepSeekAPIError("bad item")
+            return text.upper()
+
+        batcher = web.MicroBatcher(batch_fn, item_fn=item_fn)
+        batcher.WINDOW = 0.5
+        results = self._submit_all(batcher, ["a", "bad", "c"])
+        assert (results["a"], results["c"]) == ("A", "C")
+        assert str(results["bad"]) == "bad item"
+
+        # Without an item_fn every caller sees the batch error
+        batcher = web.MicroBatcher(batch_fn)
+        batcher.WINDOW = 0.5
+        assert {str(e) for e in self._submit_all(batcher, ["a", "b"]).values()} == {"batch failed"}
+
+
+class TestRoutes:
+    """Test input limits, SSE framing and the tools page cache"""
+
+    @pytest.mark.parametrize("form", [{"target": "  "}, {"target": "a" * 2049}])
+    def test_index_rejects_empty_or_long_targets(self, web, client, mocker, form):
+        """Test refused targets never reach DeepSeek"""
+        generate = mocker.patch.object(web.suite, "generate_commands")
+        response = client.post("/", data=form)
+        assert response.status_code == 200
+        assert web.REJECTED.encode() in response.data
+        generate.assert_not_called()
+
+    def test_analyze_rejects_long_text_and_oversized_body(self, web, client, mocker):
+        """Test long bounty texts are refused and bodies over MAX_CONTENT_LENGTH get 413"""
+        analyze = mocker.patch.object(web.suite, "analyze_bounties")
+        response = client.post("/analyze", data={"bounty_text": "a" * (web.MAX_BOUNTY_LENGTH + 1)})
+        assert web.REJECTED.encode() in response.data
+        assert client.post("/analyze", data={"bounty_text": "a" * (64 * 1024 + 1)}).status_code == 413
+        analyze.assert_not_called()
+
+    def test_stream_rejects_missing_target(self, client):
+        """Test /stream answers 400 without a target"""
+        assert client.get("/stream").status_code == 400
+
+    def test_sse_framing_reset_and_error(self, web):
+        """Test chunks are JSON-encoded, a retry sends reset and errors end with error then done"""
+        retried = []
+
+        def chunks():
+            yield "line one\n"
+            retried.append("retrying")
+            yield "again"
+            raise DeepSeekAPIError("gave up")
+
+        assert list(web._sse(chunks(), retried)) == [
+            'data: "line one\\n"\n\n',
+            "event: reset\ndata: {}\n\n",
+            'data: "again"\n\n',
+            'event: error\ndata: "gave up"\n\n',
+            "event: done\ndata: {}\n\n",
+        ]
+
+    def test_tools_page_cached_until_ttl_or_refresh(self, web, client, monkeypatch):
+        """Test the rendered page is reused within TOOLS_TTL and rebuilt after expiry or refresh"""
+        monkeypatch.setattr(web, "_tools_scan", (time.monotonic(), ["nmap"], []))
+        monkeypatch.setattr(web, "_tools_page", b"cached page")
+        assert client.get("/tools").data == b"cached page"
+
+        monkeypatch.setattr(web, "_tools_scan", (time.monotonic() - web.TOOLS_TTL - 1, ["nmap"], []))
+        assert client.get("/tools").data != b"cached page"
+        assert web._tools_page is not None
+
+        response = client.post("/tools/refresh")
+        assert response.status_code == 303
+        assert web._tools_page is None
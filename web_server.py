@@ -1,6 +1,14 @@
-from flask import Flask, render_template, request
-from security_suite import DeepSeekSecuritySuite, get_available_tools, ALL_TOOLS
+from flask import Flask, Response, redirect, render_template, request
+from security_suite import DeepSeekSecuritySuite, DeepSeekError, get_available_tools, ALL_TOOLS
+from llm_cache import LLMCache
+from markupsafe import Markup, escape
+import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -8,43 +16,209 @@ from pathlib import Path
 dotenv_path = Path(__file__).resolve().parent / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 app = Flask(__name__)
+# Oversized bodies are rejected with 413 before the form is parsed
+app.config["MAX_CONTENT_LENGTH"] = 64 * 1024
+# Longest inputs forwarded to DeepSeek; anything longer is refused without spending tokens
+MAX_TARGET_LENGTH = 2048
+MAX_BOUNTY_LENGTH = 32 * 1024
+REJECTED = "(input rejected)"
+# Compile every page template up front so no request pays the first-hit compile
+for template_name in ('base.html', 'index.html', 'analyze.html', 'tools.html'):
+    app.jinja_env.get_template(template_name)
 
 # It's better to initialize this once and reuse it.
 # Make sure DEEPSEEK_API_KEY is set in your environment.
 api_key = os.getenv("DEEPSEEK_API_KEY")
 if not api_key:
     raise ValueError("DEEPSEEK_API_KEY environment variable not set.")
-suite = DeepSeekSecuritySuite(api_key=api_key)
+# Identical targets/bounty texts (up to whitespace) are answered from the LLM cache:
+# recent entries from memory, older ones from disk, so hits survive restarts and
+# are shared by every Gunicorn worker pointed at the same LLM_CACHE_DIR.
+# The directory is pruned once per server start (gunicorn_conf.on_starting), not per worker.
+llm_cache = LLMCache.from_env()
+# Request threads share the suite's connection pool, sized to the server's thread count
+# (see gunicorn_conf.py) so every concurrent call keeps a warm connection
+suite = DeepSeekSecuritySuite(api_key=api_key, llm_cache=llm_cache,
+                              pool_size=int(os.getenv("WEB_THREADS", 32)))
+# Build the pool before request threads race for it
+suite.session
+
+# Calls currently in progress, keyed like the LLM cache; identical concurrent
+# requests wait on the first one's result instead of making their own call.
+# The result is HTML-escaped once by the caller that made the call, and templates
+# leave Markup as is, so waiters don't escape the same multi-KB reply again.
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+def single_flight(fn: str, text: str, call: Callable[[], str]) -> Markup:
+    key = LLMCache.make_key(fn, suite.model, text)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        future.set_result(escape(call()))
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+    return future.result()
+
+class MicroBatcher:
+    """Collects submissions for up to WINDOW seconds or MAX_BATCH items and runs them as one batch call
+
+    If the batch call fails and an item_fn is given, each item is retried on its own,
+    so one bad submission only fails its own caller.
+    """
+
+    WINDOW = 0.02
+    MAX_BATCH = 16
+
+    def __init__(self, batch_fn: Callable[[List[str]], List[str]], max_concurrent_batches: int = 4,
+                 item_fn: Optional[Callable[[str], str]] = None):
+        self._batch_fn = batch_fn
+        self._item_fn = item_fn
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        # Batches run on their own threads so collection continues while one is in flight
+        self._dispatch = ThreadPoolExecutor(max_workers=max_concurrent_batches)
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, item: str) -> str:
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.WINDOW
+            while len(batch) < self.MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[str, Future]]):
+        try:
+            results = self._batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for item, future in batch:
+                if self._item_fn is None or len(batch) == 1:
+                    future.set_exception(e)
+                    continue
+                try:
+                    future.set_result(self._item_fn(item))
+                except Exception as item_err:
+                    future.set_exception(item_err)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+# Bounty texts arriving together are packed into JSON-mode analysis requests (analyze_bounties
+# keeps each request within the reply size limit); if the batch fails, each text is retried
+# alone, with those already analyzed coming back from the LLM cache
+analyze_batcher = MicroBatcher(lambda texts: suite.analyze_bounties(texts, stateless=True),
+                               item_fn=lambda text: suite.analyze_bounty(text, stateless=True))
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     commands = ""
     if request.method == 'POST':
-        target = request.form['target']
-        if target:
+        target = request.form['target'].strip()
+        if not target or len(target) > MAX_TARGET_LENGTH:
+            commands = REJECTED
+        else:
             # For simplicity, we're not checking for available tools here.
             # In a real application, you would.
-            commands = suite.generate_commands(target)
+            # Stateless: no shared conversation history, so concurrent requests can overlap
+            commands = single_flight("generate_commands", target,
+                                     lambda: suite.generate_commands(target, stateless=True))
     return render_template('index.html', commands=commands)
 
+def _sse(chunks: Iterator[str], retried: List[str]) -> Iterator[str]:
+    # Each chunk is JSON-encoded so newlines inside it can't end the SSE event early.
+    # After a retry (noted in retried by on_retry) the reply starts over, so the
+    # client is told to discard what it has shown before the new attempt's text.
+    try:
+        for chunk in chunks:
+            if retried:
+                retried.clear()
+                yield "event: reset\ndata: {}\n\n"
+            yield f"data: {json.dumps(chunk)}\n\n"
+    except DeepSeekError as e:
+        yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events version of index(): commands are sent as DeepSeek produces them"""
+    target = request.args.get('target', '').strip()
+    if not target or len(target) > MAX_TARGET_LENGTH:
+        return Response(REJECTED, status=400, mimetype='text/plain')
+    retried: List[str] = []
+    chunks = suite.stream_generate_commands(target, stateless=True, on_retry=retried.append)
+    return Response(_sse(chunks, retried), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/analyze', methods=['GET', 'POST'])
 def analyze():
     analysis = ""
     if request.method == 'POST':
-        bounty_text = request.form['bounty_text']
-        if bounty_text:
-            analysis = suite.analyze_bounty(bounty_text)
+        bounty_text = request.form['bounty_text'].strip()
+        if not bounty_text or len(bounty_text) > MAX_BOUNTY_LENGTH:
+            analysis = REJECTED
+        else:
+            analysis = single_flight("analyze_bounty", bounty_text,
+                                     lambda: analyze_batcher.submit(bounty_text))
     return render_template('analyze.html', analysis=analysis)
 
+# Tool availability only changes when tools are installed or removed, so the PATH scan
+# and the rendered page are reused for TOOLS_TTL seconds. Every Gunicorn worker keeps
+# its own copy: POST /tools/refresh rescans the worker that serves it right away, and
+# the others pick the change up when their copy expires.
+TOOLS_TTL = int(os.getenv("TOOLS_TTL", 300))
+
+def _detect_tools() -> Tuple[float, List[str], List[str]]:
+    get_available_tools.cache_clear()
+    available_tools = get_available_tools()
+    return time.monotonic(), sorted(available_tools), sorted(set(ALL_TOOLS) - available_tools)
+
+_tools_scan = _detect_tools()  # (scanned_at, available, missing)
+_tools_page: Optional[bytes] = None
+
 @app.route('/tools')
 def tools():
-    available_tools = get_available_tools()
-    missing_tools = set(ALL_TOOLS) - available_tools
-    return render_template('tools.html', available_tools=sorted(available_tools), missing_tools=sorted(missing_tools))
+    global _tools_scan, _tools_page
+    if time.monotonic() - _tools_scan[0] > TOOLS_TTL:
+        _tools_scan, _tools_page = _detect_tools(), None
+    body = _tools_page
+    if body is None:
+        _, available_tools, missing_tools = _tools_scan
+        body = _tools_page = render_template('tools.html', available_tools=available_tools,
+                                             missing_tools=missing_tools).encode('utf-8')
+    return Response(body, mimetype='text/html')
+
+@app.route('/tools/refresh', methods=['POST'])
+def refresh_tools():
+    global _tools_scan, _tools_page
+    _tools_scan, _tools_page = _detect_tools(), None
+    return redirect('/tools', code=303)
 
 if __name__ == '__main__':
     # Note: This is a development server. For a production environment,
-    # use a production-ready WSGI server like Gunicorn or uWSGI.
+    # run it under Gunicorn instead: gunicorn -c gunicorn_conf.py wsgi:app
     # The web interface is a simplified version of the CLI and does not
     # include features like session management or command execution.
-    app.run(debug=True, host='0.0.0.0', port=8080)
+    # Each request gets its own thread, so one slow DeepSeek call doesn't block the rest.
+    llm_cache.prune()
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", host='0.0.0.0', port=8080, threaded=True)
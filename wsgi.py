@@ -0,0 +1,6 @@
+"""
+WSGI entry point for the web interface
+
+    gunicorn -c gunicorn_conf.py wsgi:app
+"""
+from web_server import app